@@ -1,21 +1,32 @@
+import asyncio
 import csv
+import gzip
 import os
 import uuid
 import re
 import json
+import hashlib
 import time
 import threading
 import shutil
-from typing import Optional
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
 from pathlib import Path
 from fastapi import FastAPI, Request, UploadFile, File, Form, BackgroundTasks
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse, Response
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 
 from engine.generator import generate_answer_sheet_pdf, DEFAULT_TITLE as DEFAULT_SHEET_TITLE
-from engine.recognizer import process_pdf_to_csv_and_annotated_pdf
-from engine.xlsx import read_simple_xlsx_table, write_simple_xlsx, write_simple_xlsx_multi
+from engine.recognizer import SCORES_FILENAME, process_pdf_to_csv_and_annotated_pdf, rethreshold_recognition_outputs
+from engine.artifacts import run_artifact_dag
+from engine.dataset import JobDataset, table_dicts
+from engine.grading import encode_answers, grade, wrong_answer_cells
+from engine.xlsx import read_simple_xlsx_table, write_simple_xlsx
 
 APP_DIR = Path(__file__).resolve().parent
 ROOT_DIR = APP_DIR.parent
@@ -74,6 +85,9 @@ I18N = {
         "upload_label_answer_key": "上傳老師答案檔（Excel .xlsx；correct/points）",
         "upload_btn_process": "開始辨識並分析",
         "upload_processing": "處理中，請稍候…",
+        "upload_queued": "已排入佇列，等待前一份作業完成…",
+        "upload_progress_page": "辨識中：第 {page} / {pages} 頁（{elapsed} 秒，待確認 {flags} 處）",
+        "upload_progress_artifact": "產生分析檔案：{artifact}（{elapsed} 秒）",
         "upload_open_result": "開啟結果頁（含圖表）",
         "upload_open_result_hint": "處理完成後請點上方按鈕開啟結果頁。",
         "upload_error_generic": "處理失敗，請查看 outputs/launcher.log 或 outputs/server.log。",
@@ -92,6 +106,7 @@ I18N = {
         "update_started": "已開始更新，請稍候（會短暫重新啟動）。",
         "update_local_only": "只允許在本機（localhost）進行更新。",
         "update_invalid_zip": "請上傳有效的 ZIP 檔（.zip）。",
+        "upload_too_large": "檔案過大（上限 {max_mb} MB）。",
         "result_title": "讀取結果",
         "result_file": "檔案：",
         "result_job_id": "Job ID：",
@@ -165,6 +180,11 @@ I18N = {
         "analysis_scores_by_class": "分數統計(xlsx)",
         "result_download_scores_by_class": "分數統計(分班)(xlsx)",
         "result_hint_unstable": "如果結果不穩，通常是掃描歪斜或太淡；可以提高掃描解析度（建議 300dpi）或改用較深的筆。",
+        "result_regrade_title": "更換答案檔重新計分",
+        "result_regrade_hint": "只重新計分並更新分析報表，不需重新上傳或辨識 PDF。",
+        "result_regrade_btn": "重新計分",
+        "result_regrade_running": "重新計分中…",
+        "result_regrade_error": "重新計分失敗",
         "result_debug_hint": "需要回報問題時，可到 Debug Mode 下載診斷檔案（輸入 Job ID）。",
         "result_debug_open": "開啟 Debug Mode",
         "debug_title": "Debug Mode",
@@ -218,6 +238,9 @@ I18N = {
         "upload_label_answer_key": "Upload teacher answer key (Excel .xlsx; correct/points)",
         "upload_btn_process": "Run recognition + analysis",
         "upload_processing": "Processing…",
+        "upload_queued": "Queued; waiting for earlier jobs to finish…",
+        "upload_progress_page": "Recognizing page {page} of {pages} ({elapsed}s, {flags} flagged)",
+        "upload_progress_artifact": "Writing analysis file: {artifact} ({elapsed}s)",
         "upload_open_result": "Open result page (with plots)",
         "upload_open_result_hint": "When processing finishes, click the button above to open the result page.",
         "upload_error_generic": "Processing failed. See outputs/launcher.log or outputs/server.log.",
@@ -236,6 +259,7 @@ I18N = {
         "update_started": "Update started. Please wait (the app will restart briefly).",
         "update_local_only": "Updates are allowed only from localhost.",
         "update_invalid_zip": "Please upload a valid .zip file.",
+        "upload_too_large": "File too large (limit {max_mb} MB).",
         "result_title": "Done",
         "result_file": "File:",
         "result_job_id": "Job ID:",
@@ -305,6 +329,11 @@ I18N = {
         "result_item_table_truncated": "({total_rows} rows, showing first {shown_rows})",
         "result_download_scores_by_class": "analysis_scores_by_class.xlsx (by class)",
         "result_hint_unstable": "If results are unstable, scans may be skewed or too light. Try 300dpi or a darker pen.",
+        "result_regrade_title": "Re-grade with a new answer key",
+        "result_regrade_hint": "Only the scores and analysis reports are rebuilt; the PDF is not uploaded or recognized again.",
+        "result_regrade_btn": "Re-grade",
+        "result_regrade_running": "Re-grading…",
+        "result_regrade_error": "Re-grading failed",
         "result_debug_hint": "For reporting/debugging, open Debug Mode and enter the Job ID to download diagnostic files.",
         "result_debug_open": "Open Debug Mode",
         "debug_title": "Debug Mode",
@@ -349,6 +378,50 @@ _IDLE_CHECK_INTERVAL_SEC = int(os.environ.get("ANSWER_SHEET_IDLE_CHECK_SEC", "30
 _IDLE_TIMEOUT_SEC = int(os.environ.get("ANSWER_SHEET_IDLE_TIMEOUT_SEC", "600"))
 _AUTO_EXIT_ENABLED = os.environ.get("ANSWER_SHEET_AUTO_EXIT", "1").strip().lower() not in {"0", "false", "no"}
 
+# Uploaded jobs run on a small thread pool so request handlers return immediately. Recognition
+# already spreads pages over worker processes, so jobs run one at a time by default.
+_JOB_WORKERS = max(1, int(os.environ.get("ANSWER_SHEET_JOB_WORKERS", "1")))
+# Threads building one job's report artifacts side by side (1 = one after another).
+_ARTIFACT_WORKERS = max(1, int(os.environ.get("ANSWER_SHEET_ARTIFACT_WORKERS", "4")))
+# Heavy report PDFs are built on their first download rather than with every job; see
+# _ensure_lazy_artifact. Maps file name -> artifact name in meta.json "artifacts".
+_LAZY_ARTIFACTS_ENABLED = os.environ.get("ANSWER_SHEET_LAZY_ARTIFACTS", "1").strip().lower() not in {"0", "false", "no"}
+_LAZY_ARTIFACTS = {
+    "試題分析整合報表.pdf": "integrated_report_pdf",
+    "analysis_report.pdf": "analysis_report",
+}
+_LAZY_BUILD_LOCKS: dict[tuple[str, str], threading.Lock] = {}
+# Held while a finished job's outputs are rebuilt (regrade / rethreshold); see _job_update_lock.
+_JOB_UPDATE_LOCKS: dict[str, threading.Lock] = {}
+# The charts page's data, prebuilt at the end of the analysis (see _write_integrated_data).
+_INTEGRATED_DATA_FILENAME = "integrated_data.json.gz"
+# Per-page recognition results shared by all jobs, so re-processing the same scans skips the
+# image work (see RecognitionCache; it is kept under ANSWER_SHEET_RECOGNITION_CACHE_MAX_MB by
+# dropping the least recently used pages). Set ANSWER_SHEET_RECOGNITION_CACHE=0 to turn it off.
+_RECOGNITION_CACHE_ENABLED = os.environ.get("ANSWER_SHEET_RECOGNITION_CACHE", "1").strip().lower() not in {"0", "false", "no"}
+_RECOGNITION_CACHE_DIR: Optional[str] = (
+    str(Path(os.environ.get("ANSWER_SHEET_RECOGNITION_CACHE_DIR") or OUTPUTS_DIR / "_recognition_cache"))
+    if _RECOGNITION_CACHE_ENABLED
+    else None
+)
+_JOB_STATES = ("queued", "running", "done", "failed")
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=_JOB_WORKERS, thread_name_prefix="answer-sheet-job")
+_JOBS: dict[str, dict] = {}
+_JOBS_LOCK = threading.Lock()
+# Per-job progress events (see _publish_job_event) and the SSE streams waiting on them. Events
+# of finished jobs are kept for late subscribers, for at most _MAX_TRACKED_JOBS jobs.
+_JOB_EVENTS: dict[str, list[dict]] = {}
+_JOB_SUBSCRIBERS: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_MAX_TRACKED_JOBS = 64
+_SSE_KEEPALIVE_SEC = 15.0
+
+# Uploads are copied to disk in fixed-size chunks (hashed on the way) and capped in size: a whole
+# upload request body may not exceed the cap (see _UploadLimitMiddleware), nor may any one file.
+_MAX_UPLOAD_MB = max(1, int(os.environ.get("ANSWER_SHEET_MAX_UPLOAD_MB", "1024")))
+_MAX_UPLOAD_BYTES = _MAX_UPLOAD_MB * 1024 * 1024
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
+_UPLOAD_ROUTES = {"/api/process", "/api/update/apply_zip"}
+
 
 def _sanitize_download_component(value: str, fallback: str) -> str:
     name = (value or "").strip().replace("\x00", "")
@@ -382,10 +455,123 @@ def _read_job_meta(job_dir: Path) -> dict:
 
 def _write_job_meta(job_dir: Path, meta: dict) -> None:
     meta_path = job_dir / _META_FILENAME
+    tmp_path = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.part")
     try:
-        meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        # Written aside and renamed so concurrent readers never see a half-written file.
+        tmp_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, meta_path)
     except Exception:
-        pass
+        tmp_path.unlink(missing_ok=True)
+
+
+def _set_job_state(job_dir: Path, state: str, **extra) -> dict:
+    """Record a job's state in memory (for polling) and in its meta.json (survives restarts)."""
+    assert state in _JOB_STATES
+    job_id = job_dir.name
+    now = int(time.time())
+    with _JOBS_LOCK:
+        job = dict(_JOBS.get(job_id) or {})
+        job.update(extra)
+        job["state"] = state
+        job[f"{state}_at"] = now
+        _JOBS[job_id] = job
+        meta = _read_job_meta(job_dir)
+        meta["job"] = job
+        _write_job_meta(job_dir, meta)
+    _publish_job_event(job_id, {"type": "state", "state": state, "error": job.get("error")})
+    if state in {"done", "failed"}:
+        _prune_finished_jobs()
+    return dict(job)
+
+
+def _publish_job_event(job_id: str, event: dict) -> None:
+    """Append one event to a job's log and hand it to every SSE stream following that job."""
+    with _JOBS_LOCK:
+        events = _JOB_EVENTS.setdefault(job_id, [])
+        event = {"id": len(events), **event}
+        events.append(event)
+        subscribers = list(_JOB_SUBSCRIBERS.get(job_id, ()))
+    for loop, queue in subscribers:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+        except RuntimeError:
+            pass  # the subscriber's event loop is gone
+
+
+def _prune_finished_jobs() -> None:
+    with _JOBS_LOCK:
+        finished = [
+            job_id
+            for job_id, job in _JOBS.items()
+            if job.get("state") in {"done", "failed"} and not _JOB_SUBSCRIBERS.get(job_id)
+        ]
+        for job_id in finished[: max(0, len(_JOBS) - _MAX_TRACKED_JOBS)]:
+            _JOBS.pop(job_id, None)
+            _JOB_EVENTS.pop(job_id, None)
+
+
+def _active_job_count() -> int:
+    """
+    Jobs queued or running in this process, plus regrades/rethresholds in progress. Derived
+    from the job registry under its lock, so it cannot drift from the jobs' actual states.
+    """
+    with _JOBS_LOCK:
+        jobs = sum(1 for job in _JOBS.values() if job.get("state") in {"queued", "running"})
+        updates = sum(1 for lock in _JOB_UPDATE_LOCKS.values() if lock.locked())
+    return jobs + updates
+
+
+def _get_job_state(job_dir: Path) -> Optional[dict]:
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_dir.name)
+        if job is not None:
+            return dict(job)
+    meta = _read_job_meta(job_dir)
+    job = meta.get("job")
+    if isinstance(job, dict) and job.get("state") in _JOB_STATES:
+        if job["state"] in {"queued", "running"}:
+            # Not in this process's registry: the server restarted before the job finished.
+            return {**job, "state": "failed", "error": "Interrupted by a server restart."}
+        return job
+    if (job_dir / "results.xlsx").exists():
+        return {"state": "done"}  # finished before job tracking existed
+    return None
+
+
+class _UploadTooLarge(Exception):
+    pass
+
+
+async def _save_upload(upload: UploadFile, dest: Path, max_bytes: int = _MAX_UPLOAD_BYTES) -> tuple[int, str]:
+    """
+    Copy an uploaded file to `dest` in _UPLOAD_CHUNK_BYTES chunks, so at most one chunk is held
+    in memory. Returns (size in bytes, sha256 hex). Raises _UploadTooLarge (and removes the
+    partial file) once more than `max_bytes` have arrived.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest, "wb") as f:
+            while True:
+                chunk = await upload.read(_UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _UploadTooLarge(f"{upload.filename or 'upload'} exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        _safe_unlink(dest)
+        raise
+    finally:
+        await upload.close()
+    return size, digest.hexdigest()
+
+
+def _upload_too_large_message(request: Request) -> str:
+    t = I18N.get(resolve_lang(request), I18N[DEFAULT_LANG])
+    return t["upload_too_large"].format(max_mb=_MAX_UPLOAD_MB)
 
 
 def _safe_unlink(path: Path) -> None:
@@ -412,8 +598,7 @@ def _idle_shutdown_watcher() -> None:
         time.sleep(max(10, int(_IDLE_CHECK_INTERVAL_SEC)))
         if not _AUTO_EXIT_ENABLED:
             continue
-        active_jobs = int(getattr(app.state, "active_jobs", 0) or 0)
-        if active_jobs > 0:
+        if _active_job_count() > 0:
             continue
         last = float(getattr(app.state, "last_heartbeat", 0.0) or 0.0)
         now = time.monotonic()
@@ -426,8 +611,6 @@ def _idle_shutdown_watcher() -> None:
 def _startup_idle_shutdown():
     if not hasattr(app.state, "last_heartbeat"):
         app.state.last_heartbeat = time.monotonic()
-    if not hasattr(app.state, "active_jobs"):
-        app.state.active_jobs = 0
     if getattr(app.state, "idle_shutdown_started", False):
         return
     app.state.idle_shutdown_started = True
@@ -473,10 +656,30 @@ def _safe_output_filename(filename: str) -> Optional[str]:
         return None
     if Path(name).name != name:
         return None
-    if name in {".", ".."} or ".." in name:
+    # Dot-files are internal (e.g. the xlsx row sidecars, see engine.xlsx) and never served.
+    if name.startswith(".") or ".." in name:
         return None
     return name
 
+
+def _output_version(path: Path) -> Optional[str]:
+    """Version token of an output file (mtime + size); changes whenever the file is rewritten."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def _output_url(job_id: str, filename: str, route: str = "/outputs") -> str:
+    """
+    URL of a job output, versioned with ?v=<_output_version> when the file exists. A regrade or a
+    re-threshold rewrites files in place, so only a versioned URL may be cached as immutable.
+    """
+    url = f"{route}/{job_id}/{filename}"
+    version = _output_version(OUTPUTS_DIR / job_id / filename)
+    return f"{url}?v={version}" if version else url
+
 def _update_git_supported() -> bool:
     return (ROOT_DIR / ".git").exists() and (shutil.which("git") is not None)
 
@@ -504,6 +707,80 @@ async def _activity_middleware(request: Request, call_next):
     return await call_next(request)
 
 
+def _is_upload_route(path: str) -> bool:
+    return path in _UPLOAD_ROUTES or (path.startswith("/api/result/") and path.endswith("/regrade"))
+
+
+class _UploadLimitMiddleware:
+    """
+    Cap upload request bodies at _MAX_UPLOAD_BYTES. A declared Content-Length over the cap is
+    refused before anything is read; otherwise (including chunked bodies) the bytes are counted
+    as they arrive and the request is cut off with 413 as soon as the count passes the cap, so an
+    oversized body is never spooled to disk in full by the form parser.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not _is_upload_route(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        try:
+            length = int(request.headers.get("content-length") or 0)
+        except ValueError:
+            length = 0
+        if length > _MAX_UPLOAD_BYTES:
+            await self._too_large(request)(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+        replaced = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > _MAX_UPLOAD_BYTES:
+                    exceeded = True
+                    raise _UploadTooLarge(f"request body exceeds {_MAX_UPLOAD_BYTES} bytes")
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started, replaced
+            if exceeded and not response_started:
+                # The form parser turns the aborted read into its own error response; send 413
+                # in its place and drop the rest of it.
+                if not replaced:
+                    replaced = True
+                    await self._too_large(request)(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _UploadTooLarge:
+            if response_started:
+                raise
+            if not replaced:
+                await self._too_large(request)(scope, receive, send)
+
+    @staticmethod
+    def _too_large(request: Request) -> Response:
+        return JSONResponse(
+            status_code=413, content={"error": _upload_too_large_message(request)}, headers={"Connection": "close"}
+        )
+
+
+app.add_middleware(_UploadLimitMiddleware)
+
+
 @app.post("/api/heartbeat", include_in_schema=False)
 def api_heartbeat():
     _touch_activity()
@@ -557,15 +834,19 @@ def result_page(request: Request, job_id: str):
             "body_class": "theme-light",
             "job_id": job_id,
             "display_filename": display_filename,
-            "results_url": f"/outputs/{job_id}/results.xlsx",
-            "pdf_url": f"/outputs/{job_id}/annotated.pdf",
-            "showwrong_url": (f"/outputs/{job_id}/showwrong.xlsx" if (job_dir / "showwrong.xlsx").exists() else None),
+            "results_url": _output_url(job_id, "results.xlsx"),
+            "pdf_url": (_output_url(job_id, "annotated.pdf") if (job_dir / "annotated.pdf").exists() else None),
+            "showwrong_url": (_output_url(job_id, "showwrong.xlsx") if (job_dir / "showwrong.xlsx").exists() else None),
             "analysis_report_url": None, # 停用,
             "analysis_error": (str(meta.get("analysis_error") or "") or None),
             "analysis_message": (str(meta.get("analysis_message") or "") or None),
             "analysis_discrimination_note_key": discr_note_key,
-            "analysis_score_hist_inline_url": (f"/outputs_inline/{job_id}/analysis_score_hist.png" if score_hist.exists() else None),
-            "analysis_item_plot_inline_url": (f"/outputs_inline/{job_id}/analysis_item_plot.png" if item_plot.exists() else None),
+            "analysis_score_hist_inline_url": (
+                _output_url(job_id, "analysis_score_hist.png", route="/outputs_inline") if score_hist.exists() else None
+            ),
+            "analysis_item_plot_inline_url": (
+                _output_url(job_id, "analysis_item_plot.png", route="/outputs_inline") if item_plot.exists() else None
+            ),
             "analysis_files": _analysis_file_links(job_id, t),
         },
     )
@@ -606,20 +887,24 @@ def result_charts_page(request: Request, job_id: str):
         {
             "job_id": job_id,
             "display_filename": display_filename,
-            "results_url": f"/outputs/{job_id}/results.xlsx",
-            "pdf_url": f"/outputs/{job_id}/annotated.pdf",
-            "showwrong_url": (f"/outputs/{job_id}/showwrong.xlsx" if (job_dir / "showwrong.xlsx").exists() else None),
+            "results_url": _output_url(job_id, "results.xlsx"),
+            "pdf_url": (_output_url(job_id, "annotated.pdf") if (job_dir / "annotated.pdf").exists() else None),
+            "showwrong_url": (_output_url(job_id, "showwrong.xlsx") if (job_dir / "showwrong.xlsx").exists() else None),
             "analysis_error": (str(meta.get("analysis_error") or "") or None),
             "analysis_message": (str(meta.get("analysis_message") or "") or None),
             "analysis_discrimination_note_key": discr_note_key,
-            "analysis_score_hist_inline_url": (f"/outputs_inline/{job_id}/analysis_score_hist.png" if score_hist.exists() else None),
-            "analysis_item_plot_inline_url": (f"/outputs_inline/{job_id}/analysis_item_plot.png" if item_plot.exists() else None),
-            "analysis_scores_by_class_url": (f"/outputs/{job_id}/analysis_scores_by_class.xlsx" if scores_by_class.exists() else None),
+            "analysis_score_hist_inline_url": (
+                _output_url(job_id, "analysis_score_hist.png", route="/outputs_inline") if score_hist.exists() else None
+            ),
+            "analysis_item_plot_inline_url": (
+                _output_url(job_id, "analysis_item_plot.png", route="/outputs_inline") if item_plot.exists() else None
+            ),
+            "analysis_scores_by_class_url": (_output_url(job_id, "analysis_scores_by_class.xlsx") if scores_by_class.exists() else None),
             "integrated_data_url": (f"/api/result/{job_id}/integrated-data" if template_xlsx.exists() else None),
-            "analysis_template_xlsx_url": (f"/outputs/{job_id}/analysis_template.xlsx" if template_xlsx.exists() else None),
-            "roster_xlsx_url": (f"/outputs/{job_id}/roster.xlsx" if roster_xlsx.exists() else None),
-            "analysis_item_xlsx_url": (f"/outputs/{job_id}/analysis_item.xlsx" if item_xlsx.exists() else None),
-            "analysis_scores_xlsx_url": (f"/outputs/{job_id}/analysis_scores.xlsx" if scores_xlsx.exists() else None),
+            "analysis_template_xlsx_url": (_output_url(job_id, "analysis_template.xlsx") if template_xlsx.exists() else None),
+            "roster_xlsx_url": (_output_url(job_id, "roster.xlsx") if roster_xlsx.exists() else None),
+            "analysis_item_xlsx_url": (_output_url(job_id, "analysis_item.xlsx") if item_xlsx.exists() else None),
+            "analysis_scores_xlsx_url": (_output_url(job_id, "analysis_scores.xlsx") if scores_xlsx.exists() else None),
             "analysis_report_url":None,#停用
             "analysis_item_table": item_table,
             "analysis_files": _analysis_file_links(job_id, t),
@@ -627,8 +912,76 @@ def result_charts_page(request: Request, job_id: str):
     )
 
 
+def _table_columns(table: list[list[str]]) -> tuple[list[str], list[list[str]]]:
+    """(stripped header, one list of cells per column) of a table; rows are padded with ""."""
+    if not table:
+        return [], []
+    header = [str(x or "").strip() for x in table[0]]
+    body = table[1:]
+    columns = [[str(row[idx]) if idx < len(row) else "" for row in body] for idx in range(len(header))]
+    return header, columns
+
+
+def _write_integrated_data(job_dir: Path, dataset: Optional[JobDataset] = None) -> Path:
+    """
+    Write the charts page's data (analysis_template + roster) as gzipped columnar JSON: each
+    table's header once and one array per column, instead of a dict per row repeating every key.
+    """
+    dataset = dataset if dataset is not None else JobDataset(job_dir)
+    template_table = dataset.table(job_dir / "analysis_template.xlsx", reader=_read_table_rows)
+    if not template_table:
+        raise ValueError("empty analysis_template.xlsx")
+    roster_table = dataset.table(job_dir / "roster.xlsx", reader=_read_table_rows)
+    template_header, template_columns = _table_columns(template_table)
+    roster_header, roster_columns = _table_columns(roster_table)
+    payload = {
+        "template_header": template_header,
+        "template_columns": template_columns,
+        "roster_header": roster_header,
+        "roster_columns": roster_columns,
+    }
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    out_path = job_dir / _INTEGRATED_DATA_FILENAME
+    part_path = out_path.with_name(out_path.name + ".part")
+    part_path.write_bytes(gzip.compress(data, compresslevel=6, mtime=0))
+    os.replace(part_path, out_path)
+    return out_path
+
+
+def _integrated_data_is_current(job_dir: Path) -> bool:
+    try:
+        built = (job_dir / _INTEGRATED_DATA_FILENAME).stat().st_mtime_ns
+    except OSError:
+        return False
+    for name in ("analysis_template.xlsx", "roster.xlsx"):
+        try:
+            if (job_dir / name).stat().st_mtime_ns > built:
+                return False
+        except OSError:
+            continue
+    return True
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value lists `etag` (weak comparison) or is "*"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == bare:
+            return True
+    return False
+
+
 @app.get("/api/result/{job_id}/integrated-data")
-def result_integrated_data(job_id: str):
+def result_integrated_data(request: Request, job_id: str):
+    """
+    The charts page's data, prebuilt by the job as gzipped columnar JSON (rebuilt here if missing
+    or older than its source tables). Served with an ETag, so a repeat visit costs a 304.
+    """
     job_id = (job_id or "").strip()
     if not _JOB_ID_RE.match(job_id):
         return {"error": "invalid job id"}
@@ -638,26 +991,30 @@ def result_integrated_data(job_id: str):
     if not template_path.exists():
         return {"error": "missing analysis_template.xlsx"}
 
+    payload_path = job_dir / _INTEGRATED_DATA_FILENAME
     try:
-        template_table = _read_table_rows(template_path)
-        roster_headers, roster_rows = _read_table_dicts(job_dir / "roster.xlsx")
+        if not _integrated_data_is_current(job_dir):
+            _write_integrated_data(job_dir)
+        st = payload_path.stat()
     except Exception as exc:
         return {"error": str(exc)}
 
-    if not template_table:
-        return {"error": "empty analysis_template.xlsx"}
-
-    header = [str(x or "").strip() for x in template_table[0]]
-    rows = []
-    for raw_row in template_table[1:]:
-        rows.append({header[idx]: str(raw_row[idx] if idx < len(raw_row) else "") for idx in range(len(header)) if header[idx]})
-
-    return {
-        "template_header": header,
-        "template_rows": rows,
-        "roster_header": roster_headers,
-        "roster_rows": roster_rows,
+    send_gzip = "gzip" in (request.headers.get("accept-encoding") or "").lower()
+    # The gzip and identity bodies differ byte for byte, so each gets its own strong ETag.
+    version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    headers = {
+        "ETag": f'"{version}-gz"' if send_gzip else f'"{version}"',
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
     }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    body = payload_path.read_bytes()
+    if send_gzip:
+        headers["Content-Encoding"] = "gzip"
+    else:
+        body = gzip.decompress(body)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 def _discrimination_note_key(job_dir: Path) -> Optional[str]:
@@ -728,14 +1085,16 @@ def _analysis_file_links(job_id: str, t: dict) -> list[dict]:
         "試題分析整合檔.xlsx": t.get("result_download_integrated_p1", "試題分析整合報表.XLSX"),
     }
 
+    lazy = set(_pending_lazy_artifacts(job_dir))
+
     def add_if_exists(name: str) -> None:
         path = job_dir / name
         try:
-            if not path.exists():
+            if not path.exists() and name not in lazy:
                 return
         except Exception:
             return
-        files.append({"url": f"/outputs/{job_id}/{name}", "label": label_by_name.get(name, name)})
+        files.append({"url": _output_url(job_id, name), "label": label_by_name.get(name, name)})
 
     # Keep a stable, friendly order for known files first.
     for name in label_by_name.keys():
@@ -745,7 +1104,7 @@ def _analysis_file_links(job_id: str, t: dict) -> list[dict]:
     try:
         for path in sorted(job_dir.iterdir()):
             name = path.name
-            if name in label_by_name:
+            if name in label_by_name or name.startswith("."):
                 continue
             if name == "analysis_template.xlsx":  # Explicitly hide this
                 continue
@@ -783,19 +1142,7 @@ def _read_table_rows(path: Path) -> list[list[str]]:
 
 
 def _read_table_dicts(path: Path) -> tuple[list[str], list[dict[str, str]]]:
-    table = _read_table_rows(path)
-    if not table:
-        return [], []
-    header = [str(x or "").strip() for x in table[0]]
-    rows: list[dict[str, str]] = []
-    for raw_row in table[1:]:
-        row: dict[str, str] = {}
-        for idx, name in enumerate(header):
-            if not name:
-                continue
-            row[name] = str(raw_row[idx] if idx < len(raw_row) else "")
-        rows.append(row)
-    return header, rows
+    return table_dicts(_read_table_rows(path))
 
 
 def _read_answer_key_csv(path: Path) -> dict[int, tuple[str, float]]:
@@ -916,8 +1263,10 @@ def _write_analysis_template(
     answer_key: dict[int, tuple[str, float]],
     out_csv_path: Path,
     default_points: float = 1.0,
+    dataset: Optional[JobDataset] = None,
 ) -> None:
-    rows = _read_table_rows(results_csv_path)
+    dataset = dataset if dataset is not None else JobDataset(Path(results_csv_path).parent)
+    rows = dataset.table(results_csv_path, reader=_read_table_rows)
     if not rows:
         raise ValueError("results.xlsx is empty")
 
@@ -948,7 +1297,7 @@ def _write_analysis_template(
 
         out_rows.append([row[0], _normalize_answer_cell(correct), points_out, *row[1:]])
 
-    write_simple_xlsx(Path(out_csv_path), rows=out_rows, sheet_name="analysis_template")
+    dataset.write_xlsx(Path(out_csv_path), rows=out_rows, sheet_name="analysis_template")
 
 
 def _write_showwrong_xlsx(
@@ -956,8 +1305,10 @@ def _write_showwrong_xlsx(
     answer_key: dict[int, tuple[str, float]],
     out_xlsx_path: Path,
     blank_label: str = "空白",
+    dataset: Optional[JobDataset] = None,
 ) -> None:
-    rows = _read_table_rows(results_csv_path)
+    dataset = dataset if dataset is not None else JobDataset(Path(results_csv_path).parent)
+    rows = dataset.table(results_csv_path, reader=_read_table_rows)
     if not rows:
         raise ValueError("results.xlsx is empty")
 
@@ -972,7 +1323,7 @@ def _write_showwrong_xlsx(
     q_numbers: list[int] = []
     corrects: list[str] = []
     points_list: list[float] = []
-    answers_by_student: dict[str, list[str]] = {s: [] for s in student_cols}
+    answer_rows: list[list[str]] = []
 
     for row in rows[1:]:
         if not row:
@@ -993,39 +1344,27 @@ def _write_showwrong_xlsx(
         q_numbers.append(qno)
         corrects.append(correct_norm)
         points_list.append(points_f)
-
-        for idx, student in enumerate(student_cols):
-            val = row[idx + 1] if idx + 1 < len(row) else ""
-            answers_by_student[student].append(_normalize_answer_cell(val))
+        answer_rows.append([(row[idx + 1] if idx + 1 < len(row) else "") for idx in range(len(student_cols))])
 
     def score_out(v: float) -> object:
         if abs(float(v) - round(float(v))) < 1e-9:
             return int(round(float(v)))
         return round(float(v), 2)
 
-    student_scores: dict[str, float] = {s: 0.0 for s in student_cols}
+    codes, key_codes, vocabulary = encode_answers(answer_rows, corrects)
+    graded = grade(codes, key_codes, points_list, vocabulary)
+    student_scores: dict[str, float] = dict(zip(student_cols, graded["scores"].tolist()))
+    column_of = {s: j for j, s in enumerate(student_cols)}
 
-    out_rows: list[list[object]] = []
-    out_rows.append(["number", "correct", *student_cols])
+    shown = wrong_answer_cells(codes, graded, vocabulary, blank_label)
 
-    for i, qno in enumerate(q_numbers):
-        correct = corrects[i] if i < len(corrects) else ""
-        row_out: list[object] = [qno, correct]
-        if not correct:
-            row_out.extend(["" for _ in student_cols])
-            out_rows.append(row_out)
-            continue
+    def cells_for(students: list[str]) -> list[list[object]]:
+        return shown[:, [column_of[s] for s in students]].tolist()
 
-        points = points_list[i] if i < len(points_list) else 1.0
-        for student in student_cols:
-            answers = answers_by_student.get(student, [])
-            ans = answers[i] if i < len(answers) else ""
-            if ans == correct:
-                student_scores[student] += float(points)
-                row_out.append("")
-            else:
-                row_out.append(blank_label if ans == "" else ans)
-        out_rows.append(row_out)
+    out_rows: list[list[object]] = []
+    out_rows.append(["number", "correct", *student_cols])
+    for qno, correct, cells in zip(q_numbers, corrects, cells_for(student_cols)):
+        out_rows.append([qno, correct, *cells])
 
     out_rows.append(["score", "", *[score_out(student_scores[s]) for s in student_cols]])
 
@@ -1033,8 +1372,8 @@ def _write_showwrong_xlsx(
     roster_path = Path(results_csv_path).with_name("roster.xlsx")
     roster_by_person: dict[str, dict[str, str]] = {}
     try:
-        if roster_path.exists():
-            _, roster_rows = _read_table_dicts(roster_path)
+        if dataset.exists(roster_path):
+            _, roster_rows = dataset.table_dicts(roster_path)
             for r in roster_rows:
                 pid = str((r.get("person_id") or "")).strip()
                 if not pid:
@@ -1081,27 +1420,15 @@ def _write_showwrong_xlsx(
 
             rows_for_sheet: list[list[object]] = []
             rows_for_sheet.append(["number", "correct", *students])
-
-            for i, qno in enumerate(q_numbers):
-                correct = corrects[i] if i < len(corrects) else ""
-                row_out: list[object] = [qno, correct]
-                if not correct:
-                    row_out.extend(["" for _ in students])
-                    rows_for_sheet.append(row_out)
-                    continue
-
-                for student in students:
-                    answers = answers_by_student.get(student, [])
-                    ans = answers[i] if i < len(answers) else ""
-                    row_out.append("" if ans == correct else (blank_label if ans == "" else ans))
-                rows_for_sheet.append(row_out)
+            for qno, correct, cells in zip(q_numbers, corrects, cells_for(students)):
+                rows_for_sheet.append([qno, correct, *cells])
 
             rows_for_sheet.append(["score", "", *[score_out(student_scores[s]) for s in students]])
             sheets.append((f"Class {key}", rows_for_sheet))
 
-        write_simple_xlsx_multi(Path(out_xlsx_path), sheets=sheets)
+        dataset.write_xlsx_multi(Path(out_xlsx_path), sheets=sheets)
     else:
-        write_simple_xlsx(Path(out_xlsx_path), rows=out_rows, sheet_name="showwrong")
+        dataset.write_xlsx(Path(out_xlsx_path), rows=out_rows, sheet_name="showwrong")
 
     # Also emit a lightweight JSON for the interactive HTML report.
     try:
@@ -1110,32 +1437,16 @@ def _write_showwrong_xlsx(
             for key in sorted(grouped_students.keys()):
                 students = grouped_students[key][:]
                 students.sort(key=student_sort_key)
-                rows_payload: list[dict] = []
-                for i, qno in enumerate(q_numbers):
-                    correct = corrects[i] if i < len(corrects) else ""
-                    if not correct:
-                        cells = ["" for _ in students]
-                    else:
-                        cells = []
-                        for student in students:
-                            answers = answers_by_student.get(student, [])
-                            ans = answers[i] if i < len(answers) else ""
-                            cells.append("" if ans == correct else (blank_label if ans == "" else ans))
-                    rows_payload.append({"number": qno, "correct": correct, "cells": cells})
+                rows_payload: list[dict] = [
+                    {"number": qno, "correct": correct, "cells": cells}
+                    for qno, correct, cells in zip(q_numbers, corrects, cells_for(students))
+                ]
                 classes.append({"key": key, "label": key, "students": students, "rows": rows_payload})
         else:
-            rows_payload: list[dict] = []
-            for i, qno in enumerate(q_numbers):
-                correct = corrects[i] if i < len(corrects) else ""
-                if not correct:
-                    cells = ["" for _ in student_cols]
-                else:
-                    cells = []
-                    for student in student_cols:
-                        answers = answers_by_student.get(student, [])
-                        ans = answers[i] if i < len(answers) else ""
-                        cells.append("" if ans == correct else (blank_label if ans == "" else ans))
-                rows_payload.append({"number": qno, "correct": correct, "cells": cells})
+            rows_payload = [
+                {"number": qno, "correct": correct, "cells": cells}
+                for qno, correct, cells in zip(q_numbers, corrects, cells_for(student_cols))
+            ]
             classes.append({"key": "all", "label": "all", "students": student_cols, "rows": rows_payload})
 
         out_json = Path(out_xlsx_path).with_name("analysis_showwrong.json")
@@ -1143,17 +1454,18 @@ def _write_showwrong_xlsx(
     except Exception:
         pass
 
-def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
+def _write_analysis_report_pdf(job_dir: Path, lang: str, dataset: Optional[JobDataset] = None) -> None:
     import math
 
+    dataset = dataset if dataset is not None else JobDataset(job_dir)
     template_csv = Path(job_dir) / "analysis_template.xlsx"
-    if not template_csv.exists():
+    if not dataset.exists(template_csv):
         return
 
     t = I18N.get(lang, I18N[DEFAULT_LANG])
 
     try:
-        fieldnames, template_rows = _read_table_dicts(template_csv)
+        fieldnames, template_rows = dataset.table_dicts(template_csv)
         required = ("number", "correct", "points")
         if not all(k in fieldnames for k in required):
             return
@@ -1167,7 +1479,7 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
     q_numbers: list[int] = []
     corrects: list[str] = []
     points: list[float] = []
-    answers_by_student: dict[str, list[str]] = {s: [] for s in student_cols}
+    answer_rows: list[list[str]] = []
 
     for row in template_rows:
         raw_no = str(row.get("number") or "").strip()
@@ -1183,8 +1495,7 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
         except Exception:
             p = 0.0
         points.append(float(p))
-        for s in student_cols:
-            answers_by_student[s].append(_normalize_answer_cell(row.get(s) or ""))
+        answer_rows.append([row.get(s) or "" for s in student_cols])
 
     if not q_numbers:
         return
@@ -1193,8 +1504,8 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
     roster_path = Path(job_dir) / "roster.xlsx"
     roster_by_person: dict[str, dict[str, str]] = {}
     try:
-        if roster_path.exists():
-            _, roster_rows = _read_table_dicts(roster_path)
+        if dataset.exists(roster_path):
+            _, roster_rows = dataset.table_dicts(roster_path)
             for r in roster_rows:
                 pid = str((r.get("person_id") or "")).strip()
                 if not pid:
@@ -1243,25 +1554,15 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
 
     groups = [(k, sorted(grouped_students[k], key=student_sort_key)) for k in sorted(grouped_students.keys())]
 
-    def compute_scores(students: list[str]) -> dict[str, float]:
-        scores: dict[str, float] = {}
-        for s in students:
-            ans = answers_by_student.get(s, [])
-            score = 0.0
-            for i in range(len(q_numbers)):
-                c = corrects[i] if i < len(corrects) else ""
-                if not c:
-                    continue
-                a = ans[i] if i < len(ans) else ""
-                if a and a == c:
-                    score += float(points[i] if i < len(points) else 0.0)
-            scores[s] = float(score)
-        return scores
+    codes, key_codes, vocabulary = encode_answers(answer_rows, corrects)
+    column_of = {sid: j for j, sid in enumerate(student_cols)}
 
     def compute_item_metrics(
         students: list[str],
-        scores_by_student: dict[str, float],
     ) -> tuple[list[Optional[float]], list[Optional[float]], list[Optional[float]], list[int], list[int]]:
+        # Ties in score rank by student id for the upper/lower groups.
+        columns = [column_of[sid] for sid in sorted(students, key=str)]
+        graded = grade(codes[:, columns], key_codes, points, vocabulary)
         n = len(students)
         diffs: list[Optional[float]] = [None for _ in q_numbers]
         discs: list[Optional[float]] = [None for _ in q_numbers]
@@ -1272,48 +1573,14 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
             return diffs, discs, blank_rates, wrong_counts, blank_counts
 
         for i in range(len(q_numbers)):
-            c = corrects[i] if i < len(corrects) else ""
-            if not c:
+            if not graded["keyed"][i]:
                 continue
-            ok = 0
-            wrong = 0
-            blank = 0
-            for s in students:
-                ans = answers_by_student.get(s, [])
-                a = ans[i] if i < len(ans) else ""
-                if not a:
-                    blank += 1
-                elif a == c:
-                    ok += 1
-                else:
-                    wrong += 1
-            diffs[i] = ok / n
-            blank_rates[i] = blank / n
-            wrong_counts[i] = int(wrong)
-            blank_counts[i] = int(blank)
-
-        group_n = int(math.floor(n * 0.27)) if n > 30 else int(math.floor(n / 2.0))
-        if group_n > 0:
-            ordered = sorted(students, key=lambda sid: (scores_by_student.get(sid, 0.0), str(sid)))
-            low = set(ordered[:group_n])
-            high = set(ordered[-group_n:])
-            for i in range(len(q_numbers)):
-                c = corrects[i] if i < len(corrects) else ""
-                if not c:
-                    continue
-                low_ok = 0
-                high_ok = 0
-                for s in low:
-                    ans = answers_by_student.get(s, [])
-                    a = ans[i] if i < len(ans) else ""
-                    if a and a == c:
-                        low_ok += 1
-                for s in high:
-                    ans = answers_by_student.get(s, [])
-                    a = ans[i] if i < len(ans) else ""
-                    if a and a == c:
-                        high_ok += 1
-                discs[i] = (high_ok / group_n) - (low_ok / group_n)
+            diffs[i] = float(graded["difficulty"][i])
+            disc = float(graded["discrimination"][i])
+            discs[i] = None if math.isnan(disc) else disc
+            blank_counts[i] = int(graded["item_blank"][i])
+            wrong_counts[i] = int(graded["item_wrong"][i])
+            blank_rates[i] = blank_counts[i] / n
 
         return diffs, discs, blank_rates, wrong_counts, blank_counts
 
@@ -1535,8 +1802,7 @@ def _write_analysis_report_pdf(job_dir: Path, lang: str) -> None:
             story.append(Paragraph(f"{t.get('col_class', 'Class')}: {label}", styles["Title"]))
             story.append(PageBreak())
 
-        scores_by_student = compute_scores(students)
-        diffs, discs, blank_rates, wrong_counts, blank_counts = compute_item_metrics(students, scores_by_student)
+        diffs, discs, blank_rates, wrong_counts, blank_counts = compute_item_metrics(students)
 
         per_row = 2 if len(q_numbers) <= 40 else 3
         table_rows = build_compact_rows(per_row, diffs, discs, blank_rates, wrong_counts, blank_counts)
@@ -1680,6 +1946,226 @@ def api_generate_answer_key(
     )
 
 
+def _run_job_analysis(
+    job_dir: Path,
+    answer_key_upload_path: Path,
+    num_questions: int,
+    lang: str,
+    on_artifact: Optional[Callable[[str], None]] = None,
+    dataset: Optional[JobDataset] = None,
+) -> None:
+    """
+    Build the answer-key, showwrong and analysis outputs of a recognized job from its results.xlsx.
+    `on_artifact(filename)` is called as each output file is written. Pass the `dataset` the
+    recognition filled so the stages read its tables from memory instead of the xlsx files.
+    """
+    t = I18N.get(lang, I18N[DEFAULT_LANG])
+    dataset = dataset if dataset is not None else JobDataset(job_dir)
+
+    def notify(filename: str) -> None:
+        if on_artifact is not None and (job_dir / filename).exists():
+            on_artifact(filename)
+
+    csv_path = job_dir / "results.xlsx"
+    answer_key_xlsx_path = job_dir / "answer_key.xlsx"
+    showwrong_xlsx_path = job_dir / "showwrong.xlsx"
+
+    analysis_error: Optional[str] = None
+    analysis_message: Optional[str] = None
+    artifacts: dict[str, dict] = {}
+    lazy_artifacts: list[str] = []
+
+    template_path = job_dir / "analysis_template.xlsx"
+    try:
+        key_map = _read_answer_key_file(answer_key_upload_path)
+    except Exception as exc:
+        key_map = None
+        analysis_error = f"Answer key error: {exc}"
+    else:
+        from engine.analysis import run_analysis_template, generate_integrated_report
+
+        # Independent outputs are built concurrently; each starts once its inputs exist.
+        tasks = {
+            "answer_key": (
+                partial(
+                    _write_answer_key_files,
+                    num_questions=num_questions,
+                    answer_key=key_map,
+                    out_xlsx_path=answer_key_xlsx_path,
+                    default_points=1.0,
+                ),
+                (),
+            ),
+            "showwrong": (partial(_write_showwrong_xlsx, csv_path, key_map, showwrong_xlsx_path, dataset=dataset), ()),
+            "analysis_template": (
+                partial(_write_analysis_template, csv_path, key_map, template_path, default_points=1.0, dataset=dataset),
+                (),
+            ),
+            "analysis": (
+                partial(run_analysis_template, template_path, job_dir, lang=lang, on_artifact=on_artifact, dataset=dataset),
+                ("analysis_template",),
+            ),
+            "integrated_data": (partial(_write_integrated_data, job_dir, dataset=dataset), ("analysis_template",)),
+            "integrated_report": (
+                partial(
+                    generate_integrated_report,
+                    job_dir,
+                    lang=lang,
+                    on_artifact=on_artifact,
+                    dataset=dataset,
+                    write_pdf=not _LAZY_ARTIFACTS_ENABLED,
+                ),
+                ("analysis",),
+            ),
+        }
+        if not _LAZY_ARTIFACTS_ENABLED:
+            tasks["analysis_report"] = (
+                partial(_write_analysis_report_pdf, job_dir, lang=lang, dataset=dataset),
+                ("analysis",),
+            )
+        else:
+            # Built outputs of a previous run are stale now; they are rebuilt on download.
+            for filename in _LAZY_ARTIFACTS:
+                (job_dir / filename).unlink(missing_ok=True)
+        files = {
+            "answer_key": answer_key_xlsx_path.name,
+            "showwrong": showwrong_xlsx_path.name,
+            "analysis_template": template_path.name,
+            "analysis_report": "analysis_report.pdf",
+        }
+
+        def on_finish(name: str, record: dict) -> None:
+            if record["status"] == "ok" and name in files:
+                notify(files[name])
+
+        results = run_artifact_dag(tasks, workers=_ARTIFACT_WORKERS, on_finish=on_finish)
+        artifacts = {name: {k: v for k, v in record.items() if k != "result"} for name, record in results.items()}
+        if _LAZY_ARTIFACTS_ENABLED and results["analysis"]["status"] == "ok":
+            lazy_artifacts = list(_LAZY_ARTIFACTS)
+            for filename in lazy_artifacts:
+                artifacts[_LAZY_ARTIFACTS[filename]] = {"status": "lazy"}
+
+        if results["showwrong"]["status"] == "failed":
+            analysis_error = f"Showwrong error: {results['showwrong']['error']}"
+        if results["analysis_template"]["status"] == "failed":
+            analysis_error = f"Analysis template error: {results['analysis_template']['error']}"
+        elif results["analysis"]["status"] == "ok":
+            analysis_message = t.get("analysis_message_done", "Analysis complete.")
+            analysis_error = None
+        elif results["analysis"]["status"] == "failed":
+            analysis_error = (
+                f"{t.get('analysis_error_builtin_failed', 'Built-in analysis failed:')} {results['analysis']['error']}"
+            ).strip()
+
+    meta = _read_job_meta(job_dir)
+    if analysis_error:
+        meta["analysis_error"] = analysis_error
+    else:
+        meta.pop("analysis_error", None)
+    if analysis_message:
+        meta["analysis_message"] = analysis_message
+    else:
+        meta.pop("analysis_message", None)
+    meta["artifacts"] = artifacts
+    meta["lang"] = lang
+    if lazy_artifacts:
+        meta["lazy_artifacts"] = lazy_artifacts
+    else:
+        meta.pop("lazy_artifacts", None)
+    _write_job_meta(job_dir, meta)
+
+
+def _pending_lazy_artifacts(job_dir: Path) -> list[str]:
+    """File names registered by the job's analysis to be built on first download."""
+    return [str(x) for x in (_read_job_meta(job_dir).get("lazy_artifacts") or []) if str(x) in _LAZY_ARTIFACTS]
+
+
+def _build_lazy_artifact(job_dir: Path, filename: str, lang: str) -> None:
+    if filename == "試題分析整合報表.pdf":
+        from engine.analysis import generate_integrated_report
+
+        generate_integrated_report(job_dir, lang=lang, write_xlsx=False)
+    elif filename == "analysis_report.pdf":
+        _write_analysis_report_pdf(job_dir, lang=lang)
+    if not (job_dir / filename).exists():
+        raise RuntimeError(f"{filename} was not produced")
+
+
+def _lazy_build_failed(job_dir: Path, filename: str) -> bool:
+    """True if `filename` is a lazy artifact whose last build failed (see _ensure_lazy_artifact)."""
+    if filename not in _LAZY_ARTIFACTS or (job_dir / filename).exists():
+        return False
+    record = (_read_job_meta(job_dir).get("artifacts") or {}).get(_LAZY_ARTIFACTS[filename]) or {}
+    return bool(record.get("lazy") and record.get("status") == "failed")
+
+
+def _ensure_lazy_artifact(job_dir: Path, filename: str) -> bool:
+    """
+    Build `filename` if the job registered it as a lazy artifact that is not built yet; concurrent
+    requests for the same file wait for that one build and then share its output. The result stays
+    on disk and is recorded in meta.json "artifacts". Returns False if the build failed; a failed
+    build is recorded there too and is not pending any more, so it is neither listed nor retried
+    (until the next analysis run registers it again).
+    """
+    if filename not in _pending_lazy_artifacts(job_dir):
+        return not _lazy_build_failed(job_dir, filename)
+    key = (job_dir.name, filename)
+    with _JOBS_LOCK:
+        lock = _LAZY_BUILD_LOCKS.setdefault(key, threading.Lock())
+    with lock:
+        if filename not in _pending_lazy_artifacts(job_dir):
+            return not _lazy_build_failed(job_dir, filename)
+        lang = str(_read_job_meta(job_dir).get("lang") or DEFAULT_LANG)
+        started = time.perf_counter()
+        try:
+            _build_lazy_artifact(job_dir, filename, lang)
+        except Exception as exc:
+            print(f"WARNING: Failed to build {filename} for job {job_dir.name}: {exc}")
+            _safe_unlink(job_dir / filename)  # whatever a half-finished build left behind
+            record = {"status": "failed", "seconds": 0.0, "error": str(exc) or exc.__class__.__name__, "lazy": True}
+        else:
+            record = {"status": "ok", "seconds": 0.0, "lazy": True}
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        with _JOBS_LOCK:
+            meta = _read_job_meta(job_dir)
+            meta["lazy_artifacts"] = [x for x in (meta.get("lazy_artifacts") or []) if x != filename]
+            meta.setdefault("artifacts", {})[_LAZY_ARTIFACTS[filename]] = record
+            _write_job_meta(job_dir, meta)
+        return record["status"] == "ok"
+
+
+def _job_update_lock(job_dir: Path) -> threading.Lock:
+    """
+    The lock a regrade or rethreshold holds for its whole run: both rewrite results.xlsx, the
+    answer key, the analysis outputs and meta.json, so a second update of the same job is
+    refused (409) rather than interleaved with the first.
+    """
+    with _JOBS_LOCK:
+        return _JOB_UPDATE_LOCKS.setdefault(job_dir.name, threading.Lock())
+
+
+def _job_busy_response() -> JSONResponse:
+    return JSONResponse(status_code=409, content={"error": "job is being updated"})
+
+
+def _find_answer_key_upload(job_dir: Path) -> Optional[Path]:
+    for suffix in (".xlsx", ".csv"):
+        path = job_dir / f"answer_key_upload{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def _answer_key_upload_suffix(upload_filename: Optional[str]) -> str:
+    answer_key_filename = (upload_filename or "").strip() or "answer_key.xlsx"
+    answer_key_filename = answer_key_filename.replace("\\", "/")
+    answer_key_filename = _sanitize_download_component(Path(answer_key_filename).name, "answer_key.xlsx")
+    answer_key_suffix = (Path(answer_key_filename).suffix or "").lower()
+    if answer_key_suffix not in {".csv", ".xlsx"}:
+        answer_key_suffix = ".xlsx"
+    return answer_key_suffix
+
+
 @app.post("/api/process")
 async def api_process(
     request: Request,
@@ -1689,7 +2175,6 @@ async def api_process(
     choices_count: int = Form(4),
 ):
     lang = resolve_lang(request)
-    t = I18N.get(lang, I18N[DEFAULT_LANG])
     num_questions = max(1, min(100, int(num_questions)))
     choices_count = max(3, min(5, int(choices_count)))
 
@@ -1702,21 +2187,18 @@ async def api_process(
     original_filename = _sanitize_download_component(Path(original_filename).name, "upload.pdf")
 
     input_pdf = job_dir / "input.pdf"
-    with open(input_pdf, "wb") as f:
-        f.write(await pdf.read())
-
-    answer_key_filename = (answer_key.filename or "").strip() or "answer_key.xlsx"
-    answer_key_filename = answer_key_filename.replace("\\", "/")
-    answer_key_filename = _sanitize_download_component(Path(answer_key_filename).name, "answer_key.xlsx")
-    answer_key_suffix = (Path(answer_key_filename).suffix or "").lower()
-    if answer_key_suffix not in {".csv", ".xlsx"}:
-        answer_key_suffix = ".xlsx"
-    answer_key_upload_path = job_dir / f"answer_key_upload{answer_key_suffix}"
-    with open(answer_key_upload_path, "wb") as f:
-        f.write(await answer_key.read())
+    try:
+        input_size, input_sha256 = await _save_upload(pdf, input_pdf)
+    except _UploadTooLarge:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return JSONResponse(status_code=413, content={"error": _upload_too_large_message(request)})
 
-    answer_key_xlsx_path = job_dir / "answer_key.xlsx"
-    showwrong_xlsx_path = job_dir / "showwrong.xlsx"
+    answer_key_upload_path = job_dir / f"answer_key_upload{_answer_key_upload_suffix(answer_key.filename)}"
+    try:
+        await _save_upload(answer_key, answer_key_upload_path)
+    except _UploadTooLarge:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return JSONResponse(status_code=413, content={"error": _upload_too_large_message(request)})
 
     _write_job_meta(
         job_dir,
@@ -1726,91 +2208,310 @@ async def api_process(
             "created_at": int(time.time()),
             "num_questions": num_questions,
             "choices_count": choices_count,
+            "input_size": input_size,
+            "input_sha256": input_sha256,
         },
     )
 
-    csv_path = job_dir / "results.xlsx"
-    ambiguity_csv_path = job_dir / "ambiguity.xlsx"
-    annotated_pdf_path = job_dir / "annotated.pdf"
+    # Processing runs on the job executor; the client polls /api/jobs/{job_id}.
+    _set_job_state(job_dir, "queued")
+    _JOB_EXECUTOR.submit(
+        _process_job,
+        job_dir,
+        input_pdf,
+        answer_key_upload_path,
+        num_questions,
+        choices_count,
+        lang,
+    )
+    return JSONResponse(status_code=202, content=_job_status_payload(job_id, _get_job_state(job_dir) or {}))
+
+
+def _process_job(
+    job_dir: Path,
+    input_pdf: Path,
+    answer_key_upload_path: Path,
+    num_questions: int,
+    choices_count: int,
+    lang: str,
+) -> None:
+    """Recognize an uploaded scan and build its analysis outputs (runs on _JOB_EXECUTOR)."""
+    job_id = job_dir.name
+    started = time.perf_counter()
+
+    def on_page(event: dict) -> None:
+        _publish_job_event(job_id, {"type": "progress", **event})
+
+    def on_artifact(filename: str) -> None:
+        _publish_job_event(
+            job_id,
+            {
+                "type": "artifact",
+                "stage": "analysis",
+                "artifact": filename,
+                "elapsed": round(time.perf_counter() - started, 3),
+            },
+        )
 
-    # Main processing
-    app.state.active_jobs = int(getattr(app.state, "active_jobs", 0) or 0) + 1
+    dataset = JobDataset(job_dir)
     try:
+        _set_job_state(job_dir, "running")
         process_pdf_to_csv_and_annotated_pdf(
             input_pdf_path=str(input_pdf),
             num_questions=num_questions,
             choices_count=choices_count,
-            out_csv_path=str(csv_path),
-            out_ambiguity_csv_path=str(ambiguity_csv_path),
-            out_annotated_pdf_path=str(annotated_pdf_path),
+            out_csv_path=str(job_dir / "results.xlsx"),
+            out_ambiguity_csv_path=str(job_dir / "ambiguity.xlsx"),
+            out_annotated_pdf_path=str(job_dir / "annotated.pdf"),
+            progress=on_page,
+            dataset=dataset,
+            cache_dir=_RECOGNITION_CACHE_DIR,
         )
+        _run_job_analysis(job_dir, answer_key_upload_path, num_questions, lang, on_artifact=on_artifact, dataset=dataset)
+    except Exception as exc:
+        print(f"WARNING: Job {job_dir.name} failed: {exc}")
+        traceback.print_exc()
+        _set_job_state(job_dir, "failed", error=str(exc) or exc.__class__.__name__)
+    else:
+        _set_job_state(job_dir, "done")
+
+
+def _job_status_payload(job_id: str, job: dict) -> dict:
+    state = job.get("state")
+    return {
+        "job_id": job_id,
+        "state": state,
+        "error": job.get("error"),
+        "queued_at": job.get("queued_at"),
+        "running_at": job.get("running_at"),
+        "finished_at": job.get("done_at") or job.get("failed_at"),
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+        "result_url": (f"/result/{job_id}/charts" if state == "done" else None),
+    }
+
+
+@app.get("/api/jobs/{job_id}")
+def api_job_status(job_id: str):
+    job_id = (job_id or "").strip()
+    if not _JOB_ID_RE.match(job_id):
+        return JSONResponse(status_code=400, content={"error": "invalid job id"})
+    job = _get_job_state(OUTPUTS_DIR / job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    return _job_status_payload(job_id, job)
+
+
+def _sse_message(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _job_event_stream(job_id: str, job_dir: Path, last_event_id: int):
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    with _JOBS_LOCK:
+        backlog = list(_JOB_EVENTS.get(job_id, ()))
+        _JOB_SUBSCRIBERS.setdefault(job_id, []).append((loop, queue))
+    try:
+        if not backlog:
+            # Not tracked in this process (finished long ago, or before a restart): report the
+            # stored state once and end the stream.
+            job = _get_job_state(job_dir) or {}
+            if job.get("state") in {"done", "failed"}:
+                yield _sse_message({"id": 0, "type": "state", "state": job["state"], "error": job.get("error")})
+                return
+        for event in backlog:
+            if event["id"] <= last_event_id:
+                continue
+            yield _sse_message(event)
+            if event["type"] == "state" and event["state"] in {"done", "failed"}:
+                return
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=_SSE_KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event["id"] <= last_event_id:
+                continue
+            yield _sse_message(event)
+            if event["type"] == "state" and event["state"] in {"done", "failed"}:
+                return
     finally:
-        app.state.active_jobs = max(0, int(getattr(app.state, "active_jobs", 1) or 1) - 1)
+        with _JOBS_LOCK:
+            subscribers = _JOB_SUBSCRIBERS.get(job_id, [])
+            if (loop, queue) in subscribers:
+                subscribers.remove((loop, queue))
+            if not subscribers:
+                _JOB_SUBSCRIBERS.pop(job_id, None)
+
+
+@app.get("/api/jobs/{job_id}/events")
+def api_job_events(request: Request, job_id: str):
+    """
+    Server-Sent Events for one job: "state" (queued/running/done/failed), "progress" (one per
+    recognized page, then the xlsx outputs) and "artifact" (each analysis/report file written).
+    Each event carries an increasing id; reconnecting with Last-Event-ID resumes after it.
+    """
+    job_id = (job_id or "").strip()
+    if not _JOB_ID_RE.match(job_id):
+        return JSONResponse(status_code=400, content={"error": "invalid job id"})
+    job_dir = OUTPUTS_DIR / job_id
+    if _get_job_state(job_dir) is None:
+        return JSONResponse(status_code=404, content={"error": "unknown job"})
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "-1"))
+    except ValueError:
+        last_event_id = -1
+    return StreamingResponse(
+        _job_event_stream(job_id, job_dir, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    analysis_error: Optional[str] = None
-    analysis_message: Optional[str] = None
 
-    template_path = job_dir / "analysis_template.xlsx"
+@app.post("/api/result/{job_id}/rethreshold")
+def api_rethreshold(
+    request: Request,
+    job_id: str,
+    min_score_grade: Optional[float] = Form(None),
+    min_score_class: Optional[float] = Form(None),
+    min_score_seat: Optional[float] = Form(None),
+    min_score_choice: Optional[float] = Form(None),
+    amb_delta_identity: Optional[float] = Form(None),
+    amb_delta_choice: Optional[float] = Form(None),
+    multi_ratio: Optional[float] = Form(None),
+):
+    """
+    Re-decide a finished job from its saved bubble scores with new thresholds (unset ones keep
+    their defaults) and rebuild its outputs, without re-rendering the PDF.
+    """
+    job_id = (job_id or "").strip()
+    if not _JOB_ID_RE.match(job_id):
+        return {"error": "invalid job id"}
+
+    job_dir = OUTPUTS_DIR / job_id
+    scores_path = job_dir / SCORES_FILENAME
+    if not scores_path.exists():
+        return {"error": f"missing {SCORES_FILENAME}"}
+    if (_get_job_state(job_dir) or {}).get("state") in {"queued", "running"}:
+        return JSONResponse(status_code=409, content={"error": "job is still running"})
+
+    thresholds = {
+        "min_score_grade": min_score_grade,
+        "min_score_class": min_score_class,
+        "min_score_seat": min_score_seat,
+        "min_score_choice": min_score_choice,
+        "amb_delta_identity": amb_delta_identity,
+        "amb_delta_choice": amb_delta_choice,
+        "multi_ratio": multi_ratio,
+    }
+    lock = _job_update_lock(job_dir)
+    if not lock.acquire(blocking=False):
+        return _job_busy_response()
     try:
-        key_map = _read_answer_key_file(answer_key_upload_path)
-    except Exception as exc:
-        key_map = None
-        analysis_error = f"Answer key error: {exc}"
-    else:
-        try:
-            _write_answer_key_files(
-                num_questions=num_questions,
-                answer_key=key_map,
-                out_xlsx_path=answer_key_xlsx_path,
-                default_points=1.0,
-            )
-        except Exception:
-            pass
-        try:
-            _write_showwrong_xlsx(csv_path, key_map, showwrong_xlsx_path)
-        except Exception as exc:
-            if analysis_error is None:
-                analysis_error = f"Showwrong error: {exc}"
+        return _rethreshold_job(request, job_dir, thresholds)
+    finally:
+        lock.release()
 
-    if key_map is not None:
-        try:
-            _write_analysis_template(csv_path, key_map, template_path, default_points=1.0)
-        except Exception as exc:
-            analysis_error = f"Analysis template error: {exc}"
-        else:
-            try:
-                from engine.analysis import run_analysis_template, generate_integrated_report
-
-                run_analysis_template(template_path, job_dir, lang=lang)
-                try:
-                    generate_integrated_report(job_dir, lang=lang)
-                except Exception as exc:
-                    print(f"WARNING: Failed to generate integrated report: {exc}")
-                    import traceback
-                    traceback.print_exc()
-
-                analysis_message = t.get("analysis_message_done", "Analysis complete.")
-                analysis_error = None
-            except Exception as exc:
-                analysis_error = f"{t.get('analysis_error_builtin_failed', 'Built-in analysis failed:')} {exc}".strip()
-            else:
-                try:
-                    _write_analysis_report_pdf(job_dir, lang=lang)
-                except Exception:
-                    pass
+
+def _rethreshold_job(request: Request, job_dir: Path, thresholds: dict) -> dict:
+    scores_path = job_dir / SCORES_FILENAME
+    input_pdf = job_dir / "input.pdf"
+    dataset = JobDataset(job_dir)
+    try:
+        summary = rethreshold_recognition_outputs(
+            scores_path=str(scores_path),
+            out_csv_path=str(job_dir / "results.xlsx"),
+            thresholds=thresholds,
+            out_ambiguity_csv_path=str(job_dir / "ambiguity.xlsx"),
+            input_pdf_path=(str(input_pdf) if input_pdf.exists() else None),
+            out_annotated_pdf_path=str(job_dir / "annotated.pdf"),
+            dataset=dataset,
+        )
+    except ValueError as exc:
+        return {"error": str(exc)}
+    if not summary["annotated"]:
+        # Without input.pdf the annotation cannot be redrawn; drop it rather than keep marks that
+        # contradict the new results.
+        _safe_unlink(job_dir / "annotated.pdf")
+
+    answer_key_upload_path = _find_answer_key_upload(job_dir)
+    if answer_key_upload_path is not None:
+        num_questions = int(_read_job_meta(job_dir).get("num_questions") or summary["num_questions"])
+        _run_job_analysis(job_dir, answer_key_upload_path, num_questions, resolve_lang(request), dataset=dataset)
 
     meta = _read_job_meta(job_dir)
-    if analysis_error:
-        meta["analysis_error"] = analysis_error
-    else:
-        meta.pop("analysis_error", None)
-    if analysis_message:
-        meta["analysis_message"] = analysis_message
-    else:
-        meta.pop("analysis_message", None)
+    meta["thresholds"] = summary["thresholds"]
     _write_job_meta(job_dir, meta)
+    return {"job_id": job_dir.name, **summary}
 
-    return RedirectResponse(url=f"/result/{job_id}/charts", status_code=303)
+
+@app.post("/api/result/{job_id}/regrade")
+async def api_regrade(
+    request: Request,
+    job_id: str,
+    answer_key: UploadFile = File(...),
+):
+    """
+    Replace a finished job's answer key (xlsx or csv) and rebuild only what depends on it (the
+    answer key, showwrong and analysis outputs) from the stored results.xlsx; the PDF is not
+    recognized again. An unreadable key is rejected and the previous one is kept.
+    """
+    job_id = (job_id or "").strip()
+    if not _JOB_ID_RE.match(job_id):
+        return {"error": "invalid job id"}
+
+    job_dir = OUTPUTS_DIR / job_id
+    if not (job_dir / "results.xlsx").exists():
+        return {"error": "missing results.xlsx"}
+    if (_get_job_state(job_dir) or {}).get("state") in {"queued", "running"}:
+        return JSONResponse(status_code=409, content={"error": "job is still running"})
+    num_questions = int(_read_job_meta(job_dir).get("num_questions") or 0)
+    if num_questions <= 0:
+        return {"error": "missing num_questions in job metadata"}
+
+    lock = _job_update_lock(job_dir)
+    if not lock.acquire(blocking=False):
+        await answer_key.close()
+        return _job_busy_response()
+    try:
+        return await _regrade_job(request, job_dir, answer_key, num_questions)
+    finally:
+        lock.release()
+
+
+async def _regrade_job(request: Request, job_dir: Path, answer_key: UploadFile, num_questions: int):
+    job_id = job_dir.name
+    suffix = _answer_key_upload_suffix(answer_key.filename)
+    new_key_path = job_dir / f"answer_key_upload.new{suffix}"
+    try:
+        await _save_upload(answer_key, new_key_path)
+    except _UploadTooLarge:
+        return JSONResponse(status_code=413, content={"error": _upload_too_large_message(request)})
+    try:
+        await run_in_threadpool(_read_answer_key_file, new_key_path)
+    except Exception as exc:
+        new_key_path.unlink(missing_ok=True)
+        return JSONResponse(status_code=400, content={"error": f"Answer key error: {exc}"})
+
+    for old_suffix in (".xlsx", ".csv"):
+        (job_dir / f"answer_key_upload{old_suffix}").unlink(missing_ok=True)
+    answer_key_upload_path = job_dir / f"answer_key_upload{suffix}"
+    os.replace(new_key_path, answer_key_upload_path)
+
+    started = time.perf_counter()
+    await run_in_threadpool(_run_job_analysis, job_dir, answer_key_upload_path, num_questions, resolve_lang(request))
+
+    meta = _read_job_meta(job_dir)
+    meta["regraded_at"] = int(time.time())
+    _write_job_meta(job_dir, meta)
+    return {
+        "job_id": job_id,
+        "seconds": round(time.perf_counter() - started, 3),
+        "analysis_error": meta.get("analysis_error"),
+        "result_url": f"/result/{job_id}",
+    }
 
 
 @app.post("/api/update/apply_zip", response_class=HTMLResponse)
@@ -1831,8 +2532,12 @@ async def api_update_apply_zip(
     updates_dir = OUTPUTS_DIR / "_updates"
     updates_dir.mkdir(parents=True, exist_ok=True)
     zip_path = updates_dir / f"update_{int(time.time())}.zip"
-    with open(zip_path, "wb") as f:
-        f.write(await zip_file.read())
+    try:
+        await _save_upload(zip_file, zip_path)
+    except _UploadTooLarge:
+        resp = template_response(request, "update.html", _update_page_ctx({"error": _upload_too_large_message(request)}))
+        resp.status_code = 413
+        return resp
 
     host, port = _get_bind_host_port()
     worker = ROOT_DIR / "update_worker.py"
@@ -1960,7 +2665,7 @@ def debug_page(request: Request, job_id: str = ""):
 
     def url_if_exists(filename: str) -> Optional[str]:
         p = job_dir / filename
-        return f"/outputs/{job_id}/{filename}" if p.exists() else None
+        return _output_url(job_id, filename) if p.exists() else None
 
     ctx["files"] = {
         "results": url_if_exists("results.xlsx"),
@@ -1971,8 +2676,43 @@ def debug_page(request: Request, job_id: str = ""):
     return template_response(request, "debug.html", ctx)
 
 
-@app.get("/outputs/{job_id}/{filename}")
-def download_output(job_id: str, filename: str):
+def _output_file_response(request: Request, file_path: Path, **kwargs) -> Response:
+    """
+    FileResponse for a job output with HTTP caching: Starlette's strong ETag (file mtime + size)
+    and Last-Modified, 304 for a matching If-None-Match / If-Modified-Since, and byte Range
+    requests (honouring If-Range) answered with 206, so viewers can fetch a big PDF piecewise.
+
+    A URL carrying the file's current ?v= version (see _output_url) of a finished job is cached
+    as immutable; anything else is revalidated on each use, since a regrade, a re-threshold or a
+    lazy build may still replace the file.
+    """
+    st = file_path.stat()
+    response = FileResponse(path=str(file_path), stat_result=st, **kwargs)
+    version = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    finished = (_get_job_state(file_path.parent) or {}).get("state") in {"done", "failed"}
+    if finished and request.query_params.get("v") == version:
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, no-cache"
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        not_modified = _etag_matches(if_none_match, response.headers["etag"])
+    else:
+        since = request.headers.get("if-modified-since")
+        try:
+            since_dt = parsedate_to_datetime(since) if since else None
+        except (TypeError, ValueError):
+            since_dt = None
+        not_modified = since_dt is not None and int(st.st_mtime) <= since_dt.timestamp()
+    if not_modified:
+        headers = {k: response.headers[k] for k in ("etag", "last-modified", "cache-control")}
+        return Response(status_code=304, headers=headers)
+    return response
+
+
+@app.api_route("/outputs/{job_id}/{filename}", methods=["GET", "HEAD"])
+def download_output(request: Request, job_id: str, filename: str):
     job_id = (job_id or "").strip()
     filename = _safe_output_filename(filename) or ""
     if not _JOB_ID_RE.match(job_id) or not filename:
@@ -1980,6 +2720,10 @@ def download_output(job_id: str, filename: str):
 
     job_dir = OUTPUTS_DIR / job_id
     file_path = job_dir / filename
+    if not job_dir.is_dir():
+        return RedirectResponse(url="/upload", status_code=302)
+    if not _ensure_lazy_artifact(job_dir, filename):
+        return Response(content=f"Failed to build {filename}", status_code=500, media_type="text/plain")
     if not file_path.exists():
         return RedirectResponse(url="/upload", status_code=302)
 
@@ -2030,10 +2774,10 @@ def download_output(job_id: str, filename: str):
         media = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     if filename.lower().endswith(".png"):
         media = "image/png"
-    return FileResponse(path=str(file_path), media_type=media, filename=download_name)
+    return _output_file_response(request, file_path, media_type=media, filename=download_name)
 
-@app.get("/outputs_inline/{job_id}/{filename}")
-def view_output_inline(job_id: str, filename: str):
+@app.api_route("/outputs_inline/{job_id}/{filename}", methods=["GET", "HEAD"])
+def view_output_inline(request: Request, job_id: str, filename: str):
     job_id = (job_id or "").strip()
     filename = _safe_output_filename(filename) or ""
     if not _JOB_ID_RE.match(job_id) or filename not in _INLINE_OUTPUT_FILENAMES:
@@ -2044,8 +2788,9 @@ def view_output_inline(job_id: str, filename: str):
     if not file_path.exists():
         return RedirectResponse(url="/upload", status_code=302)
 
-    return FileResponse(
-        path=str(file_path),
+    return _output_file_response(
+        request,
+        file_path,
         media_type="image/png",
         filename=filename,
         content_disposition_type="inline",
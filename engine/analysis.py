@@ -5,37 +5,27 @@ import math
 import re
 import statistics
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 from PIL import Image as PILImage, ImageDraw, ImageFont
 import os # Added for os.path.exists
 
-from .xlsx import read_simple_xlsx_table, write_simple_xlsx, write_simple_xlsx_multi
+from .dataset import JobDataset
+from .grading import MASK_MULTI, MASK_OTHER, choice_bitmasks, encode_answers, grade, item_mask_counts
 
 
 def _normalize_cell(value: Any) -> str:
     return ("" if value is None else str(value)).strip().upper()
 
 
-def _write_excel_csv(path: Path, header: List[str], rows: List[List[Any]]) -> None:
-    write_simple_xlsx(path, rows=[header, *rows], sheet_name=path.stem[:31] or "Sheet1")
+def _write_excel_csv(dataset: JobDataset, path: Path, header: List[str], rows: List[List[Any]]) -> None:
+    dataset.write_xlsx(path, rows=[header, *rows], sheet_name=path.stem[:31] or "Sheet1")
 
 
-def _read_table_dicts(path: Path) -> Tuple[List[str], List[Dict[str, str]]]:
-    table = read_simple_xlsx_table(path)
-    if not table:
-        return [], []
-    header = [str(x or "").strip() for x in table[0]]
-    rows: List[Dict[str, str]] = []
-    for raw_row in table[1:]:
-        row: Dict[str, str] = {}
-        for idx, name in enumerate(header):
-            if not name:
-                continue
-            row[name] = str(raw_row[idx] if idx < len(raw_row) else "")
-        rows.append(row)
-    return header, rows
+def _notify(on_artifact: Optional[Callable[[str], None]], filename: str) -> None:
+    if on_artifact is not None:
+        on_artifact(filename)
 
 
 def _score_histogram_png(scores: List[float], total_possible: float, out_path: Path, lang: str = "zh_TW") -> None:
@@ -408,19 +398,20 @@ def _item_plot_png(numbers: List[int], series: Dict[str, List[Optional[float]]],
         raise RuntimeError("Failed to encode PNG image")
 
 
-def _write_analysis_scores_by_class_xlsx(outdir: Path) -> None:
+def _write_analysis_scores_by_class_xlsx(outdir: Path, dataset: Optional[JobDataset] = None) -> None:
     """
     Reads analysis_scores.xlsx and roster.xlsx (if available) to group scores by class.
     Writes analysis_scores_by_class.xlsx with one sheet per class.
     """
+    dataset = dataset if dataset is not None else JobDataset(outdir)
     scores_path = outdir / "analysis_scores.xlsx"
     roster_path = outdir / "roster.xlsx"
-    if not scores_path.exists():
+    if not dataset.exists(scores_path):
         return
 
     # Read scores
     try:
-        _, score_rows = _read_table_dicts(scores_path)
+        _, score_rows = dataset.table_dicts(scores_path)
     except Exception:
         return
 
@@ -429,9 +420,9 @@ def _write_analysis_scores_by_class_xlsx(outdir: Path) -> None:
 
     # Read roster to map person_id -> class_no
     class_map = {}
-    if roster_path.exists():
+    if dataset.exists(roster_path):
         try:
-            _, roster_rows = _read_table_dicts(roster_path)
+            _, roster_rows = dataset.table_dicts(roster_path)
             for row in roster_rows:
                 pid = (row.get("person_id") or "").strip()
                 c = (row.get("class_no") or "").strip()
@@ -490,17 +481,29 @@ def _write_analysis_scores_by_class_xlsx(outdir: Path) -> None:
 
     if sheets:
         try:
-            write_simple_xlsx_multi(outdir / "analysis_scores_by_class.xlsx", sheets)
+            dataset.write_xlsx_multi(outdir / "analysis_scores_by_class.xlsx", sheets)
         except Exception:
             pass
 
 
-def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh_TW") -> None:
+def run_analysis_template(
+    template_csv_path: Path,
+    outdir: Path,
+    lang: str = "zh_TW",
+    on_artifact: Optional[Callable[[str], None]] = None,
+    dataset: Optional[JobDataset] = None,
+) -> None:
+    """
+    Score every student in `template_csv_path` and write the analysis xlsx/png files to `outdir`.
+    `on_artifact(filename)` is called after each output file is written.
+    Tables are read from and kept in `dataset` (default: a fresh one over `outdir`).
+    """
     template_csv_path = Path(template_csv_path)
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
+    dataset = dataset if dataset is not None else JobDataset(outdir)
 
-    fieldnames, rows = _read_table_dicts(template_csv_path)
+    fieldnames, rows = dataset.table_dicts(template_csv_path)
     if not fieldnames:
         raise ValueError("template.xlsx is empty")
 
@@ -516,7 +519,7 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
     q_numbers: List[int] = []
     corrects: List[Optional[str]] = []
     points: List[float] = []
-    answers_by_student: Dict[str, List[Optional[str]]] = {s: [] for s in student_cols}
+    answer_rows: List[List[Optional[str]]] = []
 
     for row in rows:
         raw_no = (row.get("number") or "").strip()
@@ -536,38 +539,20 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
         q_numbers.append(qno)
         corrects.append(c_val)
         points.append(p_val)
-
-        for s in student_cols:
-            a = _normalize_cell(row.get(s))
-            answers_by_student[s].append(a if a else None)
+        answer_rows.append([row.get(s) for s in student_cols])
 
     q_count = len(q_numbers)
     s_count = len(student_cols)
     if q_count == 0 or s_count == 0:
         raise ValueError("No data rows")
 
-    points_arr = np.array(points, dtype=float)
-    has_key = np.array([c is not None for c in corrects], dtype=bool)
-    total_possible = float(points_arr[has_key].sum()) if bool(has_key.any()) else 0.0
+    codes, key_codes, vocabulary = encode_answers(answer_rows, corrects)
+    graded = grade(codes, key_codes, points, vocabulary)
+    total_possible = graded["total_possible"]
 
     # Student scores
-    student_scores: Dict[str, float] = {}
-    blank_counts: Dict[str, int] = {}
-    for s in student_cols:
-        score = 0.0
-        blanks = 0
-        ans_list = answers_by_student[s]
-        for i in range(q_count):
-            a = ans_list[i]
-            c = corrects[i]
-            if a is None:
-                blanks += 1
-            if c is None or a is None:
-                continue
-            if a == c:
-                score += float(points_arr[i])
-        student_scores[s] = float(score)
-        blank_counts[s] = int(blanks)
+    student_scores: Dict[str, float] = dict(zip(student_cols, graded["scores"].tolist()))
+    blank_counts: Dict[str, int] = dict(zip(student_cols, graded["blanks"].tolist()))
 
     scores_rows = []
     for s in student_cols:
@@ -579,61 +564,43 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
 
     scores_rows.sort(key=lambda r: (-float(r[1]), str(r[0])))
     _write_excel_csv(
+        dataset,
         outdir / "analysis_scores.xlsx",
         ["學號/ID", "得分", "空白數", "滿分", "百分比"],
         scores_rows,
     )
-    _write_analysis_scores_by_class_xlsx(outdir)
+    _notify(on_artifact, "analysis_scores.xlsx")
+    _write_analysis_scores_by_class_xlsx(outdir, dataset)
+    if (outdir / "analysis_scores_by_class.xlsx").exists():
+        _notify(on_artifact, "analysis_scores_by_class.xlsx")
 
     # Per-item stats
     choices = ["A", "B", "C", "D", "E"]
     item_rows = []
 
-    all_scores = np.array([student_scores[s] for s in student_cols], dtype=float)
-    student_order = np.argsort(all_scores, kind="mergesort")
-    # Discrimination index: mean(correct_high) - mean(correct_low).
-    # If students > 30, use top/bottom 27%; otherwise use top/bottom 50%.
-    group_n = int(math.floor(s_count * 0.27)) if s_count > 30 else int(math.floor(s_count / 2.0))
-    low_idx = student_order[:group_n] if group_n > 0 else np.array([], dtype=int)
-    high_idx = student_order[-group_n:] if group_n > 0 else np.array([], dtype=int)
-
-    # Build answer matrix [q, s]
-    ans_mat = np.empty((q_count, s_count), dtype=object)
-    for j, s in enumerate(student_cols):
-        for i, a in enumerate(answers_by_student[s]):
-            ans_mat[i, j] = a
+    all_scores = graded["scores"]
+    # Discrimination index (see grading.grade): mean(correct_high) - mean(correct_low), with
+    # the top/bottom 27% of students above 30 students and the top/bottom 50% otherwise.
+    # Choice distributions: one uint8 bitmask per cell (see grading.choice_bitmasks) and one
+    # bincount of the mask values per item; every rate below is a sum over that [q, 256] table.
+    mask_counts = item_mask_counts(choice_bitmasks(codes, vocabulary, choices))
+    blank_rates = mask_counts[:, 0] / s_count
+    multi_rates = mask_counts[:, MASK_MULTI:].sum(axis=1) / s_count
+    other_rates = mask_counts[:, MASK_OTHER:MASK_MULTI].sum(axis=1) / s_count  # one non-choice character
+    choice_rates = {ch: mask_counts[:, 1 << k] / s_count for k, ch in enumerate(choices)}
 
     for i, qno in enumerate(q_numbers):
         c = corrects[i]
-        p = float(points_arr[i])
-        row_ans = ans_mat[i, :]
-
-        is_blank = np.array([a is None for a in row_ans], dtype=bool)
-        blank_rate = float(is_blank.mean())
-        multi_rate = float(np.mean([(a is not None and len(str(a)) > 1) for a in row_ans]))
-        other_rate = float(
-            np.mean(
-                [
-                    (a is not None and len(str(a)) <= 1 and str(a) not in choices)
-                    for a in row_ans
-                ]
-            )
-        )
+        p = float(points[i])
 
-        diff: Optional[float]
-        disc: Optional[float]
-        if c is None:
-            diff = None
-            disc = None
-        else:
-            correct_mask = np.array([(a == c) for a in row_ans], dtype=bool)
-            diff = float(correct_mask.mean())
-            if low_idx.size and high_idx.size:
-                disc = float(correct_mask[high_idx].mean() - correct_mask[low_idx].mean())
-            else:
-                disc = None
+        blank_rate = float(blank_rates[i])
+        multi_rate = float(multi_rates[i])
+        other_rate = float(other_rates[i])
 
-        p_choice = {ch: float(np.mean([(a == ch) for a in row_ans])) for ch in choices}
+        diff = None if math.isnan(graded["difficulty"][i]) else float(graded["difficulty"][i])
+        disc = None if math.isnan(graded["discrimination"][i]) else float(graded["discrimination"][i])
+
+        p_choice = {ch: float(choice_rates[ch][i]) for ch in choices}
 
         item_rows.append(
             [
@@ -650,10 +617,12 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
         )
 
     _write_excel_csv(
+        dataset,
         outdir / "analysis_item.xlsx",
         ["題號", "正解", "配分", "正確率", "鑑別度", "空白率", "複選率", "其他錯誤率", "A百分比", "B百分比", "C百分比", "D百分比", "E百分比"],
         item_rows,
     )
+    _notify(on_artifact, "analysis_item.xlsx")
 
     # Summary
     mean_v = float(statistics.mean(all_scores))
@@ -661,6 +630,7 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
     q88, q75, q50, q25, q12 = np.quantile(all_scores, [0.88, 0.75, 0.5, 0.25, 0.12])
 
     _write_excel_csv(
+        dataset,
         outdir / "analysis_summary.xlsx",
         ["學生人數", "總題數", "滿分", "平均分", "標準差", "P88", "P75", "中位數", "P25", "P12"],
         [
@@ -678,12 +648,14 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
             ]
         ],
     )
+    _notify(on_artifact, "analysis_summary.xlsx")
 
     # Generate PNG charts with error handling
     try:
         print(f"DEBUG: Generating score histogram to {outdir / 'analysis_score_hist.png'}")
         _score_histogram_png([float(x) for x in all_scores.tolist()], total_possible, outdir / "analysis_score_hist.png", lang=lang)
         print(f"DEBUG: Score histogram generated successfully")
+        _notify(on_artifact, "analysis_score_hist.png")
     except Exception as e:
         print(f"ERROR: Failed to generate score histogram: {e}")
         import traceback
@@ -701,6 +673,7 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
             lang=lang,
         )
         print(f"DEBUG: Item plot generated successfully")
+        _notify(on_artifact, "analysis_item_plot.png")
     except Exception as e:
         print(f"ERROR: Failed to generate item plot: {e}")
         import traceback
@@ -708,18 +681,29 @@ def run_analysis_template(template_csv_path: Path, outdir: Path, lang: str = "zh
 
 
 
-def generate_integrated_report(job_dir: Path, lang: str = "zh_TW") -> None:
+def generate_integrated_report(
+    job_dir: Path,
+    lang: str = "zh_TW",
+    on_artifact: Optional[Callable[[str], None]] = None,
+    dataset: Optional[JobDataset] = None,
+    write_xlsx: bool = True,
+    write_pdf: bool = True,
+) -> None:
     """
     Generates an integrated Excel and PDF report with a horizontal layout:
     Students as rows, Questions as columns.
     Layout: [Student Answers] -> [Graphs] -> [Item Statistics]
+    `on_artifact(filename)` is called after each output file is written.
+    Tables are read from `dataset` when given (else from the xlsx files in `job_dir`).
+    `write_xlsx` / `write_pdf` pick which of the two files to (re)build.
     """
+    dataset = dataset if dataset is not None else JobDataset(job_dir)
     item_csv = job_dir / "analysis_item.xlsx"
     scores_csv = job_dir / "analysis_scores.xlsx"
     template_csv = job_dir / "analysis_template.xlsx"
     roster_csv = job_dir / "roster.xlsx"
 
-    if not (item_csv.exists() and scores_csv.exists() and template_csv.exists()):
+    if not (dataset.exists(item_csv) and dataset.exists(scores_csv) and dataset.exists(template_csv)):
         return
 
     lang_norm = (lang or "").strip().lower().replace("-", "_")
@@ -727,9 +711,9 @@ def generate_integrated_report(job_dir: Path, lang: str = "zh_TW") -> None:
 
     # 1. Read Data
     try:
-        _, item_stats_list = _read_table_dicts(item_csv)
-        score_headers, student_scores_list = _read_table_dicts(scores_csv)
-        template_headers, matrix_rows = _read_table_dicts(template_csv)
+        _, item_stats_list = dataset.table_dicts(item_csv)
+        score_headers, student_scores_list = dataset.table_dicts(scores_csv)
+        template_headers, matrix_rows = dataset.table_dicts(template_csv)
         all_cols = template_headers or []
         student_cols = [c for c in all_cols if c not in ("number", "correct", "points")]
     except Exception:
@@ -797,11 +781,15 @@ def generate_integrated_report(job_dir: Path, lang: str = "zh_TW") -> None:
 
     # Write Excel
     out_xlsx = job_dir / "試題分析整合檔.xlsx"
-    try:
-        from .xlsx import write_simple_xlsx
-        write_simple_xlsx(out_xlsx, excel_rows)
-    except Exception:
-        pass
+    if write_xlsx:
+        try:
+            dataset.write_xlsx(out_xlsx, excel_rows)
+        except Exception:
+            pass
+        else:
+            _notify(on_artifact, out_xlsx.name)
+    if not write_pdf:
+        return
 
     # 3. Generate PDF (Standard Integrated Report)
     # [DELETE] Old version removed to unify output
@@ -819,6 +807,7 @@ def generate_integrated_report(job_dir: Path, lang: str = "zh_TW") -> None:
         is_zh=is_zh,
         is_precision=True
     )
+    _notify(on_artifact, out_pdf_v2.name)
 
 
 from reportlab.platypus import Flowable
@@ -1046,7 +1035,7 @@ def _generate_integrated_pdf_v2(
             chart_row = [t.get("label_trend", "答對率趨勢線"), ""] + [""] * (num_cols - 2)
             rows.append(chart_row)
 
-        t = Table(rows, repeatRows=1, colWidths=col_w, hAlign='LEFT')
+        table = Table(rows, repeatRows=1, colWidths=col_w, hAlign='LEFT')
         style = [
             ('FONT', (0, 0), (-1, -1), font_name),
             ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
@@ -1077,10 +1066,10 @@ def _generate_integrated_pdf_v2(
             style.append(('RIGHTPADDING', (2, chart_row_idx), (-1, chart_row_idx), 0))
             # Insert the Flowable
             inner_chart = PrecisionGridChart(chart_data, col_w, height=chart_height, font_name=font_name)
-            t._cellvalues[chart_row_idx][2] = inner_chart
+            table._cellvalues[chart_row_idx][2] = inner_chart
 
-        t.setStyle(TableStyle(style))
-        return t
+        table.setStyle(TableStyle(style))
+        return table
 
     # 1. Styles
     section_style = ParagraphStyle('Sect', parent=styles['Heading2'], fontName=font_name, fontSize=11, spaceBefore=2, spaceAfter=2)
@@ -0,0 +1,120 @@
+"""
+Dependency-aware scheduling of a job's output artifacts.
+
+Once a scan is recognized, most report outputs only depend on one or two earlier ones (the
+analysis template feeds the analysis tables, which feed the integrated report, …). run_artifact_dag
+starts every artifact as soon as everything it depends on has been built, on a small thread pool,
+and reports per-artifact status and wall time so callers can record them in the job metadata.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+ArtifactTask = Tuple[Callable[[], Any], Sequence[str]]
+
+
+def _check_dag(tasks: Dict[str, ArtifactTask]) -> None:
+    for name, (_, deps) in tasks.items():
+        for dep in deps:
+            if dep not in tasks:
+                raise ValueError(f"artifact {name!r} depends on unknown artifact {dep!r}")
+    visiting: Dict[str, bool] = {}
+
+    def visit(name: str) -> None:
+        state = visiting.get(name)
+        if state is True:
+            raise ValueError(f"artifact dependency cycle through {name!r}")
+        if state is False:
+            return
+        visiting[name] = True
+        for dep in tasks[name][1]:
+            visit(dep)
+        visiting[name] = False
+
+    for name in tasks:
+        visit(name)
+
+
+def run_artifact_dag(
+    tasks: Dict[str, ArtifactTask],
+    workers: int = 1,
+    on_finish: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run `tasks` ({name: (fn, deps)}), each once all of its `deps` have succeeded.
+
+    Up to `workers` tasks run at a time in threads (`workers` <= 1 runs them in this thread, in
+    dependency order). A task that raises is recorded as failed and the tasks depending on it,
+    directly or not, are skipped; the exception is not re-raised. `on_finish(name, record)` is
+    called in the calling thread after each task ends.
+
+    Returns {name: record} in the order of `tasks`, with record =
+    {"status": "ok" | "failed" | "skipped", "seconds": wall time, "error": message (failed only),
+    "result": fn's return value (ok only)}.
+    """
+    _check_dag(tasks)
+    records: Dict[str, Dict[str, Any]] = {}
+    pending = dict(tasks)
+
+    def run(name: str) -> Dict[str, Any]:
+        fn = tasks[name][0]
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as exc:
+            print(f"WARNING: Failed to build {name}: {exc}")
+            return {
+                "status": "failed",
+                "seconds": round(time.perf_counter() - started, 3),
+                "error": str(exc) or exc.__class__.__name__,
+            }
+        return {"status": "ok", "seconds": round(time.perf_counter() - started, 3), "result": result}
+
+    def finish(name: str, record: Dict[str, Any]) -> None:
+        records[name] = record
+        if on_finish is not None:
+            on_finish(name, record)
+
+    def skip_blocked() -> None:
+        # Anything downstream of a failed/skipped artifact will never run.
+        changed = True
+        while changed:
+            changed = False
+            for name, (_, deps) in list(pending.items()):
+                if any(records.get(dep, {}).get("status") in {"failed", "skipped"} for dep in deps):
+                    del pending[name]
+                    finish(name, {"status": "skipped", "seconds": 0.0})
+                    changed = True
+
+    def ready() -> list:
+        return [
+            name
+            for name, (_, deps) in pending.items()
+            if all(records.get(dep, {}).get("status") == "ok" for dep in deps)
+        ]
+
+    if workers <= 1:
+        while pending:
+            skip_blocked()
+            for name in ready():
+                del pending[name]
+                finish(name, run(name))
+                skip_blocked()
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifact") as pool:
+            running: Dict[Future, str] = {}
+            while pending or running:
+                skip_blocked()
+                for name in ready():
+                    del pending[name]
+                    running[pool.submit(run, name)] = name
+                if not running:
+                    continue
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(running.pop(future), future.result())
+
+    return {name: records[name] for name in tasks}
@@ -1,7 +1,8 @@
 import math
 from typing import Dict, List
 
-# PDF coordinates are in "points" (1/72 inch). All layout constants mirror engine.generator.
+# PDF coordinates are in "points" (1/72 inch). Bubble, answer box and corner mark geometry is
+# defined here only; engine.generator draws it through engine.template.SheetTemplate.
 
 PAGE_W_PT = 595  # A4 width in points
 PAGE_H_PT = 842  # A4 height in points
@@ -38,7 +39,7 @@ SEAT_BOX_Y0 = PAGE_H_PT - 205
 SEAT_CIRCLE_RADIUS = 6.0
 SEAT_DIGITS = list(range(10))
 SEAT_STEP_X = 16
-# Keep in sync with engine/generator.py (seat bubbles shifted right).
+# Seat bubbles shifted right so the row labels don't touch the first circle.
 SEAT_START_X = SEAT_BOX_X0 + 38
 SEAT_TOP_ROW_Y = SEAT_BOX_Y0 + 40
 SEAT_BOTTOM_ROW_Y = SEAT_BOX_Y0 + 18
@@ -60,7 +61,7 @@ BUBBLE_RADIUS = 6.0
 COL_COUNT = 3
 MAX_QUESTIONS = 100
 
-# Layout helpers (match engine.generator)
+# Answer grid: question-number area and gap before the first bubble of each column
 Q_NUM_AREA_W = 30
 GAP_AFTER_NUM = 10
 
@@ -72,23 +73,33 @@ def make_choices(choices_count: int) -> List[str]:
     return [chr(ord("A") + i) for i in range(choices_count)]
 
 
-def compute_answer_layout(num_questions: int, choices_count: int = DEFAULT_CHOICES_COUNT) -> Dict:
+def compute_answer_layout(
+    num_questions: int,
+    choices_count: int = DEFAULT_CHOICES_COUNT,
+    page_w: float = PAGE_W_PT,
+    page_h: float = PAGE_H_PT,
+) -> Dict:
     """
-    Mirror engine.generator.compute_question_layout for recognizer.
+    Answer grid layout shared by the generator (drawing) and the recognizer (via SheetTemplate).
 
     Note: Question *positions* are fixed (based on MAX_QUESTIONS). Different `num_questions`
     simply read a prefix subset (e.g., Q1–Q10 positions are identical on 10Q vs 20Q sheets).
+
+    `page_w`/`page_h` lay the grid out on a page of another size (the generator draws on
+    ReportLab's exact A4); edges anchored to the right/top move with the page like they do there.
     """
     num_questions = max(1, min(MAX_QUESTIONS, int(num_questions)))
     choices = make_choices(choices_count)
-    box_w = BOX_X1 - BOX_X0
+    box_x1 = page_w - (PAGE_W_PT - BOX_X1)
+    box_y1 = page_h - (PAGE_H_PT - BOX_Y1)
+    box_w = box_x1 - BOX_X0
     col_w = box_w / COL_COUNT
     rows_per_col = int(math.ceil(MAX_QUESTIONS / COL_COUNT))
 
     inner_x0 = BOX_X0 + BOX_PAD
-    inner_x1 = BOX_X1 - BOX_PAD
+    inner_x1 = box_x1 - BOX_PAD
     inner_y0 = BOX_Y0 + BOX_PAD
-    inner_y1 = BOX_Y1 - BOX_PAD
+    inner_y1 = box_y1 - BOX_PAD
 
     header_y = inner_y1 - 10
     first_row_y = inner_y1 - 30
@@ -127,8 +138,17 @@ def compute_answer_layout(num_questions: int, choices_count: int = DEFAULT_CHOIC
 
     return {
         "rows_per_col": rows_per_col,
+        "header_y": header_y,
         "first_row_y": first_row_y,
         "row_step": row_step,
         "bubble_xs": bubble_xs,
         "q_num_right_x": q_num_right_x,
+        "box_x0": BOX_X0,
+        "box_x1": box_x1,
+        "box_y0": BOX_Y0,
+        "box_y1": box_y1,
+        "inner_x0": inner_x0,
+        "inner_x1": inner_x1,
+        "inner_y0": inner_y0,
+        "inner_y1": inner_y1,
     }
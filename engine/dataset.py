@@ -0,0 +1,79 @@
+"""
+In-memory tables of one job, shared by every pipeline stage.
+
+Recognition, the answer-key step and the analysis each used to write an xlsx file and the next
+stage parsed it back. A JobDataset keeps those tables in memory as they are produced: writers go
+through `write_xlsx` (the xlsx is still written, as an export for download) and readers call
+`table` / `table_dicts`, which only fall back to parsing the file for tables this run did not
+produce (e.g. a job folder from an older run).
+
+Tables are stored exactly as read_simple_xlsx_table would return them after the round trip
+(see xlsx.table_from_rows), so a stage reads the same strings from memory as from disk.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .xlsx import read_simple_xlsx_table, table_from_rows, write_simple_xlsx, write_simple_xlsx_multi
+
+Table = List[List[str]]
+
+
+def table_dicts(table: Table) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Split a table into (stripped header, one dict per row keyed by non-empty header names)."""
+    if not table:
+        return [], []
+    header = [str(x or "").strip() for x in table[0]]
+    rows: List[Dict[str, str]] = []
+    for raw_row in table[1:]:
+        row: Dict[str, str] = {}
+        for idx, name in enumerate(header):
+            if not name:
+                continue
+            row[name] = str(raw_row[idx] if idx < len(raw_row) else "")
+        rows.append(row)
+    return header, rows
+
+
+class JobDataset:
+    """
+    The tables of one job folder, keyed by file name (results.xlsx, roster.xlsx,
+    analysis_template.xlsx, analysis_scores.xlsx, …).
+    """
+
+    def __init__(self, job_dir: Optional[Path] = None):
+        self.job_dir = Path(job_dir) if job_dir is not None else None
+        self._tables: Dict[str, Table] = {}
+
+    def __contains__(self, path: Any) -> bool:
+        return Path(path).name in self._tables
+
+    def put(self, path: Any, rows: List[List[Any]]) -> None:
+        """Keep `rows` (as written to `path`) in memory, in their read-back form."""
+        self._tables[Path(path).name] = table_from_rows(rows)
+
+    def write_xlsx(self, path: Any, rows: List[List[Any]], sheet_name: str = "Sheet1") -> None:
+        write_simple_xlsx(Path(path), rows=rows, sheet_name=sheet_name)
+        self.put(path, rows)
+
+    def write_xlsx_multi(self, path: Any, sheets: List[Tuple[str, List[List[Any]]]]) -> None:
+        write_simple_xlsx_multi(Path(path), sheets=sheets)
+        # Readers only ever see the first worksheet.
+        self.put(path, sheets[0][1] if sheets else [[""]])
+
+    def exists(self, path: Any) -> bool:
+        return path in self or Path(path).exists()
+
+    def table(self, path: Any, reader: Callable[[Path], Table] = read_simple_xlsx_table) -> Table:
+        """The table of `path`: from memory, else parsed with `reader` once and kept."""
+        name = Path(path).name
+        table = self._tables.get(name)
+        if table is None:
+            table = reader(Path(path))
+            self._tables[name] = table
+        return table
+
+    def table_dicts(self, path: Any) -> Tuple[List[str], List[Dict[str, str]]]:
+        return table_dicts(self.table(path))
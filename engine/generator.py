@@ -9,7 +9,7 @@ Your requested layout tweaks:
    - Vertical placement also uses the box height tightly (smaller top offsets).
 
 2) 身分資訊分隔線對齊答案區方框
-   - Divider line now uses BOX_X0..BOX_X1 (same as the answer box).
+   - Divider line now spans the answer box (box_x0..box_x1).
 
 3) 年級 / 班級整組再往左
    - First bubble center for 年級/班級 aligns with NAME underline start (NAME_LINE_X0).
@@ -19,16 +19,18 @@ Notes:
 - Bubble radius slightly smaller (6.0pt).
 - Strict assertions ensure no bubble can ever be outside the inner padded box.
 
+Bubble positions, the answer box and the corner marks come from the shared SheetTemplate /
+engine.config, so the recognizer reads exactly what is drawn here.
+
 CLI:
-  python generator.py --subject 國文 --questions 100 --out answer_sheet.pdf
+  python -m engine.generator --subject 國文 --questions 100 --out answer_sheet.pdf
 """
 
 from __future__ import annotations
 
 import argparse
-import math
 from pathlib import Path
-from typing import Union
+from typing import Optional, Union
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4
@@ -36,14 +38,23 @@ from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 
+from .config import (
+    PAGE_W_PT, PAGE_H_PT,
+    CORNER_MARK_MARGIN, CORNER_MARK_SIZE,
+    LEFT_X, NAME_LINE_Y, NAME_LINE_X0, NAME_LINE_X1,
+    SEAT_BOX_W, SEAT_BOX_H, SEAT_BOX_X0 as CFG_SEAT_BOX_X0, SEAT_BOX_Y0 as CFG_SEAT_BOX_Y0,
+    DIVIDER_Y as CFG_DIVIDER_Y,
+    MIN_CHOICES_COUNT, MAX_CHOICES_COUNT, DEFAULT_CHOICES_COUNT, MAX_QUESTIONS,
+)
+from .template import (
+    FIELD_GRADE, FIELD_CLASS, FIELD_SEAT_TENS, FIELD_SEAT_ONES,
+    SheetTemplate, get_sheet_template,
+)
+
 PAGE_W, PAGE_H = A4
 
 DEFAULT_TITLE = "定期評量 答案卷"
 
-# Corner alignment squares
-CORNER_MARK_MARGIN = 18
-CORNER_MARK_SIZE = 24
-
 # CJK font
 _CJK_FONT_NAME = "STSong-Light"
 _CJK_READY = False
@@ -69,8 +80,10 @@ def set_font_lat(c: canvas.Canvas, size: int, bold: bool=False):
 # -----------------------------
 # Header
 # -----------------------------
-LEFT_X = 45
-RIGHT_X = PAGE_W - 45
+# engine.config lays the sheet out on a 595 x 842 pt page; ReportLab's A4 is a fraction of a
+# point larger, and everything anchored to the top/right edge moves with it (as in SheetTemplate).
+_DX = PAGE_W - PAGE_W_PT
+_DY = PAGE_H - PAGE_H_PT
 
 TITLE_Y = PAGE_H - 70
 SUBTITLE_Y = PAGE_H - 95
@@ -79,152 +92,16 @@ HEADER_LINE_Y = PAGE_H - 110
 # -----------------------------
 # Identity area
 # -----------------------------
-NAME_Y = PAGE_H - 145
-NAME_LINE_X0 = LEFT_X + 40
-NAME_LINE_X1 = LEFT_X + 195
-
-GRADE_Y = PAGE_H - 174
-GRADE_VALUES = [7, 8, 9, 10, 11, 12]
-GRADE_RADIUS = 6.2
-GRADE_X0 = NAME_LINE_X0  # align with name underline start
-GRADE_STEP = 26
-
-CLASS_Y = PAGE_H - 199
-CLASS_VALUES = list(range(10))  # 0 is reserved/unused (kept for recognizer alignment)
-CLASS_RADIUS = 6.2
-CLASS_X0 = NAME_LINE_X0  # align with name underline start
-CLASS_STEP = 21
+NAME_Y = NAME_LINE_Y + _DY
 
 # numeric labels above bubbles (already moved down; keep a bit lower)
 BUBBLE_LABEL_DY = 9
 
 # Seat box (top-right block)
-SEAT_BOX_W = 200
-SEAT_BOX_H = 62
-SEAT_BOX_X0 = RIGHT_X - SEAT_BOX_W
-SEAT_BOX_Y0 = PAGE_H - 205
-SEAT_RADIUS = 6.0
-SEAT_DIGITS = list(range(10))
-SEAT_STEP = 16
-# Shift bubbles right so labels don't touch the first circle.
-SEAT_X0 = SEAT_BOX_X0 + 38
-SEAT_TOP_Y = SEAT_BOX_Y0 + 40
-SEAT_BOTTOM_Y = SEAT_BOX_Y0 + 18
-
-DIVIDER_Y = PAGE_H - 220
-
-
-# -----------------------------
-# Answer Region (BLACK reference box)
-# -----------------------------
-BOX_X0 = 25
-BOX_X1 = PAGE_W - 25
-BOX_Y1 = DIVIDER_Y - 12
-BOX_Y0 = 55
-
-BOX_PAD = 10
+SEAT_BOX_X0 = CFG_SEAT_BOX_X0 + _DX
+SEAT_BOX_Y0 = CFG_SEAT_BOX_Y0 + _DY
 
-BUBBLE_RADIUS = 6.0
-MIN_CHOICES_COUNT = 3
-MAX_CHOICES_COUNT = 5
-DEFAULT_CHOICES_COUNT = 4
-COLS = 3
-MAX_QUESTIONS = 100
-
-
-def make_choices(choices_count: int):
-    choices_count = int(choices_count)
-    if not (MIN_CHOICES_COUNT <= choices_count <= MAX_CHOICES_COUNT):
-        raise ValueError(f"choices_count must be {MIN_CHOICES_COUNT}–{MAX_CHOICES_COUNT}")
-    return [chr(ord("A") + i) for i in range(choices_count)]
-
-
-# -----------------------------
-# Validation
-# -----------------------------
-def _assert_inside_box(x: float, y: float, r: float, x0: float, y0: float, x1: float, y1: float, label: str):
-    if x - r < x0 or x + r > x1 or y - r < y0 or y + r > y1:
-        raise ValueError(
-            f"{label} is outside Answer Box: center=({x:.2f},{y:.2f}) r={r:.2f} "
-            f"box=({x0:.2f},{y0:.2f})-({x1:.2f},{y1:.2f})"
-        )
-
-
-def compute_question_layout(num_questions: int, choices_count: int = DEFAULT_CHOICES_COUNT):
-    """
-    Compute positions so that the black rectangle "fits" the answer grid more tightly.
-
-    Note: Question *positions* are fixed (based on MAX_QUESTIONS). Different `num_questions`
-    simply render a prefix subset (e.g., Q1–Q10 positions are identical on 10Q vs 20Q sheets).
-    """
-    num_questions = int(max(1, min(MAX_QUESTIONS, num_questions)))
-    choices = make_choices(choices_count)
-    box_w = BOX_X1 - BOX_X0
-    col_w = box_w / COLS
-    rows_per_col = int(math.ceil(MAX_QUESTIONS / COLS))
-
-    inner_x0_all = BOX_X0 + BOX_PAD
-    inner_x1_all = BOX_X1 - BOX_PAD
-    inner_y0_all = BOX_Y0 + BOX_PAD
-    inner_y1_all = BOX_Y1 - BOX_PAD
-
-    # tighter top offsets
-    header_y = inner_y1_all - 10
-    first_row_y = inner_y1_all - 30
-
-    bottom_limit = inner_y0_all + BUBBLE_RADIUS
-    usable = first_row_y - bottom_limit
-    row_step = 0.0 if rows_per_col <= 1 else usable / (rows_per_col - 1)
-
-    min_step = 2 * BUBBLE_RADIUS + 1.0
-    if rows_per_col > 1 and row_step < min_step:
-        raise ValueError(
-            f"Row spacing too small: {row_step:.2f} < {min_step:.2f}. "
-            "Increase BOX height, reduce bubble size, or increase columns."
-        )
-
-    # Per-column X: fill usable width
-    q_num_area_w = 30
-    gap_after_num = 10
-
-    col_x0s = [BOX_X0 + i * col_w for i in range(COLS)]
-    bubble_xs = []
-    q_num_right_x = []
-
-    for ci, cx0 in enumerate(col_x0s):
-        inner_left = cx0 + BOX_PAD
-        inner_right = cx0 + col_w - BOX_PAD
-
-        q_right = inner_left + q_num_area_w
-
-        xA = q_right + gap_after_num + BUBBLE_RADIUS
-        x_last = inner_right - BUBBLE_RADIUS
-        step = (x_last - xA) / float(len(choices) - 1)
-        xs = [xA + i * step for i in range(len(choices))]
-
-        # Validate X positions with first_row_y
-        for j, x in enumerate(xs):
-            _assert_inside_box(
-                x, first_row_y, BUBBLE_RADIUS,
-                inner_left, inner_y0_all, inner_right, inner_y1_all,
-                label=f"col{ci} {choices[j]} (x-check)"
-            )
-
-        bubble_xs.append(xs)
-        q_num_right_x.append(q_right)
-
-    return {
-        "rows_per_col": rows_per_col,
-        "header_y": header_y,
-        "first_row_y": first_row_y,
-        "row_step": row_step,
-        "bubble_xs": bubble_xs,
-        "q_num_right_x": q_num_right_x,
-        "inner_x0": inner_x0_all,
-        "inner_x1": inner_x1_all,
-        "inner_y0": inner_y0_all,
-        "inner_y1": inner_y1_all,
-    }
+DIVIDER_Y = CFG_DIVIDER_Y + _DY
 
 
 # -----------------------------
@@ -239,7 +116,18 @@ def draw_corner_marks(c: canvas.Canvas):
     c.rect(m, m, s, s, fill=1, stroke=0)
     c.rect(PAGE_W - m - s, m, s, s, fill=1, stroke=0)
 
-def draw_header(c: canvas.Canvas, title_text: str, subject: str, subject_label: str):
+def sheet_template(num_questions: int = 1, choices_count: int = DEFAULT_CHOICES_COUNT) -> SheetTemplate:
+    """The shared bubble template, laid out on this module's (ReportLab) A4 page."""
+    return get_sheet_template(num_questions, choices_count, zoom=1.0, page_w=PAGE_W, page_h=PAGE_H)
+
+def draw_header(
+    c: canvas.Canvas,
+    title_text: str,
+    subject: str,
+    subject_label: str,
+    template: Optional[SheetTemplate] = None,
+):
+    layout = (template or sheet_template()).layout
     c.setFillColor(colors.black)
     set_font_cjk(c, 20)
     c.drawCentredString(PAGE_W / 2, TITLE_Y, title_text)
@@ -250,9 +138,10 @@ def draw_header(c: canvas.Canvas, title_text: str, subject: str, subject_label:
 
     c.setStrokeColor(colors.black)
     c.setLineWidth(1.0)
-    c.line(BOX_X0, HEADER_LINE_Y, BOX_X1, HEADER_LINE_Y)  # align with answer box too
+    c.line(layout["box_x0"], HEADER_LINE_Y, layout["box_x1"], HEADER_LINE_Y)  # align with answer box too
 
-def draw_identity(c: canvas.Canvas):
+def draw_identity(c: canvas.Canvas, template: Optional[SheetTemplate] = None):
+    template = template or sheet_template()
     set_font_cjk(c, 12)
     c.setFillColor(colors.black)
 
@@ -262,23 +151,15 @@ def draw_identity(c: canvas.Canvas):
     c.setLineWidth(0.9)
     c.line(NAME_LINE_X0, NAME_Y - 2, NAME_LINE_X1, NAME_Y - 2)
 
-    # Grade
-    set_font_cjk(c, 12)
-    c.drawString(LEFT_X, GRADE_Y - 2, "年級")
-    set_font_lat(c, 9, bold=False)
-    for i, v in enumerate(GRADE_VALUES):
-        x = GRADE_X0 + i * GRADE_STEP
-        c.drawCentredString(x, GRADE_Y + BUBBLE_LABEL_DY, str(v))
-        c.circle(x, GRADE_Y, GRADE_RADIUS, stroke=1, fill=0)
-
-    # Class
-    set_font_cjk(c, 12)
-    c.drawString(LEFT_X, CLASS_Y - 2, "班級")
-    set_font_lat(c, 9, bold=False)
-    for i, v in enumerate(CLASS_VALUES):
-        x = CLASS_X0 + i * CLASS_STEP
-        c.drawCentredString(x, CLASS_Y + BUBBLE_LABEL_DY, str(v))
-        c.circle(x, CLASS_Y, CLASS_RADIUS, stroke=1, fill=0)
+    # Grade / class: one row of bubbles each, labelled with their values
+    for field, title in ((FIELD_GRADE, "年級"), (FIELD_CLASS, "班級")):
+        bubbles = template.points(field)
+        set_font_cjk(c, 12)
+        c.drawString(LEFT_X, bubbles[0][1] - 2, title)
+        set_font_lat(c, 9, bold=False)
+        for v, (x, y, r) in zip(template.field_labels[template.field_index[field]], bubbles):
+            c.drawCentredString(x, y + BUBBLE_LABEL_DY, v)
+            c.circle(x, y, r, stroke=1, fill=0)
 
     # Seat box
     c.setStrokeColor(colors.black)
@@ -290,35 +171,59 @@ def draw_identity(c: canvas.Canvas):
     c.drawString(SEAT_BOX_X0 - 26, SEAT_BOX_Y0 + 18, "號")
 
     # Labels for tens / ones
+    tens = template.points(FIELD_SEAT_TENS)
+    ones = template.points(FIELD_SEAT_ONES)
     set_font_cjk(c, 9)
     label_x = SEAT_BOX_X0 + 4
     label_dy = -3
-    c.drawString(label_x, SEAT_TOP_Y + label_dy, "十位")
-    c.drawString(label_x, SEAT_BOTTOM_Y + label_dy, "個位")
+    c.drawString(label_x, tens[0][1] + label_dy, "十位")
+    c.drawString(label_x, ones[0][1] + label_dy, "個位")
 
     set_font_lat(c, 8, bold=False)
-    for i, d in enumerate(SEAT_DIGITS):
-        x = SEAT_X0 + i * SEAT_STEP
-        c.drawCentredString(x, SEAT_TOP_Y + 10, str(d))
-        c.circle(x, SEAT_TOP_Y, SEAT_RADIUS, stroke=1, fill=0)
-        c.drawCentredString(x, SEAT_BOTTOM_Y + 7, str(d))
-        c.circle(x, SEAT_BOTTOM_Y, SEAT_RADIUS, stroke=1, fill=0)
+    digits = template.field_labels[template.field_index[FIELD_SEAT_TENS]]
+    for d, (x, top_y, top_r), (bx, bottom_y, bottom_r) in zip(digits, tens, ones):
+        c.drawCentredString(x, top_y + 10, d)
+        c.circle(x, top_y, top_r, stroke=1, fill=0)
+        c.drawCentredString(bx, bottom_y + 7, d)
+        c.circle(bx, bottom_y, bottom_r, stroke=1, fill=0)
 
     # Divider aligned with box
+    layout = template.layout
     c.setLineWidth(1.0)
-    c.line(BOX_X0, DIVIDER_Y, BOX_X1, DIVIDER_Y)
+    c.line(layout["box_x0"], DIVIDER_Y, layout["box_x1"], DIVIDER_Y)
 
-def draw_answer_box(c: canvas.Canvas):
+def draw_answer_box(c: canvas.Canvas, template: Optional[SheetTemplate] = None):
+    layout = (template or sheet_template()).layout
     c.setStrokeColor(colors.black)
     c.setLineWidth(2.0)
-    c.rect(BOX_X0, BOX_Y0, BOX_X1 - BOX_X0, BOX_Y1 - BOX_Y0, stroke=1, fill=0)
+    c.rect(
+        layout["box_x0"],
+        layout["box_y0"],
+        layout["box_x1"] - layout["box_x0"],
+        layout["box_y1"] - layout["box_y0"],
+        stroke=1,
+        fill=0,
+    )
 
-def draw_questions(c: canvas.Canvas, num_questions: int, choices_count: int = DEFAULT_CHOICES_COUNT):
-    layout = compute_question_layout(num_questions, choices_count=choices_count)
-    choices = make_choices(choices_count)
+def _assert_inside_box(x: float, y: float, r: float, x0: float, y0: float, x1: float, y1: float, label: str):
+    if x - r < x0 or x + r > x1 or y - r < y0 or y + r > y1:
+        raise ValueError(
+            f"{label} is outside Answer Box: center=({x:.2f},{y:.2f}) r={r:.2f} "
+            f"box=({x0:.2f},{y0:.2f})-({x1:.2f},{y1:.2f})"
+        )
+
+def draw_questions(
+    c: canvas.Canvas,
+    num_questions: int,
+    choices_count: int = DEFAULT_CHOICES_COUNT,
+    template: Optional[SheetTemplate] = None,
+):
+    template = template or sheet_template(num_questions, choices_count)
+    layout = template.layout
+    choices = template.choices
 
     rows = layout["rows_per_col"]
-    used_cols = min(COLS, int(math.ceil(num_questions / rows)))
+    used_cols = min(len(layout["bubble_xs"]), -(-num_questions // rows))
 
     # Choice headers
     set_font_lat(c, 10, bold=False)
@@ -332,9 +237,6 @@ def draw_questions(c: canvas.Canvas, num_questions: int, choices_count: int = DE
     c.setStrokeColor(colors.black)
     set_font_lat(c, 9, bold=False)
 
-    first_y = layout["first_row_y"]
-    step_y = layout["row_step"]
-
     inner_x0 = layout["inner_x0"]
     inner_x1 = layout["inner_x1"]
     inner_y0 = layout["inner_y0"]
@@ -345,29 +247,26 @@ def draw_questions(c: canvas.Canvas, num_questions: int, choices_count: int = DE
         for r in range(rows):
             if q > num_questions:
                 break
-            y = first_y - r * step_y
-
-            # y validation
-            _assert_inside_box((inner_x0 + inner_x1) / 2, y, BUBBLE_RADIUS, inner_x0, inner_y0, inner_x1, inner_y1, f"row-y q{q}")
+            bubbles = template.points(template.question_field(q))
+            y = bubbles[0][1]
 
             # question number (right-aligned inside the number area)
             qx = layout["q_num_right_x"][col]
             c.drawRightString(qx, y - 3.0, f"{q}.")
 
             # bubbles
-            xs = layout["bubble_xs"][col]
-            for j, x in enumerate(xs):
+            for j, (x, y, radius) in enumerate(bubbles):
                 _assert_inside_box(
                     x,
                     y,
-                    BUBBLE_RADIUS,
+                    radius,
                     inner_x0,
                     inner_y0,
                     inner_x1,
                     inner_y1,
                     f"bubble q{q} {choices[j]}",
                 )
-                c.circle(x, y, BUBBLE_RADIUS, stroke=1, fill=0)
+                c.circle(x, y, radius, stroke=1, fill=0)
 
             q += 1
 
@@ -394,11 +293,12 @@ def generate_answer_sheet_pdf(
     out_pdf_path = Path(out_pdf_path)
 
     c = canvas.Canvas(str(out_pdf_path), pagesize=A4)
+    template = sheet_template(num_questions, choices_count)
     draw_corner_marks(c)
-    draw_header(c, title_text=title_text, subject=subject, subject_label=subject_label)
-    draw_identity(c)
-    draw_answer_box(c)
-    draw_questions(c, num_questions=num_questions, choices_count=choices_count)
+    draw_header(c, title_text=title_text, subject=subject, subject_label=subject_label, template=template)
+    draw_identity(c, template)
+    draw_answer_box(c, template)
+    draw_questions(c, num_questions=num_questions, choices_count=choices_count, template=template)
     draw_footer(c, footer_text=footer_text)
     c.showPage()
     c.save()
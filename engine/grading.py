@@ -0,0 +1,181 @@
+"""
+Vectorized grading shared by every report writer.
+
+Answers are integer-coded once (encode_answers): code 0 is a blank cell and every other distinct
+normalized answer string gets its own code, with the answer key coded over the same vocabulary.
+Correctness is then a single array comparison, and grade() derives every per-student and
+per-item figure the reports need from boolean masks, without a Python loop over cells.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+BLANK = 0
+
+# choice_bitmasks: one bit per choice letter (A = bit 0 …), plus these two flags.
+MASK_OTHER = 0x40  # a character that is not one of the choices
+MASK_MULTI = 0x80  # more than one character (e.g. a multi-select "AB")
+
+
+def normalize_answer(value: Any) -> str:
+    return ("" if value is None else str(value)).strip().upper()
+
+
+def encode_answers(
+    answers: Sequence[Sequence[Any]],
+    key: Sequence[Any],
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """
+    Integer-code an items × students grid of answer cells and the per-item key.
+
+    Cells are normalized (strip, upper case); blank cells and items without a key get code 0.
+    Returns (answer codes int32 [items, students], key codes int32 [items], vocabulary), where
+    vocabulary[code] is the normalized answer. Every row of `answers` must have one cell per student.
+    """
+    vocabulary: List[str] = [""]
+    code_of: Dict[str, int] = {"": BLANK}
+    raw_code: Dict[Any, int] = {}
+
+    def code(value: Any) -> int:
+        c = raw_code.get(value)
+        if c is None:
+            text = normalize_answer(value)
+            c = code_of.get(text)
+            if c is None:
+                c = code_of[text] = len(vocabulary)
+                vocabulary.append(text)
+            raw_code[value] = c
+        return c
+
+    n_items = len(answers)
+    n_students = len(answers[0]) if n_items else 0
+    key_codes = np.fromiter((code(v) for v in key), dtype=np.int32, count=len(key))
+    codes = np.fromiter(
+        (code(v) for row in answers for v in row),
+        dtype=np.int32,
+        count=n_items * n_students,
+    ).reshape(n_items, n_students)
+    return codes, key_codes, vocabulary
+
+
+def discrimination_group_size(n_students: int) -> int:
+    """Students in each of the upper/lower groups: 27% above 30 students, else half."""
+    if n_students > 30:
+        return int(math.floor(n_students * 0.27))
+    return int(math.floor(n_students / 2.0))
+
+
+def grade(
+    answer_codes: np.ndarray,
+    key_codes: np.ndarray,
+    points: Sequence[float],
+    vocabulary: Sequence[str],
+) -> Dict[str, Any]:
+    """
+    Grade an encoded items × students answer matrix in one vectorized pass.
+
+    Students are ranked by score for the upper/lower discrimination groups with a stable sort,
+    so ties keep their column order; order the columns to choose the tie-break. Returns:
+
+        correct, blank, multi   bool [items, students] (multi: answer longer than one letter)
+        keyed                   bool [items], the item has a key
+        scores                  float64 [students], points of correctly answered keyed items
+        blanks                  int64 [students], blank cells per student
+        total_possible          float, points of the keyed items
+        difficulty              float64 [items], share answering correctly (NaN if not keyed)
+        discrimination          float64 [items], upper minus lower group difficulty
+                                (NaN if not keyed or the groups are empty)
+        item_blank, item_wrong  int64 [items], blank / answered-but-wrong cells per item
+                                (item_wrong is 0 for items without a key)
+        order                   int64 [students], column indices from lowest to highest score
+    """
+    codes = np.asarray(answer_codes)
+    key = np.asarray(key_codes)
+    points_arr = np.asarray(points, dtype=float)
+    n_items, n_students = codes.shape
+
+    keyed = key != BLANK
+    blank = codes == BLANK
+    correct = (codes == key[:, None]) & keyed[:, None]
+    multi_code = np.fromiter((len(v) > 1 for v in vocabulary), dtype=bool, count=len(vocabulary))
+    multi = multi_code[codes]
+
+    # cumsum adds the items strictly in order (sum() may pair them up), so the scores match a
+    # per-student running total to the last bit.
+    scores = np.cumsum(np.where(correct, points_arr[:, None], 0.0), axis=0)[-1] if n_items else np.zeros(n_students)
+    total_possible = float(points_arr[keyed].sum()) if bool(keyed.any()) else 0.0
+
+    difficulty = np.full(n_items, np.nan)
+    discrimination = np.full(n_items, np.nan)
+    order = np.argsort(scores, kind="mergesort")
+    if n_students:
+        difficulty[keyed] = correct[keyed].mean(axis=1)
+        group_n = discrimination_group_size(n_students)
+        if group_n > 0:
+            high = correct[:, order[-group_n:]].mean(axis=1)
+            low = correct[:, order[:group_n]].mean(axis=1)
+            discrimination[keyed] = (high - low)[keyed]
+
+    return {
+        "correct": correct,
+        "blank": blank,
+        "multi": multi,
+        "keyed": keyed,
+        "scores": scores,
+        "blanks": blank.sum(axis=0),
+        "total_possible": total_possible,
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "item_blank": blank.sum(axis=1),
+        "item_wrong": (keyed[:, None] & ~blank & ~correct).sum(axis=1),
+        "order": order,
+    }
+
+
+def wrong_answer_cells(
+    answer_codes: np.ndarray,
+    graded: Dict[str, Any],
+    vocabulary: Sequence[str],
+    blank_label: str,
+) -> np.ndarray:
+    """
+    Object array [items, students] of what a "show wrong answers" sheet prints per cell:
+    "" when the answer is correct or the item has no key, `blank_label` for a blank, else the answer.
+    """
+    shown = np.array(vocabulary, dtype=object)[np.asarray(answer_codes)]
+    shown[graded["blank"]] = blank_label
+    shown[graded["correct"] | ~graded["keyed"][:, None]] = ""
+    return shown
+
+
+def choice_bitmasks(
+    answer_codes: np.ndarray,
+    vocabulary: Sequence[str],
+    choices: Sequence[str] = ("A", "B", "C", "D", "E"),
+) -> np.ndarray:
+    """
+    uint8 matrix [items, students] with the choices selected in each cell as bits (choice k is
+    bit k), MASK_OTHER if the answer has a character outside `choices` and MASK_MULTI if it is
+    longer than one character; blanks are 0. At most six choices fit next to the flags.
+    """
+    if len(choices) > 6:
+        raise ValueError("at most 6 choices fit in a choice bitmask")
+    bit_of = {ch: 1 << k for k, ch in enumerate(choices)}
+    lut = np.zeros(len(vocabulary), dtype=np.uint8)
+    for code, text in enumerate(vocabulary):
+        mask = MASK_MULTI if len(text) > 1 else 0
+        for ch in text:
+            mask |= bit_of.get(ch, MASK_OTHER)
+        lut[code] = mask
+    return lut[np.asarray(answer_codes)]
+
+
+def item_mask_counts(masks: np.ndarray) -> np.ndarray:
+    """int64 [items, 256]: how many students have each bitmask value on each item."""
+    n_items = masks.shape[0]
+    flat = (np.arange(n_items, dtype=np.int64)[:, None] * 256 + masks).ravel()
+    return np.bincount(flat, minlength=n_items * 256).reshape(n_items, 256)
@@ -1,8 +1,19 @@
 from __future__ import annotations
 
+import functools
+import hashlib
+import json
+import math
 import os
+import re
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional, Any
+from typing import List, Tuple, Dict, Optional, Any, Sequence, Iterator, Deque, Union, Callable
 
 import fitz  # PyMuPDF
 import numpy as np
@@ -11,16 +22,22 @@ import cv2
 from .config import (
     PAGE_W_PT, PAGE_H_PT,
     CORNER_MARK_MARGIN, CORNER_MARK_SIZE,
-    GRADE_VALUES, GRADE_CIRCLE_XS, GRADE_CIRCLE_Y, GRADE_CIRCLE_RADIUS,
-    CLASS_VALUES, CLASS_CIRCLE_XS, CLASS_CIRCLE_Y, CLASS_CIRCLE_RADIUS,
-    SEAT_START_X, SEAT_STEP_X, SEAT_TOP_ROW_Y, SEAT_BOTTOM_ROW_Y, SEAT_CIRCLE_RADIUS,
-    MAX_QUESTIONS, DEFAULT_CHOICES_COUNT, make_choices,
-    BUBBLE_RADIUS, COL_COUNT,
-    compute_answer_layout,
+    GRADE_VALUES, CLASS_VALUES,
+    MAX_QUESTIONS, DEFAULT_CHOICES_COUNT,
 )
+from .template import (
+    FIELD_GRADE, FIELD_CLASS, FIELD_SEAT_TENS, FIELD_SEAT_ONES,
+    SheetTemplate, get_sheet_template,
+)
+from .dataset import JobDataset
 from .xlsx import write_simple_xlsx
 
 
+def _env_flag(name: str) -> bool:
+    """An opt-in switch: true only when the environment variable is set to something truthy."""
+    return os.environ.get(name, "").strip().lower() not in {"", "0", "false", "no"}
+
+
 def _env_float(name: str, default: float) -> float:
     raw = os.environ.get(name)
     if raw is None:
@@ -35,14 +52,225 @@ MIN_SCORE_GRADE = _env_float("ANSWER_SHEET_MIN_SCORE_GRADE", 0.05)
 MIN_SCORE_CLASS = _env_float("ANSWER_SHEET_MIN_SCORE_CLASS", 0.05)
 MIN_SCORE_SEAT = _env_float("ANSWER_SHEET_MIN_SCORE_SEAT", 0.06)
 MIN_SCORE_CHOICE = _env_float("ANSWER_SHEET_MIN_SCORE_CHOICE", 0.025)
+# Top-two score gap below which a single-choice field is AMBIGUOUS (identity rows / questions),
+# and the fraction of the best score another bubble needs to count as a second pick (MULTI).
+AMB_DELTA_IDENTITY = _env_float("ANSWER_SHEET_AMB_DELTA_IDENTITY", 0.02)
+AMB_DELTA_CHOICE = _env_float("ANSWER_SHEET_AMB_DELTA_CHOICE", 0.03)
+MULTI_RATIO = _env_float("ANSWER_SHEET_MULTI_RATIO", 0.65)
+
+# Upper bound for the automatic worker count (each worker holds a few full-page images).
+MAX_AUTO_WORKERS = 8
+# Pages per worker task; bounds how many encoded annotated pages a finished task holds.
+MAX_CHUNK_PAGES = 8
+# A spawned worker costs about as much as recognizing 2-4 pages (interpreter start plus importing
+# cv2/fitz; see scripts/bench_parallel_recognition.py), so each worker must get at least this many
+# pages to pay for itself. Smaller jobs are recognized in this process without a pool.
+MIN_PAGES_PER_WORKER = 4
+# The annotated PDF is flushed to disk (and its in-memory document dropped) every N pages.
+ANNOTATED_FLUSH_PAGES = 16
+
+# Opt-in: render and warp pages as single-channel gray (the recognizer only ever looks at
+# luminance); a colour canvas is then only built for pages that are annotated. Read on every
+# call of process_pdf_to_csv_and_annotated_pdf unless it is passed `grayscale`.
+GRAYSCALE_ENV = "ANSWER_SHEET_GRAYSCALE"
+
+# Opt-in: for scanner PDFs (one full-page image per page), decode the embedded image and
+# resample it instead of rasterizing the page; vector or mixed pages are always rendered. The
+# resampling is close to, not bit-identical with, MuPDF's, so bubble scores can shift slightly.
+# Read on every call of process_pdf_to_csv_and_annotated_pdf unless it is passed `passthrough`.
+IMAGE_PASSTHROUGH_ENV = "ANSWER_SHEET_IMAGE_PASSTHROUGH"
+
+# Opt-in coarse-to-fine: locate the corner marks on a COARSE_DPI render, then render and warp
+# only the bubble region at full DPI (see render_canonical_coarse_to_fine). Corner positions come
+# from a different search than the full-page path, so scores can differ slightly. Not used for
+# raster annotation, which needs the whole page picture. Read on every call of
+# process_pdf_to_csv_and_annotated_pdf unless it is passed `coarse_to_fine`.
+COARSE_TO_FINE_ENV = "ANSWER_SHEET_COARSE_TO_FINE"
+COARSE_DPI = 40
+
+# Opt-in adaptive DPI: read every page at ADAPTIVE_DPI_LOW_RATIO × the requested DPI first and
+# re-read only borderline pages (see needs_higher_dpi) at the requested DPI. Read on every call
+# of process_pdf_to_csv_and_annotated_pdf unless it is passed `adaptive_dpi`.
+ADAPTIVE_DPI_ENV = "ANSWER_SHEET_ADAPTIVE_DPI"
+ADAPTIVE_DPI_LOW_RATIO = _env_float("ANSWER_SHEET_ADAPTIVE_DPI_LOW_RATIO", 0.75)
+ADAPTIVE_SCORE_MARGIN = _env_float("ANSWER_SHEET_ADAPTIVE_MARGIN", 0.02)
+
+# How annotated.pdf is made:
+#   "raster" (default): the warped page is re-rendered with the boxes burned in and embedded as PNG
+#   "vector": status boxes/labels drawn as vector shapes onto a copy of the input PDF (small, fast)
+# ANSWER_SHEET_ANNOTATE_MODE picks the mode when the caller does not; it is read on every call.
+ANNOTATE_VECTOR = "vector"
+ANNOTATE_RASTER = "raster"
+ANNOTATE_MODE_ENV = "ANSWER_SHEET_ANNOTATE_MODE"
+
+
+def default_annotate_mode() -> str:
+    """The annotation mode named by ANSWER_SHEET_ANNOTATE_MODE, or ANNOTATE_RASTER."""
+    mode = (os.environ.get(ANNOTATE_MODE_ENV) or ANNOTATE_RASTER).strip().lower()
+    if mode not in {ANNOTATE_VECTOR, ANNOTATE_RASTER}:
+        print(f"WARNING: Unknown {ANNOTATE_MODE_ENV}={mode!r}; using {ANNOTATE_RASTER!r}")
+        return ANNOTATE_RASTER
+    return mode
+
+
+def default_worker_count() -> int:
+    """
+    Number of recognition worker processes to use when the caller does not specify one.
+
+    `ANSWER_SHEET_WORKERS` overrides the default; otherwise leave one core for the web server.
+    """
+    raw = (os.environ.get("ANSWER_SHEET_WORKERS") or "").strip()
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            pass
+    cpus = os.cpu_count() or 1
+    return max(1, min(MAX_AUTO_WORKERS, cpus - 1))
+
+
+_CONTENT_TOKEN_RE = re.compile(rb"\((?:\\.|[^\\)])*\)|<[^<>]*>|\[|\]|/[^\s/\[\]()<>]+|[^\s/\[\]()<>]+")
+
+
+def _image_placement(page: fitz.Page, name: str) -> Optional[fitz.Matrix]:
+    """
+    CTM in effect when the page's content stream paints XObject `name` (PDF user space), from a
+    minimal scan of the q/Q/cm/Do operators. Returns None if it is not painted exactly once.
+    """
+    stack: List[fitz.Matrix] = []
+    ctm = fitz.Matrix(1, 0, 0, 1, 0, 0)
+    operands: List[bytes] = []
+    found: Optional[fitz.Matrix] = None
+    target = b"/" + name.encode("latin-1")
+    for tok in _CONTENT_TOKEN_RE.findall(page.read_contents()):
+        first = tok[:1]
+        if first in b"([<]/" or first.isdigit() or first in b"+-.":
+            operands.append(tok)
+            continue
+        if tok == b"q":
+            stack.append(ctm)
+        elif tok == b"Q":
+            ctm = stack.pop() if stack else fitz.Matrix(1, 0, 0, 1, 0, 0)
+        elif tok == b"cm":
+            try:
+                ctm = fitz.Matrix(*(float(v) for v in operands[-6:])) * ctm
+            except (TypeError, ValueError):
+                return None
+        elif tok == b"Do" and operands:
+            if operands[-1] != target or found is not None:
+                return None
+            found = ctm
+        elif tok in (b"BI", b"ID"):
+            return None
+        operands = []
+    return found
+
+
+def _scanned_page_image(page: fitz.Page) -> Optional[Tuple[int, int, int, str, str]]:
+    """
+    (xref, width, height, colorspace name, filter) of the image if the page paints exactly one
+    upright, unmasked image covering the whole page with no visible text or vector drawings.
+    """
+    if page.rotation:
+        return None
+    log = page.get_bboxlog()
+    painted = [rect for kind, rect in log if kind == "fill-image"]
+    if len(painted) != 1 or any(kind not in ("fill-image", "ignore-text") for kind, _ in log):
+        return None
+    rect = page.rect
+    bbox = fitz.Rect(painted[0])
+    tol = 1.0  # points
+    if (
+        abs(bbox.x0 - rect.x0) > tol
+        or abs(bbox.y0 - rect.y0) > tol
+        or abs(bbox.x1 - rect.x1) > tol
+        or abs(bbox.y1 - rect.y1) > tol
+    ):
+        return None
+
+    images = page.get_images(full=True)
+    if len(images) != 1:
+        return None
+    xref, smask, width, height, _, cs_name, _, name, filt = images[0][:9]
+    if smask:
+        return None
+    placement = _image_placement(page, name)
+    if placement is None or abs(placement.b) > 1e-6 or abs(placement.c) > 1e-6 or placement.a <= 0 or placement.d <= 0:
+        return None
+    return int(xref), int(width), int(height), str(cs_name), str(filt)
+
+
+def _single_image_page_pixels(page: fitz.Page, zoom: float, gray: bool) -> Optional[np.ndarray]:
+    """
+    Decode the embedded image of a scanner-style page (see _scanned_page_image) and resample it
+    to what get_pixmap would produce at `zoom`. Returns None for any other kind of page.
+    """
+    info = _scanned_page_image(page)
+    if info is None:
+        return None
+    xref, width, height, cs_name, filt = info
+    rect = page.rect
+    doc = page.parent
+    img: Optional[np.ndarray] = None
+    if filt == "DCTDecode" and cs_name in ("DeviceGray", "DeviceRGB") and doc.xref_get_key(xref, "Decode")[0] == "null":
+        # Plain JPEG: OpenCV's decoder is noticeably faster than going through a MuPDF pixmap.
+        flags = cv2.IMREAD_IGNORE_ORIENTATION | (cv2.IMREAD_GRAYSCALE if gray else cv2.IMREAD_COLOR)
+        img = cv2.imdecode(np.frombuffer(doc.xref_stream_raw(xref), dtype=np.uint8), flags)
+        if img is not None and img.shape[:2] != (height, width):
+            img = None
+        if img is not None and not gray:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    if img is None:
+        try:
+            pix = fitz.Pixmap(doc, xref)
+            if pix.colorspace is None:
+                return None
+            if pix.alpha:
+                pix = fitz.Pixmap(pix, 0)
+            want = fitz.csGRAY if gray else fitz.csRGB
+            if pix.n != want.n:
+                pix = fitz.Pixmap(want, pix)
+        except Exception:
+            return None
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        if gray:
+            img = img[:, :, 0]
+
+    target = (rect * fitz.Matrix(zoom, zoom)).irect
+    if target.width <= 0 or target.height <= 0:
+        return None
+    shrinking = target.width < img.shape[1] and target.height < img.shape[0]
+    return cv2.resize(
+        img,
+        (target.width, target.height),
+        interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR,
+    )
 
 
-def render_page(page: fitz.Page, dpi: int = 200) -> Tuple[np.ndarray, float]:
+def render_page(
+    page: fitz.Page,
+    dpi: int = 200,
+    gray: bool = False,
+    passthrough: bool = False,
+) -> Tuple[np.ndarray, float]:
+    """
+    Render a page as an (h, w, 3) array, or as a single-channel (h, w) array when `gray`.
+
+    With `passthrough`, single-image (scanned) pages are decoded directly instead of rasterized.
+    """
     # scale points -> pixels
     zoom = dpi / 72.0
+    if passthrough:
+        img = _single_image_page_pixels(page, zoom, gray)
+        if img is not None:
+            return img, zoom
     mat = fitz.Matrix(zoom, zoom)
-    pix = page.get_pixmap(matrix=mat, alpha=False)
-    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+    if gray:
+        pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    else:
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
     return img, zoom
 
 
@@ -138,8 +366,8 @@ def _fill_missing_corner(corners: Dict[str, Tuple[float, float]]) -> Dict[str, T
 
 
 def find_corner_marks(img: np.ndarray) -> Optional[np.ndarray]:
-    """Return 4 corner points in image pixels: TL, TR, BR, BL."""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    """Return 4 corner points in image pixels: TL, TR, BR, BL. Accepts BGR or single-channel input."""
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     h, w = gray.shape[:2]
 
     zoom_est = _estimate_zoom_from_image(gray)
@@ -189,7 +417,7 @@ def find_corner_marks(img: np.ndarray) -> Optional[np.ndarray]:
 
 
 def warp_to_canonical(img: np.ndarray, zoom: float) -> Tuple[np.ndarray, np.ndarray]:
-    """Warp the page to canonical A4 pixel size at the same zoom."""
+    """Warp the page (BGR or single-channel) to canonical A4 pixel size at the same zoom."""
     src = find_corner_marks(img)
     h, w = img.shape[:2]
     if src is None:
@@ -198,22 +426,132 @@ def warp_to_canonical(img: np.ndarray, zoom: float) -> Tuple[np.ndarray, np.ndar
         M = np.eye(3, dtype=np.float32)
         return dst_img, M
 
-    can_w = int(PAGE_W_PT * zoom)
-    can_h = int(PAGE_H_PT * zoom)
+    can_w, can_h = _canonical_size(zoom)
+    M = cv2.getPerspectiveTransform(src, _canonical_corner_targets(zoom))
+    warped = cv2.warpPerspective(img, M, (can_w, can_h), flags=cv2.INTER_LINEAR)
+    return warped, M
+
+
+def _canonical_size(zoom: float) -> Tuple[int, int]:
+    return int(PAGE_W_PT * zoom), int(PAGE_H_PT * zoom)
+
 
+def _canonical_corner_targets(zoom: float) -> np.ndarray:
+    """Corner-mark centres (TL, TR, BR, BL) on the canonical page, in pixels at `zoom`."""
+    can_w, can_h = _canonical_size(zoom)
     # destination points are slightly inside page (match where we draw marks)
     m = CORNER_MARK_MARGIN * zoom
     s = CORNER_MARK_SIZE * zoom
-    dst = np.array([
+    return np.array([
         [m + s/2, m + s/2],
         [can_w - (m + s/2), m + s/2],
         [can_w - (m + s/2), can_h - (m + s/2)],
         [m + s/2, can_h - (m + s/2)],
     ], dtype=np.float32)
 
-    M = cv2.getPerspectiveTransform(src, dst)
-    warped = cv2.warpPerspective(img, M, (can_w, can_h), flags=cv2.INTER_LINEAR)
-    return warped, M
+
+def _render_clip_px(
+    page: Union[fitz.Page, fitz.DisplayList],
+    zoom: float,
+    x0: int,
+    y0: int,
+    x1: int,
+    y1: int,
+    gray: bool,
+) -> Tuple[np.ndarray, int, int]:
+    """
+    Render only the pixel rectangle [x0, x1) × [y0, y1) of the page at `zoom` (same pixel grid
+    as a full render). Returns (image, x offset, y offset) of what MuPDF actually produced.
+    Pass a DisplayList to render several clips without re-interpreting the page each time.
+    """
+    clip = fitz.Rect(x0 / zoom, y0 / zoom, x1 / zoom, y1 / zoom)
+    cs = fitz.csGRAY if gray else fitz.csRGB
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=cs, clip=clip, alpha=False)
+    shape = (pix.height, pix.width) if gray else (pix.height, pix.width, 3)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(shape), int(pix.x), int(pix.y)
+
+
+def render_canonical_coarse_to_fine(
+    page: fitz.Page,
+    dpi: int,
+    template: SheetTemplate,
+    gray: bool = True,
+    passthrough: bool = False,
+) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """
+    Two-stage alternative to render_page + warp_to_canonical for rendered (non-scan) pages:
+
+    1. find the corner marks on a cheap COARSE_DPI render, then refine each one on a small
+       full-DPI clip around it;
+    2. render at full DPI only the clip that covers the template's bubbles (identity block +
+       answer box, with their background rings) and warp just that into the canonical page.
+
+    Returns (canonical page, M, zoom) like warp_to_canonical, where M maps full-DPI page pixels
+    to canonical pixels. Everything outside the bubble region is left white, so this is for
+    recognition / vector annotation only. Returns None when the page should take the full path
+    (rotated page, corner marks not found, or with `passthrough` a scanned image page).
+    """
+    if page.rotation:
+        return None
+    if passthrough and _scanned_page_image(page) is not None:
+        return None  # decoding the embedded image directly is already cheaper
+
+    zoom = dpi / 72.0
+    # Interpret the page once; every render below replays the display list.
+    dl = page.get_displaylist()
+    coarse_zoom = COARSE_DPI / 72.0
+    pix = dl.get_pixmap(matrix=fitz.Matrix(coarse_zoom, coarse_zoom), colorspace=fitz.csGRAY, alpha=False)
+    coarse = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width)
+    corners = find_corner_marks(coarse)
+    if corners is None:
+        return None
+
+    page_w_px = int(math.ceil(page.rect.width * zoom))
+    page_h_px = int(math.ceil(page.rect.height * zoom))
+    scale = zoom / coarse_zoom
+    mark_px = float(CORNER_MARK_SIZE) * zoom
+    half = int(math.ceil(mark_px * 1.25))
+    src = []
+    for cx, cy in (corners.astype(np.float64) * scale).tolist():
+        x0 = max(0, int(cx) - half)
+        y0 = max(0, int(cy) - half)
+        x1 = min(page_w_px, int(cx) + half)
+        y1 = min(page_h_px, int(cy) + half)
+        clip, ox, oy = _render_clip_px(dl, zoom, x0, y0, x1, y1, gray=True)
+        found = _find_corner_mark_in_roi(clip, expected_px=mark_px, target_corner_xy=(cx - ox, cy - oy))
+        src.append((found[0] + ox, found[1] + oy) if found is not None else (cx, cy))
+    M = cv2.getPerspectiveTransform(np.asarray(src, dtype=np.float32), _canonical_corner_targets(zoom))
+
+    # Canonical region holding every bubble plus its background ring (see score_bubble).
+    can_w, can_h = _canonical_size(zoom)
+    margin = int(math.ceil(float(template.r_px.max()))) + 4
+    bb = template.bboxes
+    rx0 = max(0, int(bb[:, 0].min()) - margin)
+    ry0 = max(0, int(bb[:, 1].min()) - margin)
+    rx1 = min(can_w, int(bb[:, 2].max()) + margin)
+    ry1 = min(can_h, int(bb[:, 3].max()) + margin)
+
+    # Source pixels that region samples from (+2 px for bilinear interpolation).
+    region = np.array([[[rx0, ry0]], [[rx1, ry0]], [[rx1, ry1]], [[rx0, ry1]]], dtype=np.float64)
+    src_pts = cv2.perspectiveTransform(region, np.linalg.inv(M.astype(np.float64))).reshape(-1, 2)
+    sx0 = max(0, int(math.floor(src_pts[:, 0].min())) - 2)
+    sy0 = max(0, int(math.floor(src_pts[:, 1].min())) - 2)
+    sx1 = min(page_w_px, int(math.ceil(src_pts[:, 0].max())) + 2)
+    sy1 = min(page_h_px, int(math.ceil(src_pts[:, 1].max())) + 2)
+    if sx1 <= sx0 or sy1 <= sy0:
+        return None
+    clip, ox, oy = _render_clip_px(dl, zoom, sx0, sy0, sx1, sy1, gray=gray)
+
+    # clip pixel -> page pixel (+offset) -> canonical (M) -> region pixel (-region origin)
+    shift_in = np.array([[1, 0, ox], [0, 1, oy], [0, 0, 1]], dtype=np.float64)
+    shift_out = np.array([[1, 0, -rx0], [0, 1, -ry0], [0, 0, 1]], dtype=np.float64)
+    M_region = shift_out @ M.astype(np.float64) @ shift_in
+    fill = 255 if gray else (255, 255, 255)
+    canvas = np.full((can_h, can_w) if gray else (can_h, can_w, 3), 255, dtype=np.uint8)
+    canvas[ry0:ry1, rx0:rx1] = cv2.warpPerspective(
+        clip, M_region, (rx1 - rx0, ry1 - ry0), flags=cv2.INTER_LINEAR, borderValue=fill
+    )
+    return canvas, M, zoom
 
 
 def bubble_bbox_px(x_pt: float, y_pt: float, r_pt: float, zoom: float) -> Tuple[int,int,int,int]:
@@ -282,6 +620,116 @@ def score_bubble(gray: np.ndarray, bbox: Tuple[int,int,int,int]) -> float:
     return float(score)
 
 
+@functools.lru_cache(maxsize=64)
+def _bubble_masks(
+    roi_h: int,
+    roi_w: int,
+    ccx: float,
+    ccy: float,
+    r: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Inner disc + background annulus masks for one bubble geometry (see score_bubble)."""
+    yy, xx = np.ogrid[:roi_h, :roi_w]
+    dx = xx - ccx
+    dy = yy - ccy
+    dist2 = dx * dx + dy * dy
+    bg_r1 = r * 1.05
+    bg_r2 = r * 1.45
+    inner_r = max(1.0, r * 0.55)
+    inner_mask = dist2 <= (inner_r * inner_r)
+    bg_mask = (dist2 >= (bg_r1 * bg_r1)) & (dist2 <= (bg_r2 * bg_r2))
+    return inner_mask, bg_mask
+
+
+def _build_score_plan(bboxes: Sequence[Tuple[int, int, int, int]]) -> Dict[str, Any]:
+    """
+    Image-independent part of `score_bubbles`: expanded ROI bounds per bubble, and bubbles grouped
+    by pixel geometry (size + sub-pixel centre offset) with their shared masks and gather indices.
+    """
+    n = len(bboxes)
+    b = np.asarray(bboxes, dtype=np.int64).reshape(n, 4)
+    x0, y0, x1, y1 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    cx = (x0 + x1) / 2.0
+    cy = (y0 + y1) / 2.0
+    r = (np.minimum(x1 - x0, y1 - y0) / 2.0) - 2.0
+    bg_r2 = r * 1.45
+    # int() truncates toward zero; match it exactly so the masks line up with score_bubble.
+    x0e = np.trunc(cx - bg_r2).astype(np.int64)
+    y0e = np.trunc(cy - bg_r2).astype(np.int64)
+    x1e = np.trunc(cx + bg_r2).astype(np.int64)
+    y1e = np.trunc(cy + bg_r2).astype(np.int64)
+    valid = r > 1.0
+
+    groups: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int, int]] = []
+    idx = np.flatnonzero(valid & (x1e > x0e) & (y1e > y0e))
+    if idx.size:
+        keys = np.stack(
+            [y1e[idx] - y0e[idx], x1e[idx] - x0e[idx], cx[idx] - x0e[idx], cy[idx] - y0e[idx], r[idx]],
+            axis=1,
+        )
+        uniq, group_of = np.unique(keys, axis=0, return_inverse=True)
+        group_of = np.asarray(group_of).reshape(-1)
+        for g, (roi_h_f, roi_w_f, ccx, ccy, rr) in enumerate(uniq):
+            members = idx[group_of == g]
+            roi_h = int(roi_h_f)
+            roi_w = int(roi_w_f)
+            inner_mask, bg_mask = _bubble_masks(roi_h, roi_w, float(ccx), float(ccy), float(rr))
+            inner_n = int(inner_mask.sum())
+            bg_n = int(bg_mask.sum())
+            if inner_n < 16 or bg_n < 16:
+                continue
+            rows = y0e[members][:, None] + np.arange(roi_h)[None, :]
+            cols = x0e[members][:, None] + np.arange(roi_w)[None, :]
+            groups.append((members, rows, cols, inner_mask, bg_mask, inner_n, bg_n))
+
+    return {"bboxes": b, "x0e": x0e, "y0e": y0e, "x1e": x1e, "y1e": y1e, "valid": valid, "groups": groups}
+
+
+@functools.lru_cache(maxsize=32)
+def _template_score_plan(template: SheetTemplate) -> Dict[str, Any]:
+    """Templates are cached and shared, so their score plan is built once per layout and zoom."""
+    return _build_score_plan(template.bbox_tuples)
+
+
+def score_bubbles(
+    gray: np.ndarray,
+    bboxes: Sequence[Tuple[int, int, int, int]],
+    plan: Optional[Dict[str, Any]] = None,
+) -> np.ndarray:
+    """
+    Batched `score_bubble`: return the fill score of every bbox as a float64 array.
+
+    Bubbles that share the same pixel geometry (size + sub-pixel centre offset) share one pair
+    of precomputed masks, so each group is scored with a single gather and two reductions.
+    Bubbles whose background ring would be clipped by the image border fall back to score_bubble.
+    Pass a prebuilt `plan` (see _template_score_plan) to skip the geometry work for known layouts.
+    """
+    n = len(bboxes)
+    out = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return out
+    if plan is None:
+        plan = _build_score_plan(bboxes)
+
+    img_h, img_w = gray.shape[:2]
+    inside = (plan["x0e"] >= 0) & (plan["y0e"] >= 0) & (plan["x1e"] <= img_w) & (plan["y1e"] <= img_h)
+    b = plan["bboxes"]
+    for i in np.flatnonzero(plan["valid"] & ~inside):
+        out[i] = score_bubble(gray, tuple(int(v) for v in b[i]))
+
+    for members, rows, cols, inner_mask, bg_mask, inner_n, bg_n in plan["groups"]:
+        keep = inside[members]
+        if not keep.all():
+            members, rows, cols = members[keep], rows[keep], cols[keep]
+            if members.size == 0:
+                continue
+        rois = gray[rows[:, :, None], cols[:, None, :]]
+        inner_mean = rois[:, inner_mask].sum(axis=1, dtype=np.float64) / float(inner_n)
+        bg_mean = rois[:, bg_mask].sum(axis=1, dtype=np.float64) / float(bg_n)
+        out[members] = np.clip((bg_mean - inner_mean) / 255.0, 0.0, 1.0)
+    return out
+
+
 def pick_one(
     scores: List[float],
     labels: List[str],
@@ -350,32 +798,109 @@ def pick_choice_multi(
     return out, status, float(best_score), int(idx), second_label, float(second_score), picked_indices
 
 
-def process_page(
+Mark = Tuple[Tuple[int, int, int, int], str, str]  # bbox (canonical px), text, status
+
+THRESHOLD_KEYS = (
+    "min_score_grade",
+    "min_score_class",
+    "min_score_seat",
+    "min_score_choice",
+    "amb_delta_identity",
+    "amb_delta_choice",
+    "multi_ratio",
+)
+
+
+def decision_thresholds(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    The thresholds decide_page uses: the module defaults (MIN_SCORE_*, AMB_DELTA_*, MULTI_RATIO,
+    i.e. the environment) updated with `overrides`. None values in `overrides` are ignored.
+    """
+    thresholds = {
+        "min_score_grade": MIN_SCORE_GRADE,
+        "min_score_class": MIN_SCORE_CLASS,
+        "min_score_seat": MIN_SCORE_SEAT,
+        "min_score_choice": MIN_SCORE_CHOICE,
+        "amb_delta_identity": AMB_DELTA_IDENTITY,
+        "amb_delta_choice": AMB_DELTA_CHOICE,
+        "multi_ratio": MULTI_RATIO,
+    }
+    for key, value in (overrides or {}).items():
+        if key not in thresholds:
+            raise ValueError(f"Unknown threshold {key!r}; expected one of {', '.join(THRESHOLD_KEYS)}")
+        if value is not None:
+            thresholds[key] = float(value)
+    return thresholds
+
+
+def score_page(warped: np.ndarray, template: SheetTemplate) -> np.ndarray:
+    """
+    Fill score of every template bubble on one canonical (warped) page, in template order.
+    `warped` may be BGR or single-channel gray; it is not modified.
+    """
+    gray_raw = warped if warped.ndim == 2 else cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+    # Boost local contrast so light marks are easier to detect.
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(16, 16))
+    gray = clahe.apply(gray_raw)
+    # Score the whole page in one batch against the template's precomputed geometry.
+    return score_bubbles(gray, template.bbox_tuples, plan=_template_score_plan(template))
+
+
+def read_page(
     warped: np.ndarray,
     zoom: float,
     num_questions: int,
     choices_count: int,
-) -> Tuple[Dict[str, Any], np.ndarray, List[Dict[str, Any]]]:
-    can = warped.copy()
-    gray_raw = cv2.cvtColor(can, cv2.COLOR_BGR2GRAY)
-    # Boost local contrast so light marks are easier to detect.
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(16, 16))
-    gray = clahe.apply(gray_raw)
+) -> Tuple[Dict[str, Any], List[Mark], List[Dict[str, Any]], np.ndarray]:
+    """
+    Read one canonical (warped) page. `warped` may be BGR or single-channel gray; it is not modified.
+
+    Returns (results, marks, flags, scores); `marks` are the picked bubbles to box in the
+    annotated output and `scores` the raw fill score of every template bubble.
+    """
+    template = get_sheet_template(num_questions, choices_count, zoom)
+    scores = score_page(warped, template)
+    results, marks, flags = decide_page(scores, template, num_questions)
+    return results, marks, flags, scores
+
+
+def decide_page(
+    scores: np.ndarray,
+    template: SheetTemplate,
+    num_questions: int,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, Any], List[Mark], List[Dict[str, Any]]]:
+    """
+    Turn one page's bubble scores (template order) into (results, marks, flags) using
+    `thresholds` (see decision_thresholds; default: the MIN_SCORE_* settings). Pure function of
+    the scores, so it can be re-run cheaply with other thresholds.
+    """
+    th = decision_thresholds() if thresholds is None else thresholds
+    min_score_seat = th["min_score_seat"]
+    amb_delta_identity = th["amb_delta_identity"]
+    multi_ratio = th["multi_ratio"]
 
     results: Dict[str, Any] = {}
-    marks: List[Tuple[Tuple[int,int,int,int], str, str]] = []  # bbox, text, status
+    marks: List[Mark] = []
     flags: List[Dict[str, Any]] = []
 
+    choices = template.choices
+    bboxes_all = template.bbox_tuples
+    all_scores = np.asarray(scores, dtype=np.float64).tolist()
+
+    def field(name: str) -> Tuple[List[Tuple[int, int, int, int]], List[float]]:
+        s = template.field_slice(name)
+        return bboxes_all[s], all_scores[s]
+
+    grade_bboxes, grade_scores = field(FIELD_GRADE)
+    class_bboxes, class_scores = field(FIELD_CLASS)
+    seat_top_bboxes, seat_top_scores = field(FIELD_SEAT_TENS)
+    seat_bottom_bboxes, seat_bottom_scores = field(FIELD_SEAT_ONES)
+
     # Grade (7-12)
-    grade_scores = []
-    grade_bboxes = []
-    for x in GRADE_CIRCLE_XS:
-        bbox = bubble_bbox_px(x, GRADE_CIRCLE_Y, GRADE_CIRCLE_RADIUS, zoom)
-        grade_bboxes.append(bbox)
-        grade_scores.append(score_bubble(gray, bbox))
     g_label = [str(v) for v in GRADE_VALUES]
     g_val, g_status, _, g_idx, g_second_label, _ = pick_one(
-        grade_scores, g_label, min_score=MIN_SCORE_GRADE, amb_delta=0.02
+        grade_scores, g_label, min_score=th["min_score_grade"], amb_delta=amb_delta_identity
     )
     results["grade"] = g_val if g_status == "OK" else None
     results["grade_status"] = g_status
@@ -392,12 +917,6 @@ def process_page(
         )
 
     # Class (single row digits 0-9; treat 0 as unused)
-    class_scores = []
-    class_bboxes = []
-    for x in CLASS_CIRCLE_XS:
-        bbox = bubble_bbox_px(x, CLASS_CIRCLE_Y, CLASS_CIRCLE_RADIUS, zoom)
-        class_bboxes.append(bbox)
-        class_scores.append(score_bubble(gray, bbox))
     c_label_all = [str(v) for v in CLASS_VALUES]
     c_scores_pick = class_scores
     c_labels_pick = c_label_all
@@ -408,7 +927,7 @@ def process_page(
         c_offset = 1
 
     c_val, c_status, _, c_idx0, c_second_label, _ = pick_one(
-        c_scores_pick, c_labels_pick, min_score=MIN_SCORE_CLASS, amb_delta=0.02
+        c_scores_pick, c_labels_pick, min_score=th["min_score_class"], amb_delta=amb_delta_identity
     )
     c_idx = int(c_idx0) + int(c_offset)
     results["class_no"] = c_val if c_status == "OK" else None
@@ -431,19 +950,12 @@ def process_page(
     digit_labels_legacy = [str(d) for d in range(1, 10)] + ["0"]
 
     def pick_digit_row(
-        y_pt: float,
+        bboxes: List[Tuple[int, int, int, int]],
+        scores: List[float],
         digit_labels: List[str],
     ) -> Tuple[str, str, float, int, Optional[str], float, List[Tuple[int, int, int, int]], List[int], List[float]]:
-        bboxes: List[Tuple[int, int, int, int]] = []
-        scores: List[float] = []
-        for i in range(10):
-            x_pt = SEAT_START_X + i * SEAT_STEP_X
-            bbox = bubble_bbox_px(x_pt, y_pt, SEAT_CIRCLE_RADIUS, zoom)
-            bboxes.append(bbox)
-            scores.append(score_bubble(gray, bbox))
-
         best = float(max(scores) if scores else 0.0)
-        multi_cut = max(float(MIN_SCORE_SEAT), best * 0.65)
+        multi_cut = max(float(min_score_seat), best * multi_ratio)
         picked = [i for i, s in enumerate(scores) if float(s) >= multi_cut]
         if len(picked) >= 2:
             picked_sorted = sorted(int(i) for i in picked)
@@ -457,7 +969,7 @@ def process_page(
             return value, "MULTI", best_score, best_idx, second_label, second_score, bboxes, picked_sorted, scores
 
         val, status, best_score, idx, second_label, second_score = pick_one(
-            scores, digit_labels, min_score=MIN_SCORE_SEAT, amb_delta=0.02
+            scores, digit_labels, min_score=min_score_seat, amb_delta=amb_delta_identity
         )
         val_out = str(val) if (val is not None) else ""
         return val_out, status, float(best_score), int(idx), second_label, float(second_score), bboxes, [int(idx)], scores
@@ -510,8 +1022,8 @@ def process_page(
         ("legacy", digit_labels_legacy),
     ]
     for label_mode, labels in variants:
-        t_val, t_status, t_best, t_idx, t_second_label, _, t_bboxes, t_picked, _ = pick_digit_row(SEAT_TOP_ROW_Y, labels)
-        o_val, o_status, o_best, o_idx, o_second_label, _, o_bboxes, o_picked, _ = pick_digit_row(SEAT_BOTTOM_ROW_Y, labels)
+        t_val, t_status, t_best, t_idx, t_second_label, _, t_bboxes, t_picked, _ = pick_digit_row(seat_top_bboxes, seat_top_scores, labels)
+        o_val, o_status, o_best, o_idx, o_second_label, _, o_bboxes, o_picked, _ = pick_digit_row(seat_bottom_bboxes, seat_bottom_scores, labels)
 
         seat_no_a, seat_status_a = seat_candidate_from_rows(t_val, t_status, t_best, o_val, o_status, o_best)
         score_a = score_seat_candidate(seat_no_a, seat_status_a, t_best, o_best)
@@ -570,66 +1082,112 @@ def process_page(
 
     # Questions
     answers = []
-    choices = make_choices(choices_count)
-    layout = compute_answer_layout(num_questions, choices_count=choices_count)
-    rows = layout["rows_per_col"]
-    first_y = layout["first_row_y"]
-    row_step = layout["row_step"]
-    bubble_xs = layout["bubble_xs"]
-
-    q = 1
-    for col in range(COL_COUNT):
-        for row in range(rows):
-            if q > num_questions:
-                break
-            y_pt = first_y - (row * row_step)
-            bboxes = []
-            scores = []
-            xs = bubble_xs[col]
-            for j, ch in enumerate(choices):
-                x_pt = xs[j]
-                bbox = bubble_bbox_px(x_pt, y_pt, BUBBLE_RADIUS, zoom)
-                bboxes.append(bbox)
-                scores.append(score_bubble(gray, bbox))
-            val, status, _, idx, second_label, _, picked_idxs = pick_choice_multi(
-                scores, choices, min_score=MIN_SCORE_CHOICE, amb_delta=0.03
+    for q in range(1, min(num_questions, template.num_questions) + 1):
+        bboxes, scores = field(template.question_field(q))
+        val, status, _, idx, second_label, _, picked_idxs = pick_choice_multi(
+            scores,
+            choices,
+            min_score=th["min_score_choice"],
+            amb_delta=th["amb_delta_choice"],
+            multi_ratio=multi_ratio,
+        )
+        answers.append(val if status in {"OK", "MULTI"} and val is not None else "")
+        if status == "MULTI":
+            for j in picked_idxs:
+                text = f"{q}:{val}" if j == idx else ""
+                marks.append((bboxes[j], text, status))
+        else:
+            marks.append((bboxes[idx], f"{q}:{val or ''}", status))
+        if status != "OK":
+            flags.append(
+                {
+                    "field": f"Q{q}",
+                    "question": q,
+                    "status": status,
+                    "best_label": val if status == "MULTI" else choices[idx],
+                    "second_label": "" if status == "MULTI" else (second_label or ""),
+                }
             )
-            answers.append(val if status in {"OK", "MULTI"} and val is not None else "")
-            if status == "MULTI":
-                for j in picked_idxs:
-                    text = f"{q}:{val}" if j == idx else ""
-                    marks.append((bboxes[j], text, status))
-            else:
-                marks.append((bboxes[idx], f"{q}:{val or ''}", status))
-            if status != "OK":
-                flags.append(
-                    {
-                        "field": f"Q{q}",
-                        "question": q,
-                        "status": status,
-                        "best_label": val if status == "MULTI" else choices[idx],
-                        "second_label": "" if status == "MULTI" else (second_label or ""),
-                    }
-                )
-            q += 1
 
     results["answers"] = "".join(answers)
     # also keep per-question list
     for i in range(num_questions):
         results[f"Q{i+1}"] = answers[i] if i < len(answers) else ""
 
-    # Annotate
-    annotated = can.copy()
+    return results, marks, flags
+
+
+@functools.lru_cache(maxsize=32)
+def _template_decision_plan(template: SheetTemplate) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per template field: the MIN_SCORE_* and AMB_DELTA_* pick_one applies to it, and a bubble
+    mask (template order) of the options it chooses between (class "0" is not a choice).
+    """
+    min_score = {
+        FIELD_GRADE: MIN_SCORE_GRADE,
+        FIELD_CLASS: MIN_SCORE_CLASS,
+        FIELD_SEAT_TENS: MIN_SCORE_SEAT,
+        FIELD_SEAT_ONES: MIN_SCORE_SEAT,
+    }
+    identity = set(min_score)
+    min_scores = np.asarray([min_score.get(name, MIN_SCORE_CHOICE) for name in template.fields], dtype=np.float64)
+    amb_deltas = np.asarray(
+        [AMB_DELTA_IDENTITY if name in identity else AMB_DELTA_CHOICE for name in template.fields],
+        dtype=np.float64,
+    )
+    choosable = np.ones(template.field_of.shape[0], dtype=bool)
+    if CLASS_VALUES and CLASS_VALUES[0] == 0:
+        choosable[template.field_start[template.field_index[FIELD_CLASS]]] = False
+    for arr in (min_scores, amb_deltas, choosable):
+        arr.setflags(write=False)
+    return min_scores, amb_deltas, choosable
+
+
+def needs_higher_dpi(
+    scores: np.ndarray,
+    flags: List[Dict[str, Any]],
+    template: SheetTemplate,
+    margin: float = ADAPTIVE_SCORE_MARGIN,
+) -> bool:
+    """
+    True when a page read is borderline: an AMBIGUOUS/MULTI flag, or a field whose decision could
+    flip with a slightly different score, i.e. its best score is within `margin` of its threshold,
+    or it is marked and the gap to its second-best is within `margin` of the ambiguity delta.
+    Only each field's top two bubbles are looked at; faint unmarked bubbles do not count.
+    """
+    if any(flag.get("status") in {"AMBIGUOUS", "MULTI"} for flag in flags):
+        return True
+    min_scores, amb_deltas, choosable = _template_decision_plan(template)
+    scores = np.where(choosable, np.asarray(scores, dtype=np.float64), -np.inf)
+    # Sort bubbles by (field, score descending): each field's best and second-best then sit at
+    # its first two positions.
+    order = np.lexsort((-scores, template.field_of))
+    starts = template.field_start[:-1]
+    best = scores[order[starts]]
+    second = scores[order[starts + 1]]
+    if np.any(np.abs(best - min_scores) < margin):
+        return True
+    # pick_one narrows the ambiguity delta for light marks.
+    delta = np.minimum(amb_deltas, best * 0.55)
+    marked = best >= min_scores
+    return bool(np.any(marked & (second >= min_scores * 0.85 - margin) & (best - second < delta + margin)))
+
+
+def _mark_color_bgr(status: str) -> Tuple[int, int, int]:
+    if status == "OK":
+        return (0,255,0)
+    if status == "AMBIGUOUS":
+        return (0,165,255)
+    if status == "MULTI":
+        return (255,0,255)
+    return (0,0,255)
+
+
+def draw_marks(warped: np.ndarray, marks: List[Mark]) -> np.ndarray:
+    """Return a BGR copy of the canonical page with every mark boxed and labelled."""
+    annotated = cv2.cvtColor(warped, cv2.COLOR_GRAY2BGR) if warped.ndim == 2 else warped.copy()
     for (x0,y0,x1,y1), text, status in marks:
-        # color by status
-        if status == "OK":
-            color = (0,255,0)
-        elif status == "AMBIGUOUS":
-            color = (0,165,255)
-        elif status == "MULTI":
-            color = (255,0,255)
-        else:
-            color = (0,0,255)
+        color = _mark_color_bgr(status)
         cv2.rectangle(annotated, (x0,y0), (x1,y1), color, 2)
         if text:
             cv2.putText(
@@ -642,58 +1200,671 @@ def process_page(
                 1,
                 cv2.LINE_AA,
             )
+    return annotated
 
-    return results, annotated, flags
+
+def redraw_raster_page(
+    page: fitz.Page,
+    info: Dict[str, Any],
+    marks: List[Mark],
+    grayscale: bool = False,
+    passthrough: bool = False,
+) -> np.ndarray:
+    """
+    Raster annotation of a page read before (`info` as returned by _recognize_page): render it
+    at the DPI it was read at and warp it with the saved transform, so neither the corner search
+    nor the bubble scoring runs again, then draw `marks` onto it.
+    """
+    img, zoom = render_page(page, dpi=int(info["dpi"]), gray=grayscale, passthrough=passthrough)
+    M = np.asarray(info["transform"], dtype=np.float64)
+    if np.allclose(M, np.eye(3)):
+        warped = img  # warp_to_canonical found no corner marks and kept the page as rendered
+    else:
+        warped = cv2.warpPerspective(img, M, _canonical_size(zoom), flags=cv2.INTER_LINEAR)
+    return draw_marks(warped, marks)
+
+
+def process_page(
+    warped: np.ndarray,
+    zoom: float,
+    num_questions: int,
+    choices_count: int,
+    annotate: bool = True,
+) -> Tuple[Dict[str, Any], Optional[np.ndarray], List[Dict[str, Any]]]:
+    """
+    Read one canonical (warped) page and optionally draw the result onto it.
+
+    Returns (results, annotated, flags). `annotated` is a BGR copy of the page with the picked
+    bubbles boxed, or None when `annotate` is False (no colour canvas is allocated then).
+    """
+    results, marks, flags, _ = read_page(warped, zoom, num_questions=num_questions, choices_count=choices_count)
+    return results, draw_marks(warped, marks) if annotate else None, flags
+
+
+def marks_to_page_overlay(
+    marks: List[Mark],
+    M: np.ndarray,
+    zoom: float,
+    page: fitz.Page,
+) -> List[Tuple[List[Tuple[float, float]], Tuple[float, float], str, str]]:
+    """
+    Map marks from canonical pixels back onto the original (unrotated) PDF page.
+
+    Goes through the inverse perspective transform to rendered pixels, then to displayed page
+    points (/ zoom) and through the page's derotation matrix.
+    Returns one (quad corners, label position, text, status) per mark, in PDF page coordinates.
+    """
+    if not marks:
+        return []
+    pts: List[Tuple[float, float]] = []
+    for (x0, y0, x1, y1), _, _ in marks:
+        pts.extend([(x0, y0), (x1, y0), (x1, y1), (x0, y1), (x0, max(10, y0 - 4))])
+    src = np.asarray(pts, dtype=np.float64).reshape(-1, 1, 2)
+    img_pts = cv2.perspectiveTransform(src, np.linalg.inv(np.asarray(M, dtype=np.float64))).reshape(-1, 2)
+    derot = page.derotation_matrix
+    page_pts = [tuple(fitz.Point(x / zoom, y / zoom) * derot) for x, y in img_pts.tolist()]
+
+    overlay = []
+    for i, (_, text, status) in enumerate(marks):
+        quad = page_pts[i * 5 : i * 5 + 4]
+        overlay.append((quad, page_pts[i * 5 + 4], text, status))
+    return overlay
+
+
+def _encode_annotated_page(img: np.ndarray) -> Tuple[bytes, int, int]:
+    h, w = img.shape[:2]
+    success, buf = cv2.imencode(".png", img)
+    if not success:
+        raise RuntimeError("Failed to encode annotated image")
+    return buf.tobytes(), w, h
+
+
+def _insert_png_page(doc: fitz.Document, png: bytes, w: int, h: int, dpi: int) -> None:
+    # create page size in points
+    # pixels -> inches -> points
+    w_pt = w / dpi * 72.0
+    h_pt = h / dpi * 72.0
+    page = doc.new_page(width=w_pt, height=h_pt)
+    page.insert_image(page.rect, stream=png)
+
+
+class AnnotatedPdfWriter:
+    """
+    Append annotated pages to a PDF on disk as soon as they are produced.
+
+    Pages go into an in-memory `fitz` document that is flushed to `<out>.part` every
+    `flush_every` pages (first a full save, then incremental saves) and reopened from disk,
+    so memory stays flat however many pages a job has. `close()` moves the file into place.
+    """
+
+    def __init__(self, out_pdf_path: str, dpi: int = 200, flush_every: int = ANNOTATED_FLUSH_PAGES):
+        self.out_pdf_path = str(out_pdf_path)
+        self.dpi = int(dpi)
+        self.flush_every = max(1, int(flush_every))
+        self.page_count = 0
+        self._part_path = self.out_pdf_path + ".part"
+        self._doc: Optional[fitz.Document] = fitz.open()
+        self._on_disk = False
+        self._pending = 0
+
+    def add_png(self, png: bytes, w: int, h: int, dpi: Optional[int] = None) -> None:
+        """Append one page image; `dpi` (default: the writer's) sets its size in points."""
+        if self._doc is None:
+            raise RuntimeError("AnnotatedPdfWriter is closed")
+        _insert_png_page(self._doc, png, w, h, dpi or self.dpi)
+        self.page_count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._flush()
+
+    def add_image(self, img: np.ndarray) -> None:
+        png, w, h = _encode_annotated_page(img)
+        self.add_png(png, w, h)
+
+    def _flush(self) -> None:
+        assert self._doc is not None
+        if self._on_disk:
+            self._doc.saveIncr()
+        else:
+            self._doc.save(self._part_path)
+            self._on_disk = True
+        self._doc.close()
+        self._doc = fitz.open(self._part_path)
+        self._pending = 0
+
+    def close(self) -> None:
+        if self._doc is None:
+            return
+        if self._pending or not self._on_disk:
+            if self._on_disk:
+                self._doc.saveIncr()
+            else:
+                self._doc.save(self._part_path)
+        self._doc.close()
+        self._doc = None
+        os.replace(self._part_path, self.out_pdf_path)
+
+    def abort(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        try:
+            os.remove(self._part_path)
+        except OSError:
+            pass
+
+    def __enter__(self) -> "AnnotatedPdfWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class VectorOverlayWriter:
+    """
+    Draw each page's status boxes and labels as vector shapes onto a copy of the input PDF.
+
+    The page images are never re-encoded, so this is much faster than AnnotatedPdfWriter and
+    annotated.pdf stays about the size of the input. Same add/close/abort contract.
+    """
+
+    # Mirrors draw_marks: 2 px lines at the render DPI, ~0.4 Hershey-simplex label height.
+    LINE_WIDTH_PT = 0.75
+    LABEL_FONTSIZE_PT = 4.5
+
+    def __init__(self, input_pdf_path: str, out_pdf_path: str):
+        self.out_pdf_path = str(out_pdf_path)
+        self._part_path = self.out_pdf_path + ".part"
+        self._doc: Optional[fitz.Document] = fitz.open(input_pdf_path)
+        self.page_count = 0
+
+    def add_overlay(
+        self,
+        page_index: int,
+        overlay: List[Tuple[List[Tuple[float, float]], Tuple[float, float], str, str]],
+    ) -> None:
+        if self._doc is None:
+            raise RuntimeError("VectorOverlayWriter is closed")
+        page = self._doc.load_page(int(page_index))
+        shape = page.new_shape()
+        for quad, label_pos, text, status in overlay:
+            b, g, r = _mark_color_bgr(status)
+            color = (r / 255.0, g / 255.0, b / 255.0)
+            shape.draw_polyline([fitz.Point(x, y) for x, y in quad])
+            shape.finish(color=color, width=self.LINE_WIDTH_PT, closePath=True)
+            if text:
+                shape.insert_text(
+                    fitz.Point(*label_pos),
+                    text,
+                    fontsize=self.LABEL_FONTSIZE_PT,
+                    color=color,
+                    rotate=page.rotation,
+                )
+        shape.commit()
+        self.page_count += 1
+
+    def close(self) -> None:
+        if self._doc is None:
+            return
+        self._doc.save(self._part_path, deflate=True)
+        self._doc.close()
+        self._doc = None
+        os.replace(self._part_path, self.out_pdf_path)
+
+    def abort(self) -> None:
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        try:
+            os.remove(self._part_path)
+        except OSError:
+            pass
 
 
 def images_to_pdf(images: List[np.ndarray], out_pdf_path: str, dpi: int = 200):
-    doc = fitz.open()
-    for img in images:
-        h, w = img.shape[:2]
-        # create page size in points
-        # pixels -> inches -> points
-        w_pt = w / dpi * 72.0
-        h_pt = h / dpi * 72.0
-        page = doc.new_page(width=w_pt, height=h_pt)
-        # encode as png
-        success, buf = cv2.imencode(".png", img)
-        if not success:
-            raise RuntimeError("Failed to encode annotated image")
-        page.insert_image(page.rect, stream=buf.tobytes())
-    doc.save(out_pdf_path)
-    doc.close()
+    with AnnotatedPdfWriter(out_pdf_path, dpi=dpi) as writer:
+        for img in images:
+            writer.add_image(img)
+
+
+# (result, annotation, flags, info); see _recognize_page.
+PageOutput = Tuple[Dict[str, Any], Any, List[Dict[str, Any]], Dict[str, Any]]
+
+
+def _recognize_page(
+    page: fitz.Page,
+    dpi: int,
+    num_questions: int,
+    choices_count: int,
+    grayscale: bool = False,
+    annotate_mode: Optional[str] = ANNOTATE_RASTER,
+    escalate_dpi: Optional[int] = None,
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> PageOutput:
+    """
+    Recognize one input page; returns (result, annotation, flags, info). The annotation depends
+    on `annotate_mode`: a BGR image (raster), a marks_to_page_overlay list (vector), or None
+    (no annotation). `info` holds what a later re-read needs: the page's bubble "scores"
+    (template order), the "dpi"/"zoom" it was read at and the warp "transform".
+
+    With `escalate_dpi`, a page whose read at `dpi` is borderline (see needs_higher_dpi) is
+    rendered and read again at `escalate_dpi`, and that second read is the one returned.
+    `passthrough` decodes scanned pages' embedded images instead of rendering them;
+    `coarse_to_fine` reads non-raster pages through render_canonical_coarse_to_fine.
+    """
+    warped, M, zoom, results, marks, flags, scores = _read_page_at(
+        page, dpi, num_questions, choices_count, grayscale, annotate_mode, passthrough, coarse_to_fine
+    )
+    if escalate_dpi and escalate_dpi > dpi:
+        template = get_sheet_template(num_questions, choices_count, zoom)
+        if needs_higher_dpi(scores, flags, template):
+            dpi = int(escalate_dpi)
+            warped, M, zoom, results, marks, flags, scores = _read_page_at(
+                page, dpi, num_questions, choices_count, grayscale, annotate_mode, passthrough, coarse_to_fine
+            )
+    if annotate_mode == ANNOTATE_RASTER:
+        annotation: Any = draw_marks(warped, marks)
+    elif annotate_mode == ANNOTATE_VECTOR:
+        annotation = marks_to_page_overlay(marks, M, zoom, page)
+    else:
+        annotation = None
+    info = {"dpi": int(dpi), "zoom": float(zoom), "transform": M, "scores": scores}
+    return results, annotation, flags, info
+
+
+def _read_page_at(
+    page: fitz.Page,
+    dpi: int,
+    num_questions: int,
+    choices_count: int,
+    grayscale: bool,
+    annotate_mode: Optional[str],
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, float, Dict[str, Any], List[Mark], List[Dict[str, Any]], np.ndarray]:
+    staged = None
+    if coarse_to_fine and annotate_mode != ANNOTATE_RASTER:
+        template = get_sheet_template(num_questions, choices_count, dpi / 72.0)
+        staged = render_canonical_coarse_to_fine(page, dpi, template, gray=grayscale, passthrough=passthrough)
+    if staged is not None:
+        warped, M, zoom = staged
+    else:
+        img, zoom = render_page(page, dpi=dpi, gray=grayscale, passthrough=passthrough)
+        warped, M = warp_to_canonical(img, zoom)
+    results, marks, flags, scores = read_page(warped, zoom, num_questions=num_questions, choices_count=choices_count)
+    return warped, M, zoom, results, marks, flags, scores
+
+
+def _init_page_worker() -> None:
+    # Pages are already spread across processes; avoid oversubscribing cores with OpenCV threads.
+    cv2.setNumThreads(1)
+
+
+def _iter_page_chunk(
+    input_pdf_path: str,
+    page_indices: List[int],
+    dpi: int,
+    num_questions: int,
+    choices_count: int,
+    grayscale: bool = False,
+    annotate_mode: Optional[str] = ANNOTATE_RASTER,
+    escalate_dpi: Optional[int] = None,
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> Iterator[PageOutput]:
+    """
+    Recognize pages one at a time, yielding (result, annotation, flags, info). Raster annotations
+    are PNG-encoded as (png, w, h); vector ones are overlay lists; None when not annotating.
+    """
+    doc = fitz.open(input_pdf_path)
+    try:
+        for idx in page_indices:
+            result, annotated, page_flags, info = _recognize_page(
+                doc.load_page(idx),
+                dpi=dpi,
+                num_questions=num_questions,
+                choices_count=choices_count,
+                grayscale=grayscale,
+                annotate_mode=annotate_mode,
+                escalate_dpi=escalate_dpi,
+                passthrough=passthrough,
+                coarse_to_fine=coarse_to_fine,
+            )
+            if annotate_mode == ANNOTATE_RASTER:
+                annotated = _encode_annotated_page(annotated)
+            yield result, annotated, page_flags, info
+    finally:
+        doc.close()
+
+
+def _recognize_page_chunk(
+    input_pdf_path: str,
+    page_indices: List[int],
+    dpi: int,
+    num_questions: int,
+    choices_count: int,
+    grayscale: bool = False,
+    annotate_mode: Optional[str] = ANNOTATE_RASTER,
+    escalate_dpi: Optional[int] = None,
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> List[PageOutput]:
+    """
+    Recognize a contiguous run of pages. Runs in a worker process, so it opens its own document
+    and returns raster annotations PNG-encoded (much cheaper to pickle than raw BGR arrays).
+    """
+    return list(
+        _iter_page_chunk(
+            input_pdf_path, page_indices, dpi, num_questions, choices_count, grayscale, annotate_mode, escalate_dpi,
+            passthrough, coarse_to_fine,
+        )
+    )
+
+
+def _split_page_chunks(page_indices: Sequence[int], workers: int) -> List[List[int]]:
+    # A few chunks per worker keeps the pool busy when some pages are slower than others;
+    # capping the chunk size bounds how many encoded pages a finished chunk holds.
+    pages = list(page_indices)
+    page_count = len(pages)
+    n_chunks = max(1, min(page_count, max(workers * 4, -(-page_count // MAX_CHUNK_PAGES))))
+    size = -(-page_count // n_chunks)
+    return [pages[i : i + size] for i in range(0, page_count, size)]
+
+
+def _iter_recognized_pages(
+    input_pdf_path: str,
+    page_indices: Sequence[int],
+    dpi: int,
+    num_questions: int,
+    choices_count: int,
+    workers: int,
+    grayscale: bool = False,
+    annotate_mode: Optional[str] = ANNOTATE_RASTER,
+    escalate_dpi: Optional[int] = None,
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> Iterator[PageOutput]:
+    """
+    Yield the output of each page in `page_indices` in that order, using up to `workers` processes
+    (capped so each gets at least MIN_PAGES_PER_WORKER pages; a single worker means no pool).
+
+    Only about two chunks per worker are in flight at a time, so finished-but-unconsumed pages
+    never pile up. If the pool breaks, the remaining pages are recognized in this process.
+    """
+    pages = list(page_indices)
+    workers = max(1, min(int(workers), len(pages) // MIN_PAGES_PER_WORKER))
+    done = 0
+    if workers > 1:
+        chunks = deque(_split_page_chunks(pages, workers))
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_page_worker,
+            ) as pool:
+                in_flight: Deque[Any] = deque()
+
+                def submit_next() -> None:
+                    chunk = chunks.popleft()
+                    in_flight.append(
+                        pool.submit(
+                            _recognize_page_chunk,
+                            input_pdf_path, chunk, dpi, num_questions, choices_count, grayscale, annotate_mode,
+                            escalate_dpi, passthrough, coarse_to_fine,
+                        )
+                    )
+
+                while chunks and len(in_flight) < workers * 2:
+                    submit_next()
+                while in_flight:
+                    outputs = in_flight.popleft().result()
+                    if chunks:
+                        submit_next()
+                    for output in outputs:
+                        yield output
+                        done += 1
+                return
+        except (BrokenProcessPool, OSError) as exc:
+            print(f"WARNING: parallel recognition unavailable ({exc}); falling back to a single process")
+    yield from _iter_page_chunk(
+        input_pdf_path,
+        pages[done:],
+        dpi,
+        num_questions,
+        choices_count,
+        grayscale,
+        annotate_mode,
+        escalate_dpi,
+        passthrough,
+        coarse_to_fine,
+    )
 
 
 def process_pdf_to_csv_and_annotated_pdf(
     input_pdf_path: str,
     num_questions: int,
     out_csv_path: str,
-    out_annotated_pdf_path: str,
+    out_annotated_pdf_path: Optional[str],
     choices_count: int = DEFAULT_CHOICES_COUNT,
     dpi: int = 200,
     out_ambiguity_csv_path: Optional[str] = None,
     out_roster_csv_path: Optional[str] = None,
+    workers: Optional[int] = None,
+    grayscale: Optional[bool] = None,
+    annotate_mode: Optional[str] = None,
+    adaptive_dpi: Optional[bool] = None,
+    out_scores_path: Optional[str] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    dataset: Optional[JobDataset] = None,
+    cache_dir: Optional[str] = None,
+    passthrough: Optional[bool] = None,
+    coarse_to_fine: Optional[bool] = None,
 ):
+    """
+    Recognize every page of `input_pdf_path` and write results/roster/ambiguity xlsx + annotated PDF.
+
+    `workers` > 1 spreads pages over a process pool (each worker opens its own document);
+    the output is identical to a single-process run and stays in page order.
+    Defaults to `default_worker_count()`.
+
+    `grayscale` renders and warps pages single-channel; the raster annotated PDF then shows the
+    gray page under the coloured marks. None (the default) reads ANSWER_SHEET_GRAYSCALE, off
+    unless set.
+
+    `passthrough` decodes the embedded image of scanner-style pages instead of rendering them.
+    None (the default) reads ANSWER_SHEET_IMAGE_PASSTHROUGH, off unless set.
+
+    `coarse_to_fine` finds the corner marks on a low-DPI render and renders only the bubble
+    region at full DPI (vector or no annotation only). None (the default) reads
+    ANSWER_SHEET_COARSE_TO_FINE, off unless set.
+
+    `annotate_mode` is "raster" (embed re-rendered page images) or "vector" (draw the marks onto
+    a copy of the input PDF); None uses default_annotate_mode(). Pass
+    `out_annotated_pdf_path=None` to skip annotation entirely.
+
+    `adaptive_dpi` reads every page at ADAPTIVE_DPI_LOW_RATIO × `dpi` first and re-reads only
+    borderline pages (see needs_higher_dpi) at `dpi`. None (the default) reads
+    ANSWER_SHEET_ADAPTIVE_DPI, off unless set; when off, every page is read once at `dpi`.
+
+    The raw bubble scores are saved to `out_scores_path` (default: scores.npz next to
+    `out_csv_path`) so rethreshold_recognition_outputs can redo the decisions without the PDF.
+
+    `progress`, if given, is called in this process with a small dict after every page
+    ({"stage": "recognize", "page", "pages", "dpi", "flags", "elapsed", "cached"}) and once the
+    xlsx outputs are written ({"stage": "outputs", ...}); `flags` counts the flags so far,
+    `elapsed` is seconds since the call started and `cached` is how many pages came from the cache.
+
+    `dataset`, if given, also keeps the results/roster/ambiguity tables in memory for the
+    analysis stages (the xlsx files are written either way).
+
+    `cache_dir` (None, the default, disables it) holds a RecognitionCache, capped in size:
+    a page whose content and recognition settings were seen before is not rendered again, only
+    re-decided from its cached scores; pages that miss are recognized and added to the cache.
+    In raster mode a cached page is still rendered for its annotation (see redraw_raster_page),
+    but its corner search and bubble scoring are skipped.
+    """
+    started = time.perf_counter()
     num_questions = max(1, min(MAX_QUESTIONS, int(num_questions)))
     choices_count = max(3, min(5, int(choices_count)))
     out_ambiguity_csv_path = out_ambiguity_csv_path or str(Path(out_csv_path).with_name("ambiguity.xlsx"))
     out_roster_csv_path = out_roster_csv_path or str(Path(out_csv_path).with_name("roster.xlsx"))
+    out_scores_path = out_scores_path or str(Path(out_csv_path).with_name(SCORES_FILENAME))
+
+    workers = default_worker_count() if workers is None else max(1, int(workers))
+    grayscale = _env_flag(GRAYSCALE_ENV) if grayscale is None else bool(grayscale)
+    passthrough = _env_flag(IMAGE_PASSTHROUGH_ENV) if passthrough is None else bool(passthrough)
+    coarse_to_fine = _env_flag(COARSE_TO_FINE_ENV) if coarse_to_fine is None else bool(coarse_to_fine)
+    adaptive_dpi = _env_flag(ADAPTIVE_DPI_ENV) if adaptive_dpi is None else bool(adaptive_dpi)
+    escalate_dpi: Optional[int] = None
+    if adaptive_dpi:
+        escalate_dpi = int(dpi)
+        dpi = max(COARSE_DPI, int(round(escalate_dpi * ADAPTIVE_DPI_LOW_RATIO)))
+    if out_annotated_pdf_path is None:
+        annotate_mode = None
+    else:
+        annotate_mode = (annotate_mode or default_annotate_mode()).strip().lower()
+        if annotate_mode not in {ANNOTATE_VECTOR, ANNOTATE_RASTER}:
+            raise ValueError(f"annotate_mode must be {ANNOTATE_VECTOR!r} or {ANNOTATE_RASTER!r}")
+
+    cache: Optional[RecognitionCache] = None
+    if cache_dir:
+        cache = RecognitionCache(
+            cache_dir,
+            recognition_cache_settings(
+                num_questions, choices_count, dpi, escalate_dpi, grayscale, annotate_mode,
+                passthrough=passthrough, coarse_to_fine=coarse_to_fine,
+            ),
+        )
 
-    doc = fitz.open(input_pdf_path)
+    page_keys: List[str] = []
+    cached: Dict[int, Dict[str, Any]] = {}
+    with fitz.open(input_pdf_path) as doc:
+        page_count = doc.page_count
+        if cache is not None:
+            for idx in range(page_count):
+                page_keys.append(cache.key(doc, doc.load_page(idx)))
+                hit = cache.load(page_keys[idx])
+                if hit is not None:
+                    cached[idx] = hit
     people: List[Dict[str, Any]] = []
     flags: List[Dict[str, Any]] = []
-    annotated_images = []
-
-    for idx in range(doc.page_count):
-        page = doc.load_page(idx)
-        img, zoom = render_page(page, dpi=dpi)
-        warped, _ = warp_to_canonical(img, zoom)
-        result, annotated, page_flags = process_page(warped, zoom, num_questions=num_questions, choices_count=choices_count)
-        result["page"] = idx + 1
-        people.append(result)
-        for flag in page_flags:
-            flags.append({"page": idx + 1, **flag})
-        annotated_images.append(annotated)
+    infos: List[Dict[str, Any]] = []
+
+    # Annotated pages are appended to the output PDF as they arrive instead of being kept in RAM.
+    writer: Optional[Any] = None
+    if annotate_mode == ANNOTATE_RASTER:
+        writer = AnnotatedPdfWriter(out_annotated_pdf_path, dpi=dpi)
+    elif annotate_mode == ANNOTATE_VECTOR:
+        writer = VectorOverlayWriter(input_pdf_path, out_annotated_pdf_path)
+    src_doc = fitz.open(input_pdf_path) if cached and annotate_mode is not None else None
+    try:
+        recognized = _iter_recognized_pages(
+            input_pdf_path,
+            [idx for idx in range(page_count) if idx not in cached],
+            dpi=dpi,
+            num_questions=num_questions,
+            choices_count=choices_count,
+            workers=workers,
+            grayscale=grayscale,
+            annotate_mode=annotate_mode,
+            escalate_dpi=escalate_dpi,
+            passthrough=passthrough,
+            coarse_to_fine=coarse_to_fine,
+        )
+        for idx in range(page_count):
+            info = cached.get(idx)
+            if info is not None:
+                # Cache hit: only the (cheap) decision stage runs again.
+                template = get_sheet_template(num_questions, choices_count, info["zoom"])
+                result, marks, page_flags = decide_page(info["scores"], template, num_questions)
+                annotated = None
+                if annotate_mode == ANNOTATE_RASTER:
+                    annotated = _encode_annotated_page(
+                        redraw_raster_page(src_doc.load_page(idx), info, marks, grayscale, passthrough)
+                    )
+                elif annotate_mode == ANNOTATE_VECTOR:
+                    annotated = marks_to_page_overlay(marks, info["transform"], info["zoom"], src_doc.load_page(idx))
+            else:
+                result, annotated, page_flags, info = next(recognized)
+                if cache is not None:
+                    cache.store(page_keys[idx], info)
+            result["page"] = idx + 1
+            people.append(result)
+            for flag in page_flags:
+                flags.append({"page": idx + 1, **flag})
+            infos.append(info)
+            if annotate_mode == ANNOTATE_RASTER:
+                writer.add_png(*annotated, dpi=info["dpi"])
+            elif annotate_mode == ANNOTATE_VECTOR:
+                writer.add_overlay(idx, annotated)
+            if progress is not None:
+                progress(
+                    {
+                        "stage": "recognize",
+                        "page": idx + 1,
+                        "pages": page_count,
+                        "dpi": info["dpi"],
+                        "flags": len(flags),
+                        "elapsed": round(time.perf_counter() - started, 3),
+                        "cached": len(cached),
+                    }
+                )
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if src_doc is not None:
+            src_doc.close()
+    if writer is not None:
+        writer.close()
+    if cache is not None and len(cached) < page_count:
+        cache.prune()
+
+    save_page_scores(
+        out_scores_path,
+        infos,
+        num_questions=num_questions,
+        choices_count=choices_count,
+        annotate_mode=annotate_mode,
+        thresholds=decision_thresholds(),
+        grayscale=grayscale,
+        passthrough=passthrough,
+    )
+    _write_recognition_outputs(
+        people, flags, num_questions, out_csv_path, out_ambiguity_csv_path, out_roster_csv_path, dataset=dataset
+    )
+    if progress is not None:
+        progress(
+            {
+                "stage": "outputs",
+                "page": page_count,
+                "pages": page_count,
+                "flags": len(flags),
+                "elapsed": round(time.perf_counter() - started, 3),
+                "cached": len(cached),
+            }
+        )
+
+
+def _write_recognition_outputs(
+    people: List[Dict[str, Any]],
+    flags: List[Dict[str, Any]],
+    num_questions: int,
+    out_csv_path: str,
+    out_ambiguity_csv_path: str,
+    out_roster_csv_path: str,
+    dataset: Optional[JobDataset] = None,
+) -> None:
+    """
+    Write results/roster/ambiguity xlsx from per-page results (with "page") and page flags,
+    through `dataset` when given so the tables stay in memory too.
+    """
+    write_xlsx = dataset.write_xlsx if dataset is not None else write_simple_xlsx
 
     def _to_int_str(value: Any) -> Optional[str]:
         if value is None:
@@ -781,7 +1952,7 @@ def process_pdf_to_csv_and_annotated_pdf(
                 str(row.get("page", "") or ""),
             ]
         )
-    write_simple_xlsx(Path(out_roster_csv_path), rows=roster_rows, sheet_name="roster")
+    write_xlsx(Path(out_roster_csv_path), rows=roster_rows, sheet_name="roster")
 
     # Transposed output: columns=people, rows=questions
     results_rows: List[List[Any]] = [["number", *person_ids]]
@@ -790,7 +1961,7 @@ def process_pdf_to_csv_and_annotated_pdf(
         for person in people_sorted:
             row_out.append(person.get(f"Q{q}", "") or "")
         results_rows.append(row_out)
-    write_simple_xlsx(Path(out_csv_path), rows=results_rows, sheet_name="results")
+    write_xlsx(Path(out_csv_path), rows=results_rows, sheet_name="results")
 
     # Ambiguity/blank report
     people_by_page = {int(row["page"]): row for row in people if "page" in row}
@@ -824,7 +1995,353 @@ def process_pdf_to_csv_and_annotated_pdf(
                 flag.get("second_label", ""),
             ]
         )
-    write_simple_xlsx(Path(out_ambiguity_csv_path), rows=ambiguity_rows, sheet_name="ambiguity")
+    write_xlsx(Path(out_ambiguity_csv_path), rows=ambiguity_rows, sheet_name="ambiguity")
+
+
+SCORES_FILENAME = "scores.npz"
+SCORES_FORMAT_VERSION = 1
+
+
+def save_page_scores(
+    path: Union[str, Path],
+    infos: Sequence[Dict[str, Any]],
+    num_questions: int,
+    choices_count: int,
+    annotate_mode: Optional[str],
+    thresholds: Dict[str, float],
+    grayscale: bool = False,
+    passthrough: bool = False,
+) -> None:
+    """
+    Save one job's bubble scores (the `info` dicts from _recognize_page, in page order) as a
+    compressed .npz next to the xlsx outputs:
+
+      scores      float32 [pages, bubbles], columns in SheetTemplate order
+                  (template.field_slice("Q3") picks one field's choices)
+      zoom, dpi   per page, the resolution each page was read at
+      transforms  float64 [pages, 3, 3], page image -> canonical warp (for vector annotation)
+
+    plus the sheet layout, annotate mode, the render options a raster annotation is redrawn with
+    (`grayscale`, `passthrough`) and the thresholds the current outputs were decided with.
+    """
+    template = get_sheet_template(num_questions, choices_count)
+    n = len(infos)
+    scores = np.zeros((n, template.n_bubbles), dtype=np.float32)
+    zooms = np.zeros(n, dtype=np.float64)
+    dpis = np.zeros(n, dtype=np.int32)
+    transforms = np.zeros((n, 3, 3), dtype=np.float64)
+    for i, info in enumerate(infos):
+        scores[i] = info["scores"]
+        zooms[i] = info["zoom"]
+        dpis[i] = info["dpi"]
+        transforms[i] = info["transform"]
+
+    path = Path(path)
+    part_path = path.with_name(path.name + ".part")
+    with open(part_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            version=np.int32(SCORES_FORMAT_VERSION),
+            num_questions=np.int32(num_questions),
+            choices_count=np.int32(choices_count),
+            annotate_mode=np.str_(annotate_mode or ""),
+            thresholds=np.str_(json.dumps(thresholds, sort_keys=True)),
+            render=np.str_(json.dumps({"grayscale": bool(grayscale), "passthrough": bool(passthrough)})),
+            scores=scores,
+            zoom=zooms,
+            dpi=dpis,
+            transforms=transforms,
+        )
+    os.replace(part_path, path)
+
+
+def load_page_scores(path: Union[str, Path]) -> Dict[str, Any]:
+    """Read a save_page_scores file back into a dict (arrays plus plain Python metadata)."""
+    with np.load(str(path), allow_pickle=False) as data:
+        version = int(data["version"])
+        if version != SCORES_FORMAT_VERSION:
+            raise ValueError(f"Unsupported scores file version {version} (expected {SCORES_FORMAT_VERSION})")
+        # Files written before the render options were recorded were rendered with the defaults.
+        render = json.loads(str(data["render"])) if "render" in data.files else {}
+        return {
+            "num_questions": int(data["num_questions"]),
+            "choices_count": int(data["choices_count"]),
+            "annotate_mode": str(data["annotate_mode"]) or None,
+            "thresholds": json.loads(str(data["thresholds"])),
+            "grayscale": bool(render.get("grayscale", False)),
+            "passthrough": bool(render.get("passthrough", False)),
+            "scores": data["scores"],
+            "zoom": data["zoom"],
+            "dpi": data["dpi"],
+            "transforms": data["transforms"],
+        }
+
+
+# Bump when recognition changes in a way that alters the scores of an unchanged page.
+RECOGNITION_CACHE_VERSION = 1
+# Size the cache may grow to; past it the least recently used entries are deleted (see prune).
+RECOGNITION_CACHE_MAX_MB = _env_float("ANSWER_SHEET_RECOGNITION_CACHE_MAX_MB", 256)
+
+
+def _page_content_digest(doc: fitz.Document, page: fitz.Page) -> str:
+    """
+    sha256 of what a page renders from: its geometry, content stream, and the raw (still encoded)
+    streams and descriptions of the images, form XObjects and fonts it uses. Object numbers are
+    left out, so the same page copied into another PDF gets the same digest. No pixel is decoded.
+    """
+    h = hashlib.sha256()
+    h.update(repr((tuple(page.rect), tuple(page.mediabox), page.rotation)).encode("ascii"))
+    h.update(page.read_contents())
+    streams: List[int] = []
+    for item in page.get_images(full=True):
+        h.update(repr(item[2:9]).encode("utf-8", "replace"))  # size, bpc, colorspaces, name, filter
+        streams.extend(x for x in item[:2] if x)  # image and its soft mask
+    for item in page.get_xobjects():
+        h.update(repr((item[1], tuple(item[3]))).encode("utf-8", "replace"))
+        streams.append(item[0])
+    for item in page.get_fonts(full=True):
+        h.update(repr(item[1:6]).encode("utf-8", "replace"))  # ext, type, base font, name, encoding
+    for xref in streams:
+        if xref and doc.xref_is_stream(xref):
+            h.update(doc.xref_stream_raw(xref) or b"")
+    return h.hexdigest()
+
+
+def recognition_cache_settings(
+    num_questions: int,
+    choices_count: int,
+    dpi: int,
+    escalate_dpi: Optional[int],
+    grayscale: bool,
+    annotate_mode: Optional[str],
+    passthrough: bool = False,
+    coarse_to_fine: bool = False,
+) -> str:
+    """
+    Everything besides the page itself that a page's scores depend on, as a canonical string:
+    the cache version, the sheet layout, the read/escalation DPIs, the render options and the
+    decision thresholds (they decide which pages are re-read at the higher DPI).
+    """
+    template = get_sheet_template(num_questions, choices_count)
+    layout = hashlib.sha256(np.stack([template.x_pt, template.y_pt, template.r_pt]).tobytes()).hexdigest()
+    return json.dumps(
+        {
+            "version": RECOGNITION_CACHE_VERSION,
+            "num_questions": int(num_questions),
+            "choices_count": int(choices_count),
+            "layout": layout,
+            "page_size": [template.page_w, template.page_h],
+            "dpi": int(dpi),
+            "escalate_dpi": int(escalate_dpi) if escalate_dpi else None,
+            "adaptive_margin": ADAPTIVE_SCORE_MARGIN,
+            "grayscale": bool(grayscale),
+            "image_passthrough": bool(passthrough),
+            "coarse_to_fine": bool(coarse_to_fine and annotate_mode != ANNOTATE_RASTER),
+            "coarse_dpi": COARSE_DPI,
+            "thresholds": decision_thresholds(),
+        },
+        sort_keys=True,
+    )
+
+
+class RecognitionCache:
+    """
+    Content-addressed store of per-page recognition `info` (scores, zoom, dpi, transform; see
+    _recognize_page), one small .npz per page under `cache_dir`, keyed by the page's content
+    digest plus recognition_cache_settings. Any job reading an identical page with the same
+    settings gets the scores back without rendering it. Unreadable entries count as misses.
+
+    Hits refresh an entry's mtime, and prune keeps the whole store under `max_bytes` (default
+    RECOGNITION_CACHE_MAX_MB) by deleting the entries used least recently.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path], settings: str, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self._settings = settings.encode("utf-8")
+        self.max_bytes = int(RECOGNITION_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else int(max_bytes)
+
+    def key(self, doc: fitz.Document, page: fitz.Page) -> str:
+        h = hashlib.sha256(self._settings)
+        h.update(_page_content_digest(doc, page).encode("ascii"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.npz"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with np.load(str(path), allow_pickle=False) as data:
+                if int(data["version"]) != RECOGNITION_CACHE_VERSION:
+                    return None
+                info = {
+                    "dpi": int(data["dpi"]),
+                    "zoom": float(data["zoom"]),
+                    "transform": data["transform"],
+                    "scores": data["scores"],
+                }
+        except Exception as exc:
+            print(f"WARNING: Ignoring unreadable recognition cache entry {path.name}: {exc}")
+            return None
+        try:
+            os.utime(path)  # mark as recently used for prune
+        except OSError:
+            pass
+        return info
+
+    def store(self, key: str, info: Dict[str, Any]) -> None:
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: two jobs may cache the same page at the same time.
+            fd, part_path = tempfile.mkstemp(prefix=path.name, suffix=".part", dir=str(path.parent))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(
+                        f,
+                        version=np.int32(RECOGNITION_CACHE_VERSION),
+                        dpi=np.int32(info["dpi"]),
+                        zoom=np.float64(info["zoom"]),
+                        transform=np.asarray(info["transform"], dtype=np.float64),
+                        scores=np.asarray(info["scores"], dtype=np.float64),
+                    )
+                os.replace(part_path, path)
+            except BaseException:
+                try:
+                    os.remove(part_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as exc:
+            print(f"WARNING: Failed to write recognition cache entry {path.name}: {exc}")
+
+    def prune(self) -> int:
+        """
+        If the entries take more than `max_bytes`, delete the least recently used ones until
+        they fit in 90% of it (so the next few jobs do not prune again). Returns how many
+        entries were deleted.
+        """
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for path in self.cache_dir.glob("*/*.npz"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by a concurrent prune
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return 0
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
 
-    images_to_pdf(annotated_images, out_annotated_pdf_path, dpi=dpi)
-    doc.close()
+
+def rethreshold_recognition_outputs(
+    scores_path: str,
+    out_csv_path: str,
+    thresholds: Optional[Dict[str, Any]] = None,
+    out_ambiguity_csv_path: Optional[str] = None,
+    out_roster_csv_path: Optional[str] = None,
+    input_pdf_path: Optional[str] = None,
+    out_annotated_pdf_path: Optional[str] = None,
+    dataset: Optional[JobDataset] = None,
+) -> Dict[str, Any]:
+    """
+    Re-run only the decision stage (pick_one / pick_choice_multi) on saved bubble scores and
+    rewrite results/roster/ambiguity xlsx; no bubble is scored again. `thresholds` overrides
+    decision_thresholds() (keys THRESHOLD_KEYS).
+
+    If the job was annotated and both `input_pdf_path` and `out_annotated_pdf_path` are given,
+    the annotated PDF is redrawn with the new decisions too: vector marks straight from the saved
+    transforms, raster pages by re-rendering them (see redraw_raster_page). The scores file is
+    updated to record the new thresholds; `dataset` is as for
+    process_pdf_to_csv_and_annotated_pdf. Returns {"pages", "flags", "num_questions",
+    "thresholds", "annotated"}.
+    """
+    saved = load_page_scores(scores_path)
+    th = decision_thresholds(thresholds)
+    num_questions = saved["num_questions"]
+    choices_count = saved["choices_count"]
+    out_ambiguity_csv_path = out_ambiguity_csv_path or str(Path(out_csv_path).with_name("ambiguity.xlsx"))
+    out_roster_csv_path = out_roster_csv_path or str(Path(out_csv_path).with_name("roster.xlsx"))
+
+    annotate_mode = saved["annotate_mode"]
+    redraw = bool(
+        annotate_mode in {ANNOTATE_VECTOR, ANNOTATE_RASTER} and input_pdf_path and out_annotated_pdf_path
+    )
+    writer: Optional[Any] = None
+    if redraw and annotate_mode == ANNOTATE_RASTER:
+        writer = AnnotatedPdfWriter(out_annotated_pdf_path)
+    elif redraw:
+        writer = VectorOverlayWriter(input_pdf_path, out_annotated_pdf_path)
+    src_doc = fitz.open(input_pdf_path) if redraw else None
+    people: List[Dict[str, Any]] = []
+    flags: List[Dict[str, Any]] = []
+    try:
+        for idx, page_scores in enumerate(saved["scores"]):
+            zoom = float(saved["zoom"][idx])
+            template = get_sheet_template(num_questions, choices_count, zoom)
+            result, marks, page_flags = decide_page(page_scores, template, num_questions, thresholds=th)
+            result["page"] = idx + 1
+            people.append(result)
+            for flag in page_flags:
+                flags.append({"page": idx + 1, **flag})
+            if annotate_mode == ANNOTATE_RASTER and writer is not None:
+                info = {"dpi": int(saved["dpi"][idx]), "transform": saved["transforms"][idx]}
+                img = redraw_raster_page(
+                    src_doc.load_page(idx), info, marks, saved["grayscale"], saved["passthrough"]
+                )
+                writer.add_png(*_encode_annotated_page(img), dpi=info["dpi"])
+            elif writer is not None:
+                page = src_doc.load_page(idx)
+                writer.add_overlay(idx, marks_to_page_overlay(marks, saved["transforms"][idx], zoom, page))
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if src_doc is not None:
+            src_doc.close()
+    if writer is not None:
+        writer.close()
+
+    _write_recognition_outputs(
+        people, flags, num_questions, out_csv_path, out_ambiguity_csv_path, out_roster_csv_path, dataset=dataset
+    )
+    save_page_scores(
+        scores_path,
+        [
+            {
+                "scores": saved["scores"][i],
+                "zoom": saved["zoom"][i],
+                "dpi": saved["dpi"][i],
+                "transform": saved["transforms"][i],
+            }
+            for i in range(saved["scores"].shape[0])
+        ],
+        num_questions=num_questions,
+        choices_count=choices_count,
+        annotate_mode=annotate_mode,
+        thresholds=th,
+        grayscale=saved["grayscale"],
+        passthrough=saved["passthrough"],
+    )
+    return {
+        "pages": len(people),
+        "flags": len(flags),
+        "num_questions": num_questions,
+        "thresholds": th,
+        "annotated": redraw,
+    }
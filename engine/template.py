@@ -0,0 +1,170 @@
+"""
+Compiled sheet templates shared by the generator and the recognizer.
+
+A SheetTemplate lists every bubble of one sheet layout as flat numpy arrays (struct-of-arrays):
+centre and radius in PDF points, the matching pixel bbox at a given zoom, and which field/option
+each bubble belongs to. Fields are stored back to back in a fixed order:
+
+    grade, class_no, seat_tens, seat_ones, Q1 … Qn
+
+Templates are built once per (num_questions, choices_count, zoom, page size) and kept in a
+bounded cache, so neither side recomputes the layout per page or per bubble.
+"""
+
+from __future__ import annotations
+
+import functools
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from .config import (
+    PAGE_W_PT, PAGE_H_PT,
+    GRADE_VALUES, GRADE_CIRCLE_XS, GRADE_CIRCLE_Y, GRADE_CIRCLE_RADIUS,
+    CLASS_VALUES, CLASS_CIRCLE_XS, CLASS_CIRCLE_Y, CLASS_CIRCLE_RADIUS,
+    SEAT_DIGITS, SEAT_START_X, SEAT_STEP_X, SEAT_TOP_ROW_Y, SEAT_BOTTOM_ROW_Y, SEAT_CIRCLE_RADIUS,
+    MAX_QUESTIONS, MIN_CHOICES_COUNT, MAX_CHOICES_COUNT, DEFAULT_CHOICES_COUNT,
+    BUBBLE_RADIUS, COL_COUNT,
+    make_choices, compute_answer_layout,
+)
+
+FIELD_GRADE = "grade"
+FIELD_CLASS = "class_no"
+FIELD_SEAT_TENS = "seat_tens"
+FIELD_SEAT_ONES = "seat_ones"
+IDENTITY_FIELDS = (FIELD_GRADE, FIELD_CLASS, FIELD_SEAT_TENS, FIELD_SEAT_ONES)
+
+
+class SheetTemplate:
+    """
+    Every bubble of one sheet layout, as read-only arrays of length `n_bubbles`.
+
+    Point coordinates (`x_pt`, `y_pt`, `r_pt`) are PDF points with y pointing up on a
+    `page_w` × `page_h` page. Pixel coordinates (`cx_px`, `cy_px`, `r_px`, `bboxes`) are image
+    coordinates (y down) at `zoom`; `bboxes` matches recognizer.bubble_bbox_px exactly.
+    """
+
+    def __init__(
+        self,
+        num_questions: int,
+        choices_count: int,
+        zoom: float,
+        page_w: float = PAGE_W_PT,
+        page_h: float = PAGE_H_PT,
+    ):
+        self.num_questions = int(num_questions)
+        self.choices = make_choices(choices_count)
+        self.zoom = float(zoom)
+        self.page_w = page_w
+        self.page_h = page_h
+
+        # Identity bubbles hang off the top edge (and the seat box off the right edge), so on a
+        # page of another size they move with that edge, like the generator's constants do.
+        dx = page_w - PAGE_W_PT
+        dy = page_h - PAGE_H_PT
+
+        fields: List[str] = []
+        labels: List[List[str]] = []
+        xs: List[float] = []
+        ys: List[float] = []
+        rs: List[float] = []
+
+        def add(field: str, field_labels: List[str], field_xs: List[float], y: float, r: float) -> None:
+            fields.append(field)
+            labels.append(field_labels)
+            xs.extend(field_xs)
+            ys.extend([y] * len(field_xs))
+            rs.extend([r] * len(field_xs))
+
+        add(FIELD_GRADE, [str(v) for v in GRADE_VALUES], list(GRADE_CIRCLE_XS), GRADE_CIRCLE_Y + dy, GRADE_CIRCLE_RADIUS)
+        add(FIELD_CLASS, [str(v) for v in CLASS_VALUES], list(CLASS_CIRCLE_XS), CLASS_CIRCLE_Y + dy, CLASS_CIRCLE_RADIUS)
+        seat_xs = [SEAT_START_X + dx + i * SEAT_STEP_X for i in range(len(SEAT_DIGITS))]
+        seat_labels = [str(d) for d in SEAT_DIGITS]
+        add(FIELD_SEAT_TENS, seat_labels, seat_xs, SEAT_TOP_ROW_Y + dy, SEAT_CIRCLE_RADIUS)
+        add(FIELD_SEAT_ONES, seat_labels, seat_xs, SEAT_BOTTOM_ROW_Y + dy, SEAT_CIRCLE_RADIUS)
+
+        layout = compute_answer_layout(self.num_questions, choices_count=choices_count, page_w=page_w, page_h=page_h)
+        q = 1
+        for col in range(COL_COUNT):
+            for row in range(layout["rows_per_col"]):
+                if q > self.num_questions:
+                    break
+                y = layout["first_row_y"] - (row * layout["row_step"])
+                add(f"Q{q}", list(self.choices), list(layout["bubble_xs"][col]), y, BUBBLE_RADIUS)
+                q += 1
+
+        self.layout = layout
+        self.fields = fields
+        self.field_labels = labels
+        self.field_index: Dict[str, int] = {name: i for i, name in enumerate(fields)}
+        counts = np.asarray([len(lbl) for lbl in labels], dtype=np.int64)
+        self.field_start = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.field_of = np.repeat(np.arange(len(fields), dtype=np.int16), counts)
+        self.option_of = np.concatenate([np.arange(c, dtype=np.int8) for c in counts])
+
+        self.x_pt = np.asarray(xs, dtype=np.float64)
+        self.y_pt = np.asarray(ys, dtype=np.float64)
+        self.r_pt = np.asarray(rs, dtype=np.float64)
+
+        self.cx_px = self.x_pt * self.zoom
+        self.cy_px = (page_h - self.y_pt) * self.zoom  # convert PDF y-up to image y-down
+        self.r_px = self.r_pt * self.zoom
+        # int() in bubble_bbox_px truncates toward zero; np.trunc keeps the boxes identical.
+        self.bboxes = np.stack(
+            [
+                np.trunc(self.cx_px - self.r_px - 2),
+                np.trunc(self.cy_px - self.r_px - 2),
+                np.trunc(self.cx_px + self.r_px + 2),
+                np.trunc(self.cy_px + self.r_px + 2),
+            ],
+            axis=1,
+        ).astype(np.int64)
+        self.bbox_tuples: List[Tuple[int, int, int, int]] = [tuple(row) for row in self.bboxes.tolist()]
+
+        for arr in (
+            self.field_start, self.field_of, self.option_of,
+            self.x_pt, self.y_pt, self.r_pt, self.cx_px, self.cy_px, self.r_px, self.bboxes,
+        ):
+            arr.setflags(write=False)
+
+    @property
+    def n_bubbles(self) -> int:
+        return int(self.x_pt.shape[0])
+
+    def question_field(self, q: int) -> str:
+        return f"Q{int(q)}"
+
+    def field_slice(self, field: Union[str, int]) -> slice:
+        i = self.field_index[field] if isinstance(field, str) else int(field)
+        return slice(int(self.field_start[i]), int(self.field_start[i + 1]))
+
+    def points(self, field: Union[str, int]) -> List[Tuple[float, float, float]]:
+        """(x, y, r) in PDF points for each bubble of one field, as plain floats for drawing."""
+        s = self.field_slice(field)
+        return list(zip(self.x_pt[s].tolist(), self.y_pt[s].tolist(), self.r_pt[s].tolist()))
+
+
+@functools.lru_cache(maxsize=32)
+def _cached_template(
+    num_questions: int,
+    choices_count: int,
+    zoom: float,
+    page_w: float,
+    page_h: float,
+) -> SheetTemplate:
+    return SheetTemplate(num_questions, choices_count, zoom, page_w=page_w, page_h=page_h)
+
+
+def get_sheet_template(
+    num_questions: int,
+    choices_count: int = DEFAULT_CHOICES_COUNT,
+    zoom: float = 1.0,
+    page_w: float = PAGE_W_PT,
+    page_h: float = PAGE_H_PT,
+) -> SheetTemplate:
+    """Return the (cached, shared, read-only) template for one sheet layout."""
+    num_questions = max(1, min(MAX_QUESTIONS, int(num_questions)))
+    choices_count = int(choices_count)
+    if not (MIN_CHOICES_COUNT <= choices_count <= MAX_CHOICES_COUNT):
+        raise ValueError(f"choices_count must be {MIN_CHOICES_COUNT}–{MAX_CHOICES_COUNT}")
+    return _cached_template(num_questions, choices_count, float(zoom), float(page_w), float(page_h))
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import html
+import json
+import os
 import re
 import zipfile
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 from xml.etree import ElementTree as ET
 
+import numpy as np
+
 
 _NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
 _NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
@@ -38,206 +42,270 @@ def _cell_ref(col0: int, row1: int) -> str:
     return f"{_index_to_col_letters(col0)}{row1}"
 
 
-def write_simple_xlsx(path: Path, rows: List[List[Any]], sheet_name: str = "Sheet1") -> None:
-    """
-    Write a minimal .xlsx with inline strings (no styles/sharedStrings) that Excel can open.
+# Column letters A … XFD (Excel's 16,384-column limit), so cell refs need no per-cell conversion.
+_COL_LETTERS: Tuple[str, ...] = tuple(_index_to_col_letters(i) for i in range(16384))
+# Cells of worksheet XML buffered before each write into the zip entry.
+_STREAM_FLUSH_CELLS = 8192
+
+_XML_DECL = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+_REL_WORKSHEET = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+_REL_SHARED_STRINGS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"
+_REL_OFFICE_DOCUMENT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+_CT_PREFIX = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+TABLE_SIDECAR_VERSION = 1
 
-    This is intentionally tiny to avoid extra dependencies (e.g. openpyxl).
-    """
-    path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
 
-    def esc(s: str) -> str:
-        return html.escape(s, quote=False)
+def _esc(s: str) -> str:
+    return html.escape(s, quote=False)
 
-    # sheet1.xml
-    sheet_rows: List[str] = []
+
+def _unique_sheet_names(names: Sequence[Optional[str]]) -> List[str]:
+    """Excel-safe sheet names: at most 31 characters, duplicates suffixed _2, _3, …"""
+    out: List[str] = []
+    used_names: set[str] = set()
+    for idx, name in enumerate(names, start=1):
+        base = (name or f"Sheet{idx}").strip() or f"Sheet{idx}"
+        base = base[:31]
+        sheet_name = base
+        suffix = 2
+        while sheet_name in used_names:
+            tail = f"_{suffix}"
+            sheet_name = (base[: max(0, 31 - len(tail))] + tail) if len(base) + len(tail) > 31 else (base + tail)
+            suffix += 1
+        used_names.add(sheet_name)
+        out.append(sheet_name)
+    return out
+
+
+def _stream_sheet_xml(
+    out: IO[bytes],
+    rows: Iterable[Sequence[Any]],
+    shared: Dict[str, int],
+    table_out: Optional[IO[str]] = None,
+) -> Tuple[int, int]:
+    """
+    Write one worksheet's XML to `out` as the rows arrive. Text cells go through `shared`
+    (string -> sharedStrings index, filled in as new strings appear), except text with
+    leading/trailing whitespace, which stays an inline string exactly as before.
+
+    With `table_out`, each row is also written there as a JSON line of the strings
+    read_simple_xlsx_table will return for it. Returns (rows, columns) up to the last written cell.
+    """
+    letters = _COL_LETTERS
+    n_letters = len(letters)
+    out.write(f'{_XML_DECL}<worksheet xmlns="{_NS_MAIN}"><sheetData>'.encode("utf-8"))
+    parts: List[str] = []
+    pending = 0
+    max_r = 0
+    max_c = 0
     for r_idx0, row in enumerate(rows):
         r1 = r_idx0 + 1
         cells: List[str] = []
+        texts: List[str] = []
         for c_idx0, value in enumerate(row):
-            ref = _cell_ref(c_idx0, r1)
             if value is None or value == "":
+                if table_out is not None:
+                    texts.append("")
                 continue
+            if c_idx0 >= max_c:
+                max_c = c_idx0 + 1
+            col = letters[c_idx0] if c_idx0 < n_letters else _index_to_col_letters(c_idx0)
             if isinstance(value, (int, float)) and not isinstance(value, bool):
-                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
-            else:
-                text = esc(str(value))
-                cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>')
+                cells.append(f'<c r="{col}{r1}"><v>{value}</v></c>')
+                if table_out is not None:
+                    texts.append(f"{value}")
+                continue
+            text = str(value)
+            if table_out is not None:
+                # An XML parser reads a literal CR back as LF.
+                texts.append((text.replace("\r\n", "\n").replace("\r", "\n") if "\r" in text else text).strip())
+            idx = shared.get(text)
+            if idx is None:
+                if text != text.strip():
+                    cells.append(f'<c r="{col}{r1}" t="inlineStr"><is><t>{_esc(text)}</t></is></c>')
+                    continue
+                idx = shared[text] = len(shared)
+            cells.append(f'<c r="{col}{r1}" t="s"><v>{idx}</v></c>')
         if cells:
-            sheet_rows.append(f'<row r="{r1}">{"".join(cells)}</row>')
+            max_r = r1
+            parts.append(f'<row r="{r1}">{"".join(cells)}</row>')
         else:
-            sheet_rows.append(f'<row r="{r1}"/>')
-
-    sheet_xml = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<worksheet xmlns="{_NS_MAIN}"><sheetData>'
-        f'{"".join(sheet_rows)}'
-        f"</sheetData></worksheet>"
-    )
-
-    # workbook.xml
-    sheet_name = (sheet_name or "Sheet1").strip() or "Sheet1"
-    sheet_name = sheet_name[:31]  # Excel sheet name limit
-    workbook_xml = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
-        f"<sheets>"
-        f'<sheet name="{esc(sheet_name)}" sheetId="1" r:id="rId1"/>'
-        f"</sheets>"
-        f"</workbook>"
-    )
-
-    # workbook.xml.rels
-    workbook_rels = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<Relationships xmlns="{_NS_PKG_REL}">'
-        f'<Relationship Id="rId1" '
-        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
-        f'Target="worksheets/sheet1.xml"/>'
-        f"</Relationships>"
-    )
-
-    # package .rels
-    rels = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<Relationships xmlns="{_NS_PKG_REL}">'
-        f'<Relationship Id="rId1" '
-        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
-        f'Target="xl/workbook.xml"/>'
-        f"</Relationships>"
-    )
-
-    # [Content_Types].xml
-    content_types = (
-        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
-        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
-        '<Default Extension="xml" ContentType="application/xml"/>'
-        '<Override PartName="/xl/workbook.xml" '
-        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
-        '<Override PartName="/xl/worksheets/sheet1.xml" '
-        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
-        "</Types>"
-    )
-
-    with zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("[Content_Types].xml", content_types)
-        zf.writestr("_rels/.rels", rels)
-        zf.writestr("xl/workbook.xml", workbook_xml)
-        zf.writestr("xl/_rels/workbook.xml.rels", workbook_rels)
-        zf.writestr("xl/worksheets/sheet1.xml", sheet_xml)
+            parts.append(f'<row r="{r1}"/>')
+        if table_out is not None:
+            while texts and not texts[-1]:
+                texts.pop()
+            table_out.write(json.dumps(texts, ensure_ascii=False) + "\n")
+        pending += len(cells) + 1
+        if pending >= _STREAM_FLUSH_CELLS:
+            out.write("".join(parts).encode("utf-8"))
+            parts = []
+            pending = 0
+    parts.append("</sheetData></worksheet>")
+    out.write("".join(parts).encode("utf-8"))
+    return max_r, max_c
+
+
+def _table_sidecar_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.rows.jsonl")
+
+
+def _read_table_sidecar(path: Path) -> Optional[List[List[str]]]:
+    """
+    The first-sheet table saved next to `path` by write_xlsx_stream, or None if there is none or
+    it does not match the workbook's current size and mtime (the workbook changed since).
+    """
+    try:
+        st = path.stat()
+        with open(_table_sidecar_path(path), "r", encoding="utf-8") as f:
+            lines = f.read().rstrip("\n").split("\n")
+        meta = json.loads(lines[-1])
+        if (
+            meta.get("version") != TABLE_SIDECAR_VERSION
+            or meta.get("size") != st.st_size
+            or meta.get("mtime_ns") != st.st_mtime_ns
+        ):
+            return None
+        n_rows = int(meta["rows"])
+        n_cols = int(meta["cols"])
+        if n_rows > len(lines) - 1:
+            return None
+        rows = json.loads("[" + ",".join(lines[:n_rows]) + "]") if n_rows > 0 else []
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if n_rows <= 0 or n_cols <= 0:
+        return []
+    return [row + [""] * (n_cols - len(row)) if len(row) < n_cols else row for row in rows]
 
 
-def write_simple_xlsx_multi(path: Path, sheets: List[Tuple[str, List[List[Any]]]]) -> None:
+def write_xlsx_stream(path: Path, sheets: Iterable[Tuple[Optional[str], Iterable[Sequence[Any]]]]) -> None:
     """
-    Write a minimal .xlsx with multiple sheets using inline strings (no styles/sharedStrings).
+    Write an .xlsx from (sheet name, rows) pairs, streaming each worksheet into its zip entry
+    while its rows are produced, so rows may come from a generator and memory does not grow
+    with the sheet size. Text cells share one sharedStrings table (a repeated student id or
+    "空白" is stored once); numbers are written as is. Sheet names are made Excel-safe as in
+    write_simple_xlsx_multi; a workbook without sheets gets one empty "Sheet1".
+
+    The first sheet's table is also saved to a hidden JSON-lines sidecar next to the workbook
+    (stamped with the workbook's size and mtime), which read_simple_xlsx_table uses instead of
+    parsing the XML for as long as the workbook is unchanged.
     """
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
-    def esc(s: str) -> str:
-        return html.escape(s, quote=False)
+    shared: Dict[str, int] = {}
+    raw_names: List[Optional[str]] = []
+    sidecar_path = _table_sidecar_path(path)
+    sidecar_part = sidecar_path.with_name(sidecar_path.name + ".part")
+    table_shape = (0, 0)
+    try:
+        with zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED) as zf, open(
+            sidecar_part, "w", encoding="utf-8"
+        ) as table_out:
+            for name, rows in sheets:
+                raw_names.append(name)
+                first = len(raw_names) == 1
+                with zf.open(f"xl/worksheets/sheet{len(raw_names)}.xml", mode="w", force_zip64=True) as out:
+                    shape = _stream_sheet_xml(out, rows, shared, table_out if first else None)
+                if first:
+                    table_shape = shape
+            if not raw_names:
+                raw_names.append("Sheet1")
+                zf.writestr(
+                    "xl/worksheets/sheet1.xml",
+                    f'{_XML_DECL}<worksheet xmlns="{_NS_MAIN}"><sheetData><row r="1"/></sheetData></worksheet>',
+                )
+            n_sheets = len(raw_names)
+
+            if shared:
+                with zf.open("xl/sharedStrings.xml", mode="w", force_zip64=True) as out:
+                    out.write(
+                        f'{_XML_DECL}<sst xmlns="{_NS_MAIN}" count="{len(shared)}" uniqueCount="{len(shared)}">'.encode("utf-8")
+                    )
+                    batch: List[str] = []
+                    for text in shared:  # dicts keep insertion order = index order
+                        batch.append(f"<si><t>{_esc(text)}</t></si>")
+                        if len(batch) >= 4096:
+                            out.write("".join(batch).encode("utf-8"))
+                            batch = []
+                    batch.append("</sst>")
+                    out.write("".join(batch).encode("utf-8"))
+
+            sheet_nodes = "".join(
+                f'<sheet name="{_esc(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                for i, name in enumerate(_unique_sheet_names(raw_names), start=1)
+            )
+            rel_nodes = [
+                f'<Relationship Id="rId{i}" Type="{_REL_WORKSHEET}" Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, n_sheets + 1)
+            ]
+            overrides = [f'<Override PartName="/xl/workbook.xml" ContentType="{_CT_PREFIX}.sheet.main+xml"/>']
+            overrides.extend(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{_CT_PREFIX}.worksheet+xml"/>'
+                for i in range(1, n_sheets + 1)
+            )
+            if shared:
+                rel_nodes.append(
+                    f'<Relationship Id="rId{n_sheets + 1}" Type="{_REL_SHARED_STRINGS}" Target="sharedStrings.xml"/>'
+                )
+                overrides.append(f'<Override PartName="/xl/sharedStrings.xml" ContentType="{_CT_PREFIX}.sharedStrings+xml"/>')
+
+            zf.writestr(
+                "[Content_Types].xml",
+                f'{_XML_DECL}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                f"{''.join(overrides)}</Types>",
+            )
+            zf.writestr(
+                "_rels/.rels",
+                f'{_XML_DECL}<Relationships xmlns="{_NS_PKG_REL}">'
+                f'<Relationship Id="rId1" Type="{_REL_OFFICE_DOCUMENT}" Target="xl/workbook.xml"/>'
+                "</Relationships>",
+            )
+            zf.writestr(
+                "xl/workbook.xml",
+                f'{_XML_DECL}<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheet_nodes}</sheets></workbook>',
+            )
+            zf.writestr(
+                "xl/_rels/workbook.xml.rels",
+                f'{_XML_DECL}<Relationships xmlns="{_NS_PKG_REL}">{"".join(rel_nodes)}</Relationships>',
+            )
+        st = path.stat()
+        with open(sidecar_part, "a", encoding="utf-8") as table_out:
+            meta = {
+                "version": TABLE_SIDECAR_VERSION,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "rows": table_shape[0],
+                "cols": table_shape[1],
+            }
+            table_out.write(json.dumps(meta) + "\n")
+        os.replace(sidecar_part, sidecar_path)
+    except BaseException:
+        for leftover in (path, sidecar_part):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+        raise
+
+
+def write_simple_xlsx(path: Path, rows: Iterable[Sequence[Any]], sheet_name: str = "Sheet1") -> None:
+    """
+    Write a minimal single-sheet .xlsx (no styles) that Excel can open; see write_xlsx_stream.
+
+    This is intentionally tiny to avoid extra dependencies (e.g. openpyxl).
+    """
+    write_xlsx_stream(path, [((sheet_name or "Sheet1").strip() or "Sheet1", rows)])
 
+
+def write_simple_xlsx_multi(path: Path, sheets: List[Tuple[str, List[List[Any]]]]) -> None:
+    """
+    Write a minimal .xlsx with multiple sheets (no styles); see write_xlsx_stream.
+    """
     if not sheets:
         sheets = [("Sheet1", [[""]])]
-
-    norm_sheets: List[Tuple[str, List[List[Any]]]] = []
-    used_names: set[str] = set()
-    for idx, (name, rows) in enumerate(sheets, start=1):
-        base = (name or f"Sheet{idx}").strip() or f"Sheet{idx}"
-        base = base[:31]
-        sheet_name = base
-        suffix = 2
-        while sheet_name in used_names:
-            tail = f"_{suffix}"
-            sheet_name = (base[: max(0, 31 - len(tail))] + tail) if len(base) + len(tail) > 31 else (base + tail)
-            suffix += 1
-        used_names.add(sheet_name)
-        norm_sheets.append((sheet_name, rows or [[""]]))
-
-    sheet_xml_by_idx: Dict[int, str] = {}
-    for i, (_, rows) in enumerate(norm_sheets, start=1):
-        sheet_rows: List[str] = []
-        for r_idx0, row in enumerate(rows):
-            r1 = r_idx0 + 1
-            cells: List[str] = []
-            for c_idx0, value in enumerate(row):
-                ref = _cell_ref(c_idx0, r1)
-                if value is None or value == "":
-                    continue
-                if isinstance(value, (int, float)) and not isinstance(value, bool):
-                    cells.append(f'<c r="{ref}"><v>{value}</v></c>')
-                else:
-                    text = esc(str(value))
-                    cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>')
-            if cells:
-                sheet_rows.append(f'<row r="{r1}">{"".join(cells)}</row>')
-            else:
-                sheet_rows.append(f'<row r="{r1}"/>')
-        sheet_xml_by_idx[i] = (
-            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-            f'<worksheet xmlns="{_NS_MAIN}"><sheetData>'
-            f'{"".join(sheet_rows)}'
-            f"</sheetData></worksheet>"
-        )
-
-    sheet_nodes: List[str] = []
-    for i, (name, _) in enumerate(norm_sheets, start=1):
-        sheet_nodes.append(f'<sheet name="{esc(name)}" sheetId="{i}" r:id="rId{i}"/>')
-    workbook_xml = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}">'
-        f"<sheets>{''.join(sheet_nodes)}</sheets>"
-        f"</workbook>"
-    )
-
-    rel_nodes: List[str] = []
-    for i in range(1, len(norm_sheets) + 1):
-        rel_nodes.append(
-            f'<Relationship Id="rId{i}" '
-            f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
-            f'Target="worksheets/sheet{i}.xml"/>'
-        )
-    workbook_rels = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<Relationships xmlns="{_NS_PKG_REL}">{"".join(rel_nodes)}</Relationships>'
-    )
-
-    rels = (
-        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        f'<Relationships xmlns="{_NS_PKG_REL}">'
-        f'<Relationship Id="rId1" '
-        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
-        f'Target="xl/workbook.xml"/>'
-        f"</Relationships>"
-    )
-
-    overrides = [
-        '<Override PartName="/xl/workbook.xml" '
-        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
-    ]
-    for i in range(1, len(norm_sheets) + 1):
-        overrides.append(
-            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
-            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
-        )
-    content_types = (
-        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
-        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
-        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
-        '<Default Extension="xml" ContentType="application/xml"/>'
-        f"{''.join(overrides)}"
-        "</Types>"
-    )
-
-    with zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("[Content_Types].xml", content_types)
-        zf.writestr("_rels/.rels", rels)
-        zf.writestr("xl/workbook.xml", workbook_xml)
-        zf.writestr("xl/_rels/workbook.xml.rels", workbook_rels)
-        for i, xml in sheet_xml_by_idx.items():
-            zf.writestr(f"xl/worksheets/sheet{i}.xml", xml)
+    write_xlsx_stream(path, [(name, rows or [[""]]) for name, rows in sheets])
 
 
 def _xml_text(el: Optional[ET.Element]) -> str:
@@ -246,24 +314,32 @@ def _xml_text(el: Optional[ET.Element]) -> str:
     return "".join(el.itertext())
 
 
+_TAG_SI = f"{{{_NS_MAIN}}}si"
+_TAG_ROW = f"{{{_NS_MAIN}}}row"
+_TAG_C = f"{{{_NS_MAIN}}}c"
+_TAG_V = f"{{{_NS_MAIN}}}v"
+_TAG_IS = f"{{{_NS_MAIN}}}is"
+_TAG_T = f"{{{_NS_MAIN}}}t"
+_TAG_R = f"{{{_NS_MAIN}}}r"
+_DIGITS = "0123456789"
+
+
 def _read_shared_strings(zf: zipfile.ZipFile) -> List[str]:
     name = "xl/sharedStrings.xml"
     if name not in set(zf.namelist()):
         return []
-    xml_bytes = zf.read(name)
-    root = ET.fromstring(xml_bytes)
-    ns = {"m": _NS_MAIN}
     out: List[str] = []
-    for si in root.findall("m:si", ns):
-        # Either <t> (plain) or rich text <r><t>
-        t = si.find("m:t", ns)
-        if t is not None:
-            out.append(_xml_text(t))
-            continue
-        parts = []
-        for r in si.findall("m:r", ns):
-            parts.append(_xml_text(r.find("m:t", ns)))
-        out.append("".join(parts))
+    with zf.open(name) as f:
+        for _, si in ET.iterparse(f):
+            if si.tag != _TAG_SI:
+                continue
+            # Either <t> (plain) or rich text <r><t>
+            t = si.find(_TAG_T)
+            if t is not None:
+                out.append(_xml_text(t))
+            else:
+                out.append("".join(_xml_text(r.find(_TAG_T)) for r in si.findall(_TAG_R)))
+            si.clear()
     return out
 
 
@@ -274,64 +350,167 @@ def _pick_first_sheet_path(zf: zipfile.ZipFile) -> str:
     raise ValueError("No worksheets found in xlsx")
 
 
-def read_simple_xlsx_table(path: Path, max_rows: int = 5000, max_cols: int = 200) -> List[List[str]]:
-    """
-    Read the first worksheet into a 2D table of strings.
+_COL_INDEX: Dict[str, int] = {letters: i for i, letters in enumerate(_COL_LETTERS)}
+
+
+def _split_cell_ref(ref: str) -> Tuple[int, int]:
+    """"B12" -> (12, 1): 1-based row, 0-based column; (0, -1) if `ref` is not a cell ref."""
+    letters = ref.rstrip(_DIGITS)
+    digits = ref[len(letters) :]
+    if not letters or not digits:
+        return 0, -1
+    c0 = _COL_INDEX.get(letters)
+    if c0 is None:
+        try:
+            c0 = _col_letters_to_index(letters)
+        except ValueError:
+            return 0, -1
+    return int(digits), c0
 
-    Supports common Excel outputs (sharedStrings / inlineStr / numeric).
+
+def _iter_sheet_cells(path: Path) -> Iterator[Tuple[int, int, str]]:
     """
-    path = Path(path)
-    with zipfile.ZipFile(path, mode="r") as zf:
+    Yield (row1, col0, value) for every cell of the first worksheet, parsing it incrementally
+    (each row is dropped once read). Values are strings: shared/inline strings resolved, inline
+    and numeric values stripped. Cells without an `r` ref follow the previous cell.
+    """
+    with zipfile.ZipFile(Path(path), mode="r") as zf:
         shared = _read_shared_strings(zf)
-        sheet_path = _pick_first_sheet_path(zf)
-        xml_bytes = zf.read(sheet_path)
-
-    root = ET.fromstring(xml_bytes)
-    ns = {"m": _NS_MAIN}
+        n_shared = len(shared)
+        with zf.open(_pick_first_sheet_path(zf)) as f:
+            r1 = 0
+            for _, row in ET.iterparse(f):
+                if row.tag != _TAG_ROW:
+                    continue
+                ref = row.get("r")
+                r1 = int(ref) if ref and ref.isdigit() else r1 + 1
+                c0 = -1
+                for c in row:
+                    if c.tag != _TAG_C:
+                        continue
+                    ref = c.get("r")
+                    if ref:
+                        cell_r1, c0 = _split_cell_ref(ref)
+                        if cell_r1 <= 0 or c0 < 0:
+                            continue
+                    else:
+                        cell_r1, c0 = r1, c0 + 1
+                    t = c.get("t")
+                    if t == "inlineStr":
+                        value = _xml_text(c.find(_TAG_IS)).strip()
+                    else:
+                        v = ""
+                        for child in c:
+                            if child.tag == _TAG_V:
+                                v = (child.text or "").strip()
+                                break
+                        if t == "s":
+                            idx = int(v) if v.isdigit() else -1
+                            value = shared[idx] if 0 <= idx < n_shared else ""
+                        else:
+                            value = v
+                    yield cell_r1, c0, value
+                row.clear()
+
+
+def read_simple_xlsx_table(
+    path: Path,
+    max_rows: Optional[int] = None,
+    max_cols: Optional[int] = None,
+) -> List[List[str]]:
+    """
+    Read the first worksheet into a 2D table of strings (rows padded with "" to the widest row).
 
-    cells: Dict[Tuple[int, int], str] = {}
+    Supports common Excel outputs (sharedStrings / inlineStr / numeric). The sheet is parsed
+    incrementally; `max_rows` / `max_cols` optionally cut the table, by default nothing is dropped.
+    Workbooks written by write_xlsx_stream are read from their up-to-date sidecar, without XML.
+    """
+    if max_rows is None and max_cols is None:
+        cached = _read_table_sidecar(Path(path))
+        if cached is not None:
+            return cached
+    rows: Dict[int, List[str]] = {}
     max_r = 0
     max_c = 0
+    for r1, c0, value in _iter_sheet_cells(path):
+        if (max_rows is not None and r1 > max_rows) or (max_cols is not None and c0 >= max_cols):
+            continue
+        row = rows.get(r1)
+        if row is None:
+            row = rows[r1] = []
+        if c0 >= len(row):
+            row.extend([""] * (c0 + 1 - len(row)))
+        row[c0] = value
+        if r1 > max_r:
+            max_r = r1
+        if c0 >= max_c:
+            max_c = c0 + 1
 
-    for row in root.findall(".//m:sheetData/m:row", ns):
-        for c in row.findall("m:c", ns):
-            ref = c.get("r") or ""
-            m = re.fullmatch(r"([A-Za-z]+)([0-9]+)", ref)
-            if not m:
-                continue
-            col_letters, row_digits = m.group(1), m.group(2)
-            r1 = int(row_digits)
-            c0 = _col_letters_to_index(col_letters)
-            if r1 <= 0 or c0 < 0:
-                continue
-            if r1 > max_rows or c0 >= max_cols:
-                continue
-
-            t = (c.get("t") or "").strip()
-            if t == "s":
-                v = _xml_text(c.find("m:v", ns)).strip()
-                try:
-                    idx = int(v)
-                except ValueError:
-                    value = ""
-                else:
-                    value = shared[idx] if 0 <= idx < len(shared) else ""
-            elif t == "inlineStr":
-                value = _xml_text(c.find("m:is", ns)).strip()
-            else:
-                value = _xml_text(c.find("m:v", ns)).strip()
+    if max_r <= 0 or max_c <= 0:
+        return []
+    blank = [""] * max_c
+    table: List[List[str]] = []
+    for r1 in range(1, max_r + 1):
+        row = rows.get(r1)
+        table.append(row + blank[len(row) :] if row is not None else list(blank))
+    return table
 
-            cells[(r1, c0)] = value
-            max_r = max(max_r, r1)
-            max_c = max(max_c, c0 + 1)
 
-    if max_r <= 0 or max_c <= 0:
+def read_xlsx_columns(path: Path, as_arrays: bool = False) -> Union[List[List[str]], List[np.ndarray]]:
+    """
+    Read the first worksheet column by column: element j is column j of the table
+    read_simple_xlsx_table returns (header cell included), built directly without the row-major
+    table. With `as_arrays`, each column is a NumPy string array instead of a list.
+    """
+    cached = _read_table_sidecar(Path(path))
+    if cached is not None:
+        columns_cached = [list(col) for col in zip(*cached)]
+        return [np.array(col, dtype=str) for col in columns_cached] if as_arrays else columns_cached
+    columns: List[List[str]] = []
+    max_r = 0
+    for r1, c0, value in _iter_sheet_cells(path):
+        if c0 >= len(columns):
+            columns.extend([] for _ in range(c0 + 1 - len(columns)))
+        col = columns[c0]
+        if r1 > len(col):
+            col.extend([""] * (r1 - len(col)))
+        col[r1 - 1] = value
+        if r1 > max_r:
+            max_r = r1
+
+    if max_r <= 0:
         return []
+    for col in columns:
+        if len(col) < max_r:
+            col.extend([""] * (max_r - len(col)))
+    if as_arrays:
+        return [np.array(col, dtype=str) for col in columns]
+    return columns
 
+
+def table_from_rows(rows: List[List[Any]]) -> List[List[str]]:
+    """
+    The table read_simple_xlsx_table returns for a file written by write_simple_xlsx(rows),
+    computed without the zip/XML round trip (numbers as str(), text stripped, rows/columns
+    trimmed to the last written cell and padded with "").
+    """
     table: List[List[str]] = []
-    for r1 in range(1, min(max_r, max_rows) + 1):
-        row_out = []
-        for c0 in range(0, min(max_c, max_cols)):
-            row_out.append(cells.get((r1, c0), ""))
+    max_r = 0
+    max_c = 0
+    for r_idx0, row in enumerate(rows):
+        row_out: List[str] = []
+        for c_idx0, value in enumerate(row):
+            if value is None or value == "":
+                row_out.append("")
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                row_out.append(f"{value}")
+            else:
+                row_out.append(str(value).strip())
+            max_r = r_idx0 + 1
+            max_c = max(max_c, c_idx0 + 1)
         table.append(row_out)
-    return table
+
+    if max_r <= 0 or max_c <= 0:
+        return []
+    return [(row + [""] * (max_c - len(row)))[:max_c] for row in table[:max_r]]
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from engine.generator import generate_answer_sheet_pdf  # noqa: E402
+from engine.recognizer import (  # noqa: E402
+    _template_score_plan,
+    render_page,
+    score_bubble,
+    score_bubbles,
+    warp_to_canonical,
+)
+from engine.template import get_sheet_template  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark per-bubble score_bubble vs batched score_bubbles on one page.")
+    parser.add_argument("--num-questions", type=int, default=100, help="Number of questions (1–100).")
+    parser.add_argument("--choices-count", type=int, default=5, choices=(3, 4, 5), help="Choices per question (3/4/5).")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (the web app uses 200).")
+    parser.add_argument("--repeat", type=int, default=20, help="Pages to time for each scorer.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet = Path(tmp) / "sheet.pdf"
+        generate_answer_sheet_pdf("bench", args.num_questions, sheet, choices_count=args.choices_count)
+        with fitz.open(str(sheet)) as doc:
+            img, zoom = render_page(doc.load_page(0), dpi=args.dpi)
+
+    warped, _ = warp_to_canonical(img, zoom)
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(16, 16)).apply(cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY))
+    # Fill roughly one bubble in five so the scores are not all ~0.
+    template = get_sheet_template(args.num_questions, args.choices_count, zoom)
+    bboxes = template.bbox_tuples
+    plan = _template_score_plan(template)
+    for i, (x0, y0, x1, y1) in enumerate(bboxes):
+        if i % 5 == 0:
+            cv2.circle(gray, ((x0 + x1) // 2, (y0 + y1) // 2), (x1 - x0) // 2 - 4, 40, thickness=-1)
+
+    def timed(fn) -> tuple[float, np.ndarray]:
+        fn()  # warm-up (mask cache, page faults)
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            scores = fn()
+        return (time.perf_counter() - t0) / args.repeat, np.asarray(scores, dtype=float)
+
+    loop_s, loop_scores = timed(lambda: [score_bubble(gray, bbox) for bbox in bboxes])
+    batch_s, batch_scores = timed(lambda: score_bubbles(gray, bboxes))
+    plan_s, plan_scores = timed(lambda: score_bubbles(gray, bboxes, plan=plan))
+
+    print(f"bubbles/page: {len(bboxes)}  ({args.num_questions} questions × {args.choices_count} choices, {args.dpi} dpi)")
+    print(f"score_bubble loop : {loop_s * 1000:8.2f} ms/page")
+    print(f"score_bubbles     : {batch_s * 1000:8.2f} ms/page")
+    print(f"  + template plan : {plan_s * 1000:8.2f} ms/page")
+    print(f"speedup           : {loop_s / batch_s:8.1f}x  ({loop_s / plan_s:.1f}x with template plan)")
+    max_diff = max(np.max(np.abs(loop_scores - batch_scores)), np.max(np.abs(loop_scores - plan_scores)))
+    print(f"max |diff|        : {float(max_diff):.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+import engine.recognizer as recognizer  # noqa: E402
+from engine.generator import generate_answer_sheet_pdf  # noqa: E402
+
+
+def _noop() -> int:
+    return 0
+
+
+def _recognize(pdf: str, pages: int, workers: int, args: argparse.Namespace) -> float:
+    t0 = time.perf_counter()
+    for _ in recognizer._iter_recognized_pages(
+        pdf,
+        range(pages),
+        dpi=args.dpi,
+        num_questions=args.num_questions,
+        choices_count=args.choices_count,
+        workers=workers,
+        annotate_mode=recognizer.ANNOTATE_RASTER,
+    ):
+        pass
+    return time.perf_counter() - t0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure when the recognition process pool beats in-process recognition.")
+    parser.add_argument("--num-questions", type=int, default=50, help="Number of questions (1–100).")
+    parser.add_argument("--choices-count", type=int, default=4, choices=(3, 4, 5), help="Choices per question (3/4/5).")
+    parser.add_argument("--dpi", type=int, default=200, help="Render DPI (the web app uses 200).")
+    parser.add_argument("--workers", type=int, default=recognizer.default_worker_count(), help="Pool size to compare.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[2, 4, 8, 16, 32], help="Job sizes to time.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sheet = Path(tmp) / "sheet.pdf"
+        generate_answer_sheet_pdf("bench", args.num_questions, sheet, choices_count=args.choices_count)
+        pdf = Path(tmp) / "job.pdf"
+        with fitz.open(str(sheet)) as src, fitz.open() as out:
+            for _ in range(max(args.pages)):
+                out.insert_pdf(src)
+            out.save(str(pdf))
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=recognizer._init_page_worker,
+        ) as pool:
+            pool.submit(_noop).result()
+        startup = time.perf_counter() - t0
+        _recognize(str(pdf), 1, 1, args)  # warm-up (template and mask caches)
+        per_page = _recognize(str(pdf), 8, 1, args) / 8
+
+        print(f"cpus: {multiprocessing.cpu_count()}  workers: {args.workers}  ({args.dpi} dpi, {args.num_questions} questions)")
+        print(f"worker startup    : {startup * 1000:8.1f} ms  (spawn + import cv2/fitz/engine)")
+        print(f"page, in-process  : {per_page * 1000:8.1f} ms")
+        print(f"break-even        : {startup / per_page:8.1f} pages per worker")
+        print(f"{'pages':>6} {'in-process':>11} {'pool':>9} {'auto':>9}")
+        default_min = recognizer.MIN_PAGES_PER_WORKER
+        for pages in args.pages:
+            serial = _recognize(str(pdf), pages, 1, args)
+            recognizer.MIN_PAGES_PER_WORKER = 1  # force the pool even for tiny jobs
+            forced = _recognize(str(pdf), pages, args.workers, args)
+            recognizer.MIN_PAGES_PER_WORKER = default_min
+            auto = _recognize(str(pdf), pages, args.workers, args)
+            print(f"{pages:>6} {serial:>10.2f}s {forced:>8.2f}s {auto:>8.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
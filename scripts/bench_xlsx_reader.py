@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+from xml.etree import ElementTree as ET
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from engine.xlsx import (  # noqa: E402
+    _NS_MAIN,
+    _col_letters_to_index,
+    _read_shared_strings,
+    _xml_text,
+    read_simple_xlsx_table,
+    read_xlsx_columns,
+    write_simple_xlsx,
+)
+
+
+def legacy_read_table(path: Path, max_rows: int = 5000, max_cols: int = 200) -> List[List[str]]:
+    """The previous reader: whole-sheet ET.fromstring, a regex per cell ref, fixed size caps."""
+    with zipfile.ZipFile(path, mode="r") as zf:
+        shared = _read_shared_strings(zf)
+        xml_bytes = zf.read(sorted(n for n in zf.namelist() if n.startswith("xl/worksheets/"))[0])
+    root = ET.fromstring(xml_bytes)
+    ns = {"m": _NS_MAIN}
+    cells: Dict[Tuple[int, int], str] = {}
+    max_r = max_c = 0
+    for row in root.findall(".//m:sheetData/m:row", ns):
+        for c in row.findall("m:c", ns):
+            m = re.fullmatch(r"([A-Za-z]+)([0-9]+)", c.get("r") or "")
+            if not m:
+                continue
+            r1, c0 = int(m.group(2)), _col_letters_to_index(m.group(1))
+            if r1 > max_rows or c0 >= max_cols:
+                continue
+            t = (c.get("t") or "").strip()
+            if t == "s":
+                v = _xml_text(c.find("m:v", ns)).strip()
+                value = shared[int(v)] if v.isdigit() and int(v) < len(shared) else ""
+            elif t == "inlineStr":
+                value = _xml_text(c.find("m:is", ns)).strip()
+            else:
+                value = _xml_text(c.find("m:v", ns)).strip()
+            cells[(r1, c0)] = value
+            max_r, max_c = max(max_r, r1), max(max_c, c0 + 1)
+    return [[cells.get((r1, c0), "") for c0 in range(max_c)] for r1 in range(1, max_r + 1)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the xlsx table readers on a wide results workbook.")
+    parser.add_argument("--students", type=int, default=2000, help="Student columns in results.xlsx.")
+    parser.add_argument("--num-questions", type=int, default=100, help="Question rows.")
+    parser.add_argument("--repeat", type=int, default=5, help="Reads to time for each reader.")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    ids = [f"8{c:02d}{s:02d}" for c in range(1, 100) for s in range(1, 41)][: args.students]
+    rows = [["number", *ids]] + [
+        [q, *[rng.choice(["A", "B", "C", "D", "", "AB", "空白"]) for _ in ids]] for q in range(1, args.num_questions + 1)
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.xlsx"
+        write_simple_xlsx(path, rows, sheet_name="results")
+
+        def timed(fn):
+            tracemalloc.start()
+            result = fn()  # warm-up, and the peak allocation of one read
+            peaks[fn] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                fn()
+            return (time.perf_counter() - t0) / args.repeat, result
+
+        peaks: Dict[object, int] = {}
+        legacy_fn = lambda: legacy_read_table(path)  # noqa: E731
+        table_fn = lambda: read_simple_xlsx_table(path)  # noqa: E731
+
+        legacy_s, legacy = timed(legacy_fn)
+        uncapped_s, _ = timed(lambda: legacy_read_table(path, max_cols=len(ids) + 1))
+        table_s, table = timed(table_fn)
+        cols_s, cols = timed(lambda: read_xlsx_columns(path))
+        arrays_s, _ = timed(lambda: read_xlsx_columns(path, as_arrays=True))
+
+    print(f"workbook: {args.num_questions + 1} rows × {len(ids) + 1} columns")
+    print(
+        f"legacy reader           : {legacy_s * 1000:8.1f} ms  peak {peaks[legacy_fn] / 1e6:6.1f} MB"
+        f"  ({len(legacy[0]) if legacy else 0} columns kept)"
+    )
+    print(f"  without the 200 cap   : {uncapped_s * 1000:8.1f} ms")
+    print(
+        f"read_simple_xlsx_table  : {table_s * 1000:8.1f} ms  peak {peaks[table_fn] / 1e6:6.1f} MB"
+        f"  ({len(table[0]) if table else 0} columns kept)"
+    )
+    print(f"read_xlsx_columns       : {cols_s * 1000:8.1f} ms")
+    print(f"  as NumPy arrays       : {arrays_s * 1000:8.1f} ms")
+    print(f"speedup                 : {uncapped_s / table_s:8.1f}x  (vs the uncapped legacy reader)")
+    print(f"columns match table     : {cols == [list(c) for c in zip(*table)]}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,25 +17,9 @@ if str(REPO_ROOT) not in sys.path:
     sys.path.insert(0, str(REPO_ROOT))
 
 from engine.analysis import run_analysis_template
-from engine.generator import (
-    CLASS_STEP,
-    CLASS_VALUES,
-    CLASS_X0,
-    CLASS_Y,
-    GRADE_STEP,
-    GRADE_VALUES,
-    GRADE_X0,
-    GRADE_Y,
-    SEAT_BOTTOM_Y,
-    SEAT_DIGITS,
-    SEAT_RADIUS,
-    SEAT_STEP,
-    SEAT_TOP_Y,
-    SEAT_X0,
-    compute_question_layout,
-    generate_answer_sheet_pdf,
-)
+from engine.generator import generate_answer_sheet_pdf, sheet_template
 from engine.recognizer import process_pdf_to_csv_and_annotated_pdf
+from engine.template import FIELD_CLASS, FIELD_GRADE, FIELD_SEAT_ONES, FIELD_SEAT_TENS
 
 # Reuse the same helper functions used by the web app so the CLI demo matches the real pipeline.
 from app.main import (  # noqa: E402
@@ -87,24 +71,16 @@ def _generate_synthetic_scan_pdf(
     base_page = base_doc[0]
     page_size = (float(base_page.rect.width), float(base_page.rect.height))
 
-    layout = compute_question_layout(num_questions=num_questions, choices_count=choices_count)
-    rows_per_col = int(layout["rows_per_col"])
-    first_row_y = float(layout["first_row_y"])
-    row_step = float(layout["row_step"])
-    bubble_xs = layout["bubble_xs"]
-
+    template = sheet_template(num_questions, choices_count)
     rng = random.Random(int(seed))
-    choices = [chr(ord("A") + i) for i in range(int(choices_count))]
-
-    grade = int(grade)
-    class_no = int(class_no)
-    grade_idx = GRADE_VALUES.index(grade) if grade in GRADE_VALUES else 0
-    class_idx = CLASS_VALUES.index(class_no) if class_no in CLASS_VALUES else 0
+    choices = list(template.choices)
 
-    grade_x = float(GRADE_X0 + grade_idx * GRADE_STEP)
-    class_x = float(CLASS_X0 + class_idx * CLASS_STEP)
+    def bubble(field: str, label: str) -> tuple[float, float, float]:
+        labels = template.field_labels[template.field_index[field]]
+        return template.points(field)[labels.index(label) if label in labels else 0]
 
-    seat_xs = [float(SEAT_X0 + i * SEAT_STEP) for i in range(len(SEAT_DIGITS))]
+    grade_x, grade_y, grade_r = bubble(FIELD_GRADE, str(int(grade)))
+    class_x, class_y, class_r = bubble(FIELD_CLASS, str(int(class_no)))
 
     out_doc = fitz.open()
     for page_idx in range(int(pages)):
@@ -113,26 +89,22 @@ def _generate_synthetic_scan_pdf(
 
         seat_no = page_idx + 1
         seat_str = f"{seat_no:02d}"
-        tens = int(seat_str[0])
-        ones = int(seat_str[1])
+        tens_x, tens_y, tens_r = bubble(FIELD_SEAT_TENS, seat_str[0])
+        ones_x, ones_y, ones_r = bubble(FIELD_SEAT_ONES, seat_str[1])
 
         marks: list[tuple[float, float, float]] = []
 
         # Identity marks.
-        marks.append((grade_x, float(GRADE_Y), float(SEAT_RADIUS) * 0.85))
-        marks.append((class_x, float(CLASS_Y), float(SEAT_RADIUS) * 0.85))
-        marks.append((seat_xs[tens], float(SEAT_TOP_Y), float(SEAT_RADIUS) * 0.85))
-        marks.append((seat_xs[ones], float(SEAT_BOTTOM_Y), float(SEAT_RADIUS) * 0.85))
+        marks.append((grade_x, grade_y, grade_r * 0.85))
+        marks.append((class_x, class_y, class_r * 0.85))
+        marks.append((tens_x, tens_y, tens_r * 0.85))
+        marks.append((ones_x, ones_y, ones_r * 0.85))
 
         # Answer marks.
         for qno in range(1, int(num_questions) + 1):
-            col = int((qno - 1) // rows_per_col)
-            row = int((qno - 1) % rows_per_col)
-            y = first_row_y - float(row) * row_step
             chosen = rng.choice(choices)
-            choice_idx = int(ord(chosen) - ord("A"))
-            x = float(bubble_xs[col][choice_idx])
-            marks.append((x, y, float(SEAT_RADIUS) * 0.78))
+            x, y, r = template.points(template.question_field(qno))[choices.index(chosen)]
+            marks.append((x, y, r * 0.78))
 
         overlay = fitz.open("pdf", _overlay_pdf_bytes(page_size, marks))
         page.show_pdf_page(page.rect, overlay, 0)
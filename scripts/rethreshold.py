@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from engine.dataset import JobDataset  # noqa: E402
+from engine.recognizer import (  # noqa: E402
+    SCORES_FILENAME,
+    THRESHOLD_KEYS,
+    rethreshold_recognition_outputs,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Re-decide a recognized job from its saved bubble scores with new thresholds (no re-rendering)."
+    )
+    parser.add_argument("job_dir", type=Path, help=f"Job output folder (contains {SCORES_FILENAME} and results.xlsx).")
+    for key in THRESHOLD_KEYS:
+        parser.add_argument(f"--{key.replace('_', '-')}", dest=key, type=float, default=None, help="Default: current setting.")
+    parser.add_argument(
+        "--analysis",
+        action="store_true",
+        help="Also rebuild showwrong/analysis outputs from the job's uploaded answer key (as the web app does).",
+    )
+    parser.add_argument("--lang", default="zh-Hant", choices=("zh-Hant", "en"), help="Language for --analysis outputs.")
+    args = parser.parse_args()
+
+    job_dir: Path = args.job_dir
+    scores_path = job_dir / SCORES_FILENAME
+    if not scores_path.exists():
+        print(f"ERROR: {scores_path} not found")
+        return 1
+
+    input_pdf = job_dir / "input.pdf"
+    dataset = JobDataset(job_dir)
+    t0 = time.perf_counter()
+    summary = rethreshold_recognition_outputs(
+        scores_path=str(scores_path),
+        out_csv_path=str(job_dir / "results.xlsx"),
+        thresholds={key: getattr(args, key) for key in THRESHOLD_KEYS},
+        input_pdf_path=(str(input_pdf) if input_pdf.exists() else None),
+        out_annotated_pdf_path=str(job_dir / "annotated.pdf"),
+        dataset=dataset,
+    )
+    elapsed = time.perf_counter() - t0
+    print(f"pages: {summary['pages']}  flags: {summary['flags']}  annotated redrawn: {summary['annotated']}")
+    print("thresholds: " + ", ".join(f"{k}={v:g}" for k, v in summary["thresholds"].items()))
+    print(f"re-decided in {elapsed * 1000:.1f} ms")
+
+    if args.analysis:
+        from app.main import _find_answer_key_upload, _run_job_analysis
+
+        key_path = _find_answer_key_upload(job_dir)
+        if key_path is None:
+            print("WARNING: no answer_key_upload.xlsx/.csv in the job folder; skipping analysis")
+        else:
+            _run_job_analysis(job_dir, key_path, summary["num_questions"], args.lang, dataset=dataset)
+            print("analysis rebuilt")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+@pytest.fixture()
+def outputs_dir(tmp_path, monkeypatch):
+    """Point the web app's job storage at a temporary directory."""
+    import app.main as main
+
+    monkeypatch.setattr(main, "OUTPUTS_DIR", tmp_path)
+    yield tmp_path
+    with main._JOBS_LOCK:
+        for job_dir in tmp_path.iterdir():
+            main._JOBS.pop(job_dir.name, None)
+            main._JOB_EVENTS.pop(job_dir.name, None)
+
+
+@pytest.fixture()
+def client(outputs_dir):
+    from fastapi.testclient import TestClient
+
+    import app.main as main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from engine.generator import generate_answer_sheet_pdf
+from engine.recognizer import MIN_SCORE_CHOICE, _recognize_page, needs_higher_dpi
+from engine.template import get_sheet_template
+
+NUM_QUESTIONS = 10
+CHOICES_COUNT = 4
+
+
+@pytest.fixture()
+def template():
+    return get_sheet_template(NUM_QUESTIONS, CHOICES_COUNT, 1.0)
+
+
+def _clean_scores(template) -> np.ndarray:
+    """Every field has one solid bubble (option 1) and faint noise elsewhere."""
+    scores = np.full(template.field_of.shape[0], 0.004)
+    scores[template.field_start[:-1] + 1] = 0.9
+    return scores
+
+
+def test_clean_read_is_not_borderline(template):
+    assert not needs_higher_dpi(_clean_scores(template), [], template)
+
+
+def test_faint_unpicked_bubbles_do_not_escalate(template):
+    scores = _clean_scores(template)
+    # Stray marks near the threshold next to a solid answer cannot change the decision.
+    scores[template.field_slice("Q3").start + 3] = MIN_SCORE_CHOICE
+    assert not needs_higher_dpi(scores, [], template)
+
+
+def test_best_score_near_threshold_escalates(template):
+    scores = _clean_scores(template)
+    s = template.field_slice("Q3")
+    scores[s] = 0.0
+    scores[s.start + 2] = MIN_SCORE_CHOICE + 0.01
+    assert needs_higher_dpi(scores, [], template)
+
+
+def test_close_top_two_escalates(template):
+    scores = _clean_scores(template)
+    s = template.field_slice("Q3")
+    scores[s.start + 2] = scores[s.start + 1] - 0.04
+    assert needs_higher_dpi(scores, [], template)
+
+
+def test_ambiguous_flag_escalates(template):
+    assert needs_higher_dpi(_clean_scores(template), [{"status": "AMBIGUOUS"}], template)
+
+
+def _filled_sheet(tmp_path: Path, faint_radius: float = 0.0) -> fitz.Document:
+    """A generated sheet with option B filled in every field; Q10 gets only a faint dot on C."""
+    pdf = tmp_path / "sheet.pdf"
+    generate_answer_sheet_pdf("test", NUM_QUESTIONS, pdf, choices_count=CHOICES_COUNT)
+    template = get_sheet_template(NUM_QUESTIONS, CHOICES_COUNT, 1.0)
+    doc = fitz.open(str(pdf))
+    page = doc.load_page(0)
+    page_h = page.rect.height
+    for field in template.fields:
+        if field == "Q10" and faint_radius:
+            x, y, r = template.points(field)[2]
+            page.draw_circle(fitz.Point(x, page_h - y), r * faint_radius, color=None, fill=(0, 0, 0))
+        else:
+            x, y, r = template.points(field)[1]
+            page.draw_circle(fitz.Point(x, page_h - y), r, color=(0, 0, 0), fill=(0, 0, 0))
+    return doc
+
+
+def test_clear_page_is_read_once_at_low_dpi(tmp_path):
+    with _filled_sheet(tmp_path) as doc:
+        results, _, flags, info = _recognize_page(
+            doc.load_page(0), 150, NUM_QUESTIONS, CHOICES_COUNT, annotate_mode=None, escalate_dpi=200
+        )
+    assert info["dpi"] == 150
+    assert results["answers"] == "B" * NUM_QUESTIONS
+    assert flags == []
+
+
+def test_borderline_page_is_read_again_at_high_dpi(tmp_path):
+    with _filled_sheet(tmp_path, faint_radius=0.2) as doc:
+        _, _, _, info = _recognize_page(
+            doc.load_page(0), 150, NUM_QUESTIONS, CHOICES_COUNT, annotate_mode=None, escalate_dpi=200
+        )
+    assert info["dpi"] == 200
@@ -0,0 +1,42 @@
+from pathlib import Path
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from engine.generator import generate_answer_sheet_pdf
+from engine.recognizer import _template_score_plan, render_page, score_bubble, score_bubbles, warp_to_canonical
+from engine.template import get_sheet_template
+
+NUM_QUESTIONS = 30
+CHOICES_COUNT = 5
+
+
+@pytest.fixture(scope="module")
+def filled_page(tmp_path_factory):
+    """CLAHE gray of a generated sheet at the app's 200 dpi with every fifth bubble filled."""
+    pdf = Path(tmp_path_factory.mktemp("sheet")) / "sheet.pdf"
+    generate_answer_sheet_pdf("test", NUM_QUESTIONS, pdf, choices_count=CHOICES_COUNT)
+    with fitz.open(str(pdf)) as doc:
+        img, zoom = render_page(doc.load_page(0), dpi=200)
+    warped, _ = warp_to_canonical(img, zoom)
+    gray = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(16, 16)).apply(cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY))
+    template = get_sheet_template(NUM_QUESTIONS, CHOICES_COUNT, zoom)
+    for i, (x0, y0, x1, y1) in enumerate(template.bbox_tuples):
+        if i % 5 == 0:
+            cv2.circle(gray, ((x0 + x1) // 2, (y0 + y1) // 2), (x1 - x0) // 2 - 4, 40, thickness=-1)
+    return gray, template
+
+
+def test_batched_scores_match_per_bubble_scores(filled_page):
+    gray, template = filled_page
+    bboxes = template.bbox_tuples
+    reference = np.array([score_bubble(gray, bbox) for bbox in bboxes], dtype=float)
+    # The page really has both filled and empty bubbles to tell apart.
+    assert reference.max() > 0.5 and reference.min() < 0.1
+
+    batched = np.asarray(score_bubbles(gray, bboxes), dtype=float)
+    planned = np.asarray(score_bubbles(gray, bboxes, plan=_template_score_plan(template)), dtype=float)
+    np.testing.assert_allclose(batched, reference, rtol=0, atol=1e-6)
+    np.testing.assert_allclose(planned, reference, rtol=0, atol=1e-6)
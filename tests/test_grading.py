@@ -0,0 +1,130 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from engine.grading import (
+    MASK_MULTI,
+    MASK_OTHER,
+    choice_bitmasks,
+    discrimination_group_size,
+    encode_answers,
+    grade,
+    item_mask_counts,
+    normalize_answer,
+    wrong_answer_cells,
+)
+
+CHOICES = ["A", "B", "C", "D", "E"]
+
+
+def _random_cohort(seed: int, n_items: int, n_students: int):
+    """A raw items × students answer grid, a key with unkeyed items and fractional points."""
+    rng = random.Random(seed)
+    cells = ["", "", "A", "B", "C", "D", "E", " b ", "c", "AB", "X", "?", None]
+    answers = [[rng.choice(cells) for _ in range(n_students)] for _ in range(n_items)]
+    key = [rng.choice(["", None, "A", "B", "C", "D", "E", "e"]) for _ in range(n_items)]
+    points = [rng.choice([1.0, 2.0, 0.5, 0.1, 1.3]) for _ in range(n_items)]
+    return answers, key, points
+
+
+def _reference(answers, key, points):
+    """The per-student and per-item loops the report writers ran before grade()."""
+    n_items, n_students = len(answers), len(answers[0])
+    ans = [[normalize_answer(v) for v in row] for row in answers]
+    corrects = [normalize_answer(c) for c in key]
+
+    scores, blanks = [], []
+    for s in range(n_students):
+        score = 0.0
+        blank = 0
+        for i in range(n_items):
+            a, c = ans[i][s], corrects[i]
+            if not a:
+                blank += 1
+            if c and a and a == c:
+                score += float(points[i])
+        scores.append(score)
+        blanks.append(blank)
+
+    group_n = discrimination_group_size(n_students)
+    ordered = sorted(range(n_students), key=lambda s: scores[s])
+    low, high = ordered[:group_n], ordered[-group_n:] if group_n else []
+
+    difficulty, discrimination, item_blank, item_wrong = [], [], [], []
+    for i in range(n_items):
+        c = corrects[i]
+        item_blank.append(sum(1 for a in ans[i] if not a))
+        if not c:
+            difficulty.append(math.nan)
+            discrimination.append(math.nan)
+            item_wrong.append(0)
+            continue
+        difficulty.append(sum(1 for a in ans[i] if a == c) / n_students)
+        item_wrong.append(sum(1 for a in ans[i] if a and a != c))
+        if group_n:
+            high_ok = sum(1 for s in high if ans[i][s] == c)
+            low_ok = sum(1 for s in low if ans[i][s] == c)
+            discrimination.append(high_ok / group_n - low_ok / group_n)
+        else:
+            discrimination.append(math.nan)
+
+    return {
+        "scores": scores,
+        "blanks": blanks,
+        "total_possible": sum(float(p) for p, c in zip(points, corrects) if c),
+        "difficulty": difficulty,
+        "discrimination": discrimination,
+        "item_blank": item_blank,
+        "item_wrong": item_wrong,
+    }
+
+
+@pytest.mark.parametrize("n_students", [1, 7, 30, 31, 120])
+def test_grade_matches_per_item_loops(n_students):
+    answers, key, points = _random_cohort(n_students, 40, n_students)
+    codes, key_codes, vocabulary = encode_answers(answers, key)
+    graded = grade(codes, key_codes, points, vocabulary)
+    ref = _reference(answers, key, points)
+
+    # Scores are running totals in item order, so they match exactly.
+    assert graded["scores"].tolist() == ref["scores"]
+    assert graded["blanks"].tolist() == ref["blanks"]
+    assert graded["total_possible"] == pytest.approx(ref["total_possible"])
+    np.testing.assert_allclose(graded["difficulty"], ref["difficulty"], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(graded["discrimination"], ref["discrimination"], rtol=0, atol=1e-12)
+    assert graded["item_blank"].tolist() == ref["item_blank"]
+    assert graded["item_wrong"].tolist() == ref["item_wrong"]
+
+
+def test_wrong_answer_cells_match_per_cell_loop():
+    answers, key, points = _random_cohort(3, 25, 40)
+    codes, key_codes, vocabulary = encode_answers(answers, key)
+    shown = wrong_answer_cells(codes, grade(codes, key_codes, points, vocabulary), vocabulary, "(blank)")
+
+    for i, row in enumerate(answers):
+        c = normalize_answer(key[i])
+        for s, raw in enumerate(row):
+            a = normalize_answer(raw)
+            expected = "" if not c or a == c else ("(blank)" if a == "" else a)
+            assert shown[i, s] == expected
+
+
+def test_choice_bitmask_rates_match_per_item_loops():
+    answers, key, _ = _random_cohort(5, 25, 60)
+    codes, _, vocabulary = encode_answers(answers, key)
+    n_students = codes.shape[1]
+    counts = item_mask_counts(choice_bitmasks(codes, vocabulary, CHOICES))
+
+    for i, row in enumerate(answers):
+        ans = [normalize_answer(v) for v in row]
+        assert counts[i, 0] == sum(1 for a in ans if not a)
+        assert counts[i, MASK_MULTI:].sum() / n_students == pytest.approx(
+            np.mean([len(a) > 1 for a in ans])
+        )
+        assert counts[i, MASK_OTHER:MASK_MULTI].sum() / n_students == pytest.approx(
+            np.mean([len(a) == 1 and a not in CHOICES for a in ans])
+        )
+        for k, ch in enumerate(CHOICES):
+            assert counts[i, 1 << k] == sum(1 for a in ans if a == ch)
@@ -0,0 +1,77 @@
+import app.main as main
+from engine.recognizer import SCORES_FILENAME
+
+JOB_ID = "0000aaaa-0000"
+
+
+def _job_dir(outputs_dir):
+    job_dir = outputs_dir / JOB_ID
+    job_dir.mkdir()
+    (job_dir / SCORES_FILENAME).write_bytes(b"")
+    (job_dir / "results.xlsx").write_bytes(b"")
+    return job_dir
+
+
+def test_rethreshold_refuses_running_job(client, outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    main._set_job_state(job_dir, "running")
+    response = client.post(f"/api/result/{JOB_ID}/rethreshold", data={"min_score_choice": "0.05"})
+    assert response.status_code == 409
+    assert response.json() == {"error": "job is still running"}
+    assert (job_dir / "results.xlsx").read_bytes() == b""
+
+
+def test_rethreshold_refuses_job_being_updated(client, outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    lock = main._job_update_lock(job_dir)
+    assert lock.acquire(blocking=False)  # another regrade/rethreshold is running
+    try:
+        response = client.post(f"/api/result/{JOB_ID}/rethreshold", data={"min_score_choice": "0.05"})
+    finally:
+        lock.release()
+    assert response.status_code == 409
+    assert response.json() == {"error": "job is being updated"}
+
+
+def test_regrade_refuses_queued_job(client, outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    main._set_job_state(job_dir, "queued")
+    response = client.post(
+        f"/api/result/{JOB_ID}/regrade", files={"answer_key": ("key.csv", b"1,A\n", "text/csv")}
+    )
+    assert response.status_code == 409
+
+
+def test_regrade_refuses_job_being_updated(client, outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    main._write_job_meta(job_dir, {"num_questions": 10})
+    lock = main._job_update_lock(job_dir)
+    assert lock.acquire(blocking=False)
+    try:
+        response = client.post(
+            f"/api/result/{JOB_ID}/regrade", files={"answer_key": ("key.csv", b"1,A\n", "text/csv")}
+        )
+    finally:
+        lock.release()
+    assert response.status_code == 409
+    assert not list(job_dir.glob("answer_key_upload*"))
+
+    # Once the other update is done the regrade goes through (and rejects this bad key itself).
+    response = client.post(f"/api/result/{JOB_ID}/regrade", files={"answer_key": ("key.csv", b"1,A\n", "text/csv")})
+    assert response.status_code == 400
+    assert not lock.locked()
+
+
+def test_active_job_count_follows_job_states(outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    assert main._active_job_count() == 0
+    main._set_job_state(job_dir, "queued")
+    main._set_job_state(job_dir, "running")
+    assert main._active_job_count() == 1
+    main._set_job_state(job_dir, "done")
+    assert main._active_job_count() == 0
+
+    lock = main._job_update_lock(job_dir)
+    with lock:
+        assert main._active_job_count() == 1
+    assert main._active_job_count() == 0
@@ -0,0 +1,29 @@
+import app.main as main
+
+JOB_ID = "0000aaaa-0000"
+REPORT = "試題分析整合報表.pdf"
+
+
+def test_failed_lazy_build_is_recorded_unlisted_and_not_retried(client, outputs_dir, monkeypatch):
+    job_dir = outputs_dir / JOB_ID
+    job_dir.mkdir()
+    main._write_job_meta(job_dir, {"lazy_artifacts": [REPORT]})
+    assert any(REPORT in link["url"] for link in main._analysis_file_links(JOB_ID, {}))
+
+    calls = []
+
+    def failing_build(job_dir, filename, lang):
+        calls.append(filename)
+        (job_dir / filename).write_bytes(b"%PDF-1.4 partial")
+        raise UnboundLocalError("boom")
+
+    monkeypatch.setattr(main, "_build_lazy_artifact", failing_build)
+    for _ in range(3):
+        response = client.get(f"/outputs/{JOB_ID}/{REPORT}", follow_redirects=False)
+        assert response.status_code == 500
+    assert calls == [REPORT]
+
+    record = main._read_job_meta(job_dir)["artifacts"][main._LAZY_ARTIFACTS[REPORT]]
+    assert record["status"] == "failed" and record["error"] == "boom"
+    assert not (job_dir / REPORT).exists()
+    assert not any(REPORT in link["url"] for link in main._analysis_file_links(JOB_ID, {}))
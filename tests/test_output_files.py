@@ -0,0 +1,55 @@
+import app.main as main
+from engine.xlsx import write_simple_xlsx, write_xlsx_stream
+
+JOB_ID = "0000aaaa-0000"
+
+
+def _job_dir(outputs_dir):
+    job_dir = outputs_dir / JOB_ID
+    job_dir.mkdir()
+    for name in ("results.xlsx", "analysis_extra.xlsx"):
+        write_xlsx_stream(job_dir / name, [("Sheet1", [["number", "A"], [1, "B"]])])
+    return job_dir
+
+
+def test_table_sidecars_are_not_served(client, outputs_dir):
+    job_dir = _job_dir(outputs_dir)
+    sidecars = sorted(p.name for p in job_dir.iterdir() if p.name.startswith("."))
+    assert ".results.xlsx.rows.jsonl" in sidecars
+
+    for route in ("/outputs", "/outputs_inline"):
+        assert client.get(f"{route}/{JOB_ID}/results.xlsx").status_code == 200
+        for name in sidecars:
+            response = client.get(f"{route}/{JOB_ID}/{name}", follow_redirects=False)
+            assert response.status_code == 302
+    assert main._safe_output_filename(".results.xlsx.rows.jsonl") is None
+
+
+def test_table_sidecars_are_not_listed(outputs_dir):
+    _job_dir(outputs_dir)
+    urls = [link["url"] for link in main._analysis_file_links(JOB_ID, {})]
+    assert any("/analysis_extra.xlsx" in url for url in urls)
+    assert not any(".rows.jsonl" in url for url in urls)
+
+
+def test_integrated_data_etag_differs_per_encoding(client, outputs_dir):
+    job_dir = outputs_dir / JOB_ID
+    job_dir.mkdir()
+    write_simple_xlsx(job_dir / "analysis_template.xlsx", [["學號/ID", "得分"], ["80101", 90]])
+    write_simple_xlsx(job_dir / "roster.xlsx", [["person_id", "grade", "class_no", "seat_no"], ["80101", 8, 1, 1]])
+    url = f"/api/result/{JOB_ID}/integrated-data"
+
+    gzipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    identity = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-encoding" not in identity.headers
+    assert gzipped.json() == identity.json()
+    assert gzipped.headers["etag"] != identity.headers["etag"]
+
+    for response, encoding in ((gzipped, "gzip"), (identity, "identity")):
+        etag = response.headers["etag"]
+        again = client.get(url, headers={"Accept-Encoding": encoding, "If-None-Match": etag})
+        assert again.status_code == 304
+    # A cached gzip body must not validate a request for the identity one.
+    mixed = client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": gzipped.headers["etag"]})
+    assert mixed.status_code == 200
@@ -0,0 +1,88 @@
+import os
+
+import fitz  # PyMuPDF
+import numpy as np
+
+import app.main as main
+from engine.generator import generate_answer_sheet_pdf
+from engine.recognizer import RecognitionCache
+from engine.template import get_sheet_template
+from engine.xlsx import read_simple_xlsx_table
+
+
+def _info(n: int = 400):
+    return {"dpi": 200, "zoom": 200 / 72, "transform": np.eye(3), "scores": np.zeros(n)}
+
+
+def _age(cache: RecognitionCache, key: str, seconds_ago: float) -> None:
+    path = cache._path(key)
+    stamp = path.stat().st_mtime - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_prune_keeps_cache_under_cap_and_drops_least_recently_used(tmp_path):
+    cache = RecognitionCache(tmp_path, "settings")
+    keys = [f"{i:02x}" * 32 for i in range(6)]
+    for key in keys:
+        cache.store(key, _info())
+    entry_size = cache._path(keys[0]).stat().st_size
+    for age, key in enumerate(reversed(keys)):
+        _age(cache, key, 100 * (age + 1))  # keys[0] is the oldest
+    cache.load(keys[0])  # ...but was just used
+
+    cache.max_bytes = 4 * entry_size
+    assert cache.prune() == 3
+    kept = [key for key in keys if cache._path(key).exists()]
+    assert kept == [keys[0], keys[4], keys[5]]
+    assert cache.prune() == 0
+
+
+def test_prune_leaves_small_cache_alone(tmp_path):
+    cache = RecognitionCache(tmp_path, "settings", max_bytes=10 * 1024 * 1024)
+    cache.store("ab" * 32, _info())
+    assert cache.prune() == 0
+    assert cache.load("ab" * 32) is not None
+
+
+def _scan(path, num_questions: int = 10, choices_count: int = 4, pages: int = 2):
+    """A generated sheet with option B filled in every field, repeated `pages` times."""
+    sheet = path.with_name("sheet.pdf")
+    generate_answer_sheet_pdf("test", num_questions, sheet, choices_count=choices_count)
+    template = get_sheet_template(num_questions, choices_count, 1.0)
+    with fitz.open(str(sheet)) as doc:
+        page = doc.load_page(0)
+        for field in template.fields:
+            x, y, r = template.points(field)[1]
+            page.draw_circle(fitz.Point(x, page.rect.height - y), r, color=(0, 0, 0), fill=(0, 0, 0))
+        for _ in range(pages - 1):
+            doc.fullcopy_page(0)
+        doc.save(str(path))
+
+
+def _run_job(outputs_dir, job_id: str, scan, key) -> list:
+    job_dir = outputs_dir / job_id
+    job_dir.mkdir()
+    main._process_job(job_dir, scan, key, 10, 4, "en")
+    assert main._get_job_state(job_dir)["state"] == "done"
+    return [e for e in main._JOB_EVENTS[job_id] if e.get("stage") == "recognize"]
+
+
+def test_app_jobs_reuse_cached_pages_with_default_settings(outputs_dir, monkeypatch):
+    assert main._RECOGNITION_CACHE_DIR is not None  # the cache is on unless turned off
+    cache_dir = outputs_dir / "_recognition_cache"
+    monkeypatch.setattr(main, "_RECOGNITION_CACHE_DIR", str(cache_dir))
+    uploads = outputs_dir.parent / "uploads"
+    uploads.mkdir()
+    scan = uploads / "scan.pdf"
+    _scan(scan)
+    key = uploads / "key.csv"
+    key.write_text("number,correct,points\n" + "".join(f"{q},B,1\n" for q in range(1, 11)), encoding="utf-8")
+
+    first = _run_job(outputs_dir, "0000aaaa-0001", scan, key)
+    second = _run_job(outputs_dir, "0000aaaa-0002", scan, key)
+
+    assert first[-1]["cached"] == 0
+    assert second[-1]["cached"] == 2
+    assert (outputs_dir / "0000aaaa-0002" / "annotated.pdf").exists()
+    first_results = read_simple_xlsx_table(outputs_dir / "0000aaaa-0001" / "results.xlsx")
+    assert read_simple_xlsx_table(outputs_dir / "0000aaaa-0002" / "results.xlsx") == first_results
@@ -0,0 +1,92 @@
+import fitz  # PyMuPDF
+import numpy as np
+
+import app.main as main
+from engine.generator import generate_answer_sheet_pdf
+from engine.recognizer import (
+    SCORES_FILENAME,
+    decision_thresholds,
+    process_pdf_to_csv_and_annotated_pdf,
+    rethreshold_recognition_outputs,
+)
+from engine.template import get_sheet_template
+from engine.xlsx import read_simple_xlsx_table
+
+NUM_QUESTIONS = 10
+CHOICES_COUNT = 4
+
+
+def _page_pixels(pdf_path):
+    with fitz.open(str(pdf_path)) as doc:
+        return [
+            np.frombuffer(fitz.Pixmap(doc, doc.load_page(i).get_images()[0][0]).samples, np.uint8).copy()
+            for i in range(doc.page_count)
+        ]
+
+
+def _recognized_job(tmp_path):
+    scan = tmp_path / "input.pdf"
+    generate_answer_sheet_pdf("test", NUM_QUESTIONS, scan, choices_count=CHOICES_COUNT)
+    template = get_sheet_template(NUM_QUESTIONS, CHOICES_COUNT, 1.0)
+    with fitz.open(str(scan)) as doc:
+        page = doc.load_page(0)
+        for field in template.fields:
+            x, y, r = template.points(field)[1]
+            # A light fill: solid enough to read, but blank under a stricter threshold.
+            page.draw_circle(fitz.Point(x, page.rect.height - y), r * 0.45, color=None, fill=(0, 0, 0))
+        doc.saveIncr()
+    process_pdf_to_csv_and_annotated_pdf(
+        str(scan),
+        NUM_QUESTIONS,
+        str(tmp_path / "results.xlsx"),
+        str(tmp_path / "annotated.pdf"),
+        choices_count=CHOICES_COUNT,
+        workers=1,
+        annotate_mode="raster",
+    )
+    return scan
+
+
+def _rethreshold(tmp_path, scan, **thresholds):
+    return rethreshold_recognition_outputs(
+        scores_path=str(tmp_path / SCORES_FILENAME),
+        out_csv_path=str(tmp_path / "results.xlsx"),
+        thresholds=thresholds,
+        input_pdf_path=str(scan),
+        out_annotated_pdf_path=str(tmp_path / "annotated.pdf"),
+    )
+
+
+def test_rethreshold_redraws_raster_annotation(tmp_path):
+    scan = _recognized_job(tmp_path)
+    original = _page_pixels(tmp_path / "annotated.pdf")
+    assert read_simple_xlsx_table(tmp_path / "results.xlsx")[1][1] == "B"
+
+    summary = _rethreshold(tmp_path, scan, min_score_choice=0.9)
+    assert summary["annotated"] is True
+    assert read_simple_xlsx_table(tmp_path / "results.xlsx")[1][1] != "B"
+    strict = _page_pixels(tmp_path / "annotated.pdf")
+    assert not np.array_equal(strict[0], original[0])
+
+    # Back at the recognition-time thresholds the annotation is the original one again.
+    _rethreshold(tmp_path, scan, **decision_thresholds())
+    assert read_simple_xlsx_table(tmp_path / "results.xlsx")[1][1] == "B"
+    restored = _page_pixels(tmp_path / "annotated.pdf")
+    assert np.array_equal(restored[0], original[0])
+
+
+def test_rethreshold_route_drops_annotation_it_cannot_redraw(client, outputs_dir):
+    job_dir = outputs_dir / "0000aaaa-0000"
+    job_dir.mkdir()
+    _recognized_job(job_dir).unlink()  # no input.pdf to redraw from
+    assert (job_dir / "annotated.pdf").exists()
+
+    response = client.post(f"/api/result/{job_dir.name}/rethreshold", data={"min_score_choice": "0.9"})
+    assert response.status_code == 200
+    assert response.json()["annotated"] is False
+    assert not main._job_update_lock(job_dir).locked()
+    assert not (job_dir / "annotated.pdf").exists()
+    for page in (f"/result/{job_dir.name}", f"/result/{job_dir.name}/charts"):
+        response = client.get(page)
+        assert response.status_code == 200
+        assert "annotated.pdf" not in response.text
@@ -0,0 +1,53 @@
+import pytest
+
+import app.main as main
+
+CAP = 64 * 1024
+BOUNDARY = "answer-sheet-test"
+
+
+@pytest.fixture(autouse=True)
+def small_upload_cap(monkeypatch):
+    monkeypatch.setattr(main, "_MAX_UPLOAD_BYTES", CAP)
+
+
+def _multipart_chunks(payload_size: int, chunk_size: int = 8192):
+    """A multipart body with one file field, yielded in chunks (sent without Content-Length)."""
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="answer_key"; filename="key.csv"\r\n'
+        "Content-Type: text/csv\r\n\r\n"
+    ).encode()
+    sent = 0
+    while sent < payload_size:
+        n = min(chunk_size, payload_size - sent)
+        yield b"x" * n
+        sent += n
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _post_regrade(client, body, **headers):
+    return client.post(
+        "/api/result/0000aaaa-0000/regrade",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **headers},
+    )
+
+
+def test_chunked_body_over_cap_is_rejected(client):
+    response = _post_regrade(client, _multipart_chunks(4 * CAP))
+    assert response.status_code == 413
+    assert "error" in response.json()
+
+
+def test_content_length_over_cap_is_rejected(client):
+    body = b"".join(_multipart_chunks(CAP))
+    assert len(body) > CAP
+    response = _post_regrade(client, body)
+    assert response.status_code == 413
+
+
+def test_body_under_cap_reaches_the_route(client):
+    response = _post_regrade(client, _multipart_chunks(CAP // 2))
+    assert response.status_code == 200
+    assert response.json() == {"error": "missing results.xlsx"}